@@ -0,0 +1,447 @@
+"""Benchmarks do Space Defender
+
+Cada benchmark mede um valor (em segundos, salvo quando retorna uma unidade
+própria como quarto elemento) e o compara com um orçamento. Executar com:
+
+    python bench_space_defender.py
+
+O processo termina com código 1 se algum orçamento for estourado.
+"""
+import functools
+import os
+import subprocess
+import sys
+import time
+
+# Rodar sem janela nem dispositivo de áudio
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Orçamentos (segundos)
+IMPORT_OVERHEAD_BUDGET = 0.05   # custo da importação além do próprio pygame
+STARTUP_BUDGET = 0.5            # import + janela + sons + HUD até o primeiro quadro
+OBSERVATION_BUDGET = 1e-5       # por extração (> 100k extrações/s)
+LOWRES_SPEEDUP = 10             # renderizador 84x84 ao menos 10x mais rápido que o completo
+SCORE_STORE_OPEN_BUDGET = 0.02  # abrir o histórico com 1 milhão de partidas
+TELEMETRY_PUBLISH_BUDGET = 3e-6 # por evento publicado (caminho quente do jogo)
+EFFECTS_BUDGET = 1e-3           # HUD + escudo + 5 lasers, sem superfícies do tamanho da tela
+TRAIL_BUDGET = 2e-4             # rastro de 120 pontos
+SOUND_FLUSH_BUDGET = 1e-4       # quadro de tiro rápido com explosões em cadeia
+SNAPSHOT_RESTORE_BUDGET = 2e-3  # voltar ao estado salvo com ~10 asteroides e balas no ar
+HORDE_FRAME_BUDGET = 1 / 60     # quadro completo (simulação + desenho) com 2000+ asteroides
+AUTOPILOT_FRAME_BUDGET = 1 / 60 # pior quadro com o --autopilot padrão decidindo
+SAMPLING_OVERHEAD_BUDGET = 0.02 # CPU da thread do profiler por amostragem / tempo de jogo
+SOAK_TICK_BUDGET = 2e-4        # por tick do soak (1 milhão de ticks em menos de 4 minutos por semente)
+ASSET_PACK_RATIO = 0.25         # assets do pacote mapeado: no máximo 25% do tempo de gerá-los
+
+
+def _time_in_subprocess(code, repeats=5):
+    """Executa `code` em processos novos e retorna o menor tempo impresso"""
+    best = float('inf')
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                                text=True, cwd=HERE, check=True)
+        best = min(best, float(result.stdout.strip().splitlines()[-1]))
+    return best
+
+
+def bench_import_time():
+    """Tempo de `import space_defender` descontado o `import pygame`"""
+    baseline = _time_in_subprocess(
+        "import time; t = time.perf_counter(); import pygame, numpy; "
+        "print(time.perf_counter() - t)")
+    total = _time_in_subprocess(
+        "import time; t = time.perf_counter(); import space_defender; "
+        "print(time.perf_counter() - t)")
+    return "import overhead", max(0.0, total - baseline), IMPORT_OVERHEAD_BUDGET
+
+
+def bench_startup():
+    """Tempo de partida a frio até o primeiro quadro desenhado"""
+    code = (
+        "import time; t = time.perf_counter()\n"
+        "import pygame, space_defender as sd\n"
+        "screen = sd.init_display()\n"
+        "sound_manager = sd.SoundManager()\n"
+        "starfield = sd.StarField(); hud = sd.HUD(); player = sd.Player()\n"
+        "starfield.draw(screen); hud.draw(screen, 0, player.lives)\n"
+        "pygame.display.flip()\n"
+        "print(time.perf_counter() - t)"
+    )
+    return "cold start", _time_in_subprocess(code), STARTUP_BUDGET
+
+
+def _time_per_call(func, iterations, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+def _make_world(num_asteroids=8, num_bullets=5, seed=1):
+    """Cena típica de meio de partida para os benchmarks de simulação"""
+    import random
+    import space_defender as sd
+    random.seed(seed)
+    player = sd.Player()
+    asteroids = [sd.Asteroid(random.choice([1, 2, 3])) for _ in range(num_asteroids)]
+    for asteroid in asteroids:
+        asteroid.rect.y = random.randint(0, sd.SCREEN_HEIGHT - 100)
+    bullets = [sd.Bullet(random.randint(0, sd.SCREEN_WIDTH), random.randint(0, sd.SCREEN_HEIGHT),
+                         random.choice(list(sd.WeaponType)))
+               for _ in range(num_bullets)]
+    powerups = [sd.PowerUp(100, 100, sd.WeaponType.SPREAD)]
+    return player, asteroids, bullets, powerups
+
+
+def bench_observation():
+    """Custo de uma extração do vetor de observação"""
+    import space_defender as sd
+    player, asteroids, bullets, powerups = _make_world()
+    encoder = sd.ObservationEncoder()
+    # partial em vez de lambda: mede só o encode, sem um quadro Python extra por chamada.
+    # Muitas rodadas curtas: na VM compartilhada o ruído vem em rajadas de segundos
+    encode = functools.partial(encoder.encode, player, 100, asteroids, bullets, powerups)
+    best = _time_per_call(encode, 5000, repeat=30)
+    return "observation extraction", best, OBSERVATION_BUDGET
+
+
+def bench_lowres_render():
+    """Quadro 84x84 em tons de cinza contra o quadro completo 800x600"""
+    import pygame
+    import space_defender as sd
+    screen = sd.init_display(headless=True)
+    player, asteroids, bullets, powerups = _make_world()
+    starfield = sd.StarField()
+    particle_system = sd.ParticleSystem(500)
+    particle_system.emit(400, 300, sd.ORANGE, count=60)
+    hud = sd.HUD()
+    sprites = pygame.sprite.Group(player, *asteroids, *powerups)
+    for _ in range(player.trail.max_length):
+        player.trail.add_point(400, 500)
+    
+    def full_frame():
+        screen.fill(sd.BLACK)
+        starfield.draw(screen)
+        player.trail.draw(screen)
+        sprites.draw(screen)
+        for bullet in bullets:
+            bullet.draw(screen)
+        particle_system.draw(screen)
+        hud.draw(screen, 0, player.lives, 100, 1, player.weapon_type, player.weapon_timer)
+    
+    renderer = sd.LowResRenderer(84, 84, stack=4)
+    full = _time_per_call(full_frame, 30)
+    lowres = _time_per_call(lambda: renderer.render(player, asteroids, bullets, powerups), 2000)
+    return "low-res render (84x84)", lowres, full / LOWRES_SPEEDUP
+
+
+def bench_coop_bandwidth(seconds=20):
+    """Bytes/s enviados a cada cliente co-op a partir da wave 20"""
+    import random
+    import space_defender as sd
+    random.seed(3)
+    server_channel = sd.NetChannel()
+    server = sd.CoopServer(server_channel)
+    server.world.wave_manager.current_wave = 19
+    server.world.wave_manager.start_new_wave()
+    clients = [sd.CoopClient(sd.NetChannel(), server_channel.address) for _ in range(2)]
+    
+    ticks = seconds * sd.NET_TICK_RATE
+    for tick in range(ticks):
+        for client in clients:
+            client.send_input(random.choice((-1, 0, 1)), tick % 4 == 0)
+        time.sleep(0.0002)  # Entrega no loopback
+        server.tick()
+        for client in clients:
+            client.poll()
+        for player in server.world.players:
+            player.invulnerable = max(player.invulnerable, 0.5)  # Manter a partida na wave alta
+    
+    per_client = max(server_channel.bytes_sent.values()) / seconds
+    for client in clients:
+        client.channel.close()
+    server_channel.close()
+    return "co-op bandwidth per client", per_client, sd.NET_BANDWIDTH_BUDGET, "B/s"
+
+
+def bench_score_store_open(runs=1000000):
+    """Abertura do histórico de partidas com um log de um milhão de linhas"""
+    import json
+    import tempfile
+    import space_defender as sd
+    with tempfile.TemporaryDirectory() as directory:
+        board = sd.Leaderboard()
+        line = json.dumps({'time': 0, 'score': 0, 'wave': 1, 'duration': 60.0,
+                           'kills': {'NORMAL': 10}}, separators=(',', ':')) + '\n'
+        with open(os.path.join(directory, sd.ScoreStore.LOG_NAME), 'w') as log:
+            log.write(line * runs)
+        for _ in range(runs // 1000):  # Índice equivalente sem repetir um milhão de inserções
+            board.add({'time': 0, 'score': 0, 'wave': 1, 'kills': {'NORMAL': 10000}})
+        board.runs, board.log_size = runs, len(line) * runs
+        with open(os.path.join(directory, sd.ScoreStore.INDEX_NAME), 'w') as f:
+            json.dump(board.to_json(), f)
+        
+        best = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            store = sd.ScoreStore(directory)
+            best = min(best, time.perf_counter() - start)
+            store.close()
+    return "score store open (1M runs)", best, SCORE_STORE_OPEN_BUDGET
+
+
+def bench_telemetry_publish():
+    """Custo de publicar um evento não amostrado no barramento de telemetria"""
+    import tempfile
+    import space_defender as sd
+    with tempfile.TemporaryDirectory() as directory:
+        bus = sd.TelemetryBus(directory, rates={'shoot': 1.0}, capacity=1 << 16)
+        best = _time_per_call(lambda: bus.publish('shoot', weapon='BASIC', x=400), 100000)
+        bus.close()
+    return "telemetry publish", best, TELEMETRY_PUBLISH_BUDGET
+
+
+def bench_effects():
+    """HUD com brilhos, escudo e lasers desenhados num quadro"""
+    import pygame
+    import space_defender as sd
+    sd.init_display(headless=True)
+    frame = pygame.Surface((sd.SCREEN_WIDTH, sd.SCREEN_HEIGHT))
+    hud = sd.HUD()
+    player = sd.Player()
+    player.invulnerable = 1.0
+    player.update(0.01, 0)
+    lasers = [sd.Bullet(100 + i * 100, 300, sd.WeaponType.LASER_BEAM) for i in range(5)]
+    
+    def effects():
+        hud.draw(frame, 1234, 3, 80, 5, sd.WeaponType.LASER_BEAM, 4)
+        player.draw_shield(frame)
+        for laser in lasers:
+            laser.draw(frame)
+    
+    return "effects (HUD, shield, lasers)", _time_per_call(effects, 300), EFFECTS_BUDGET
+
+
+def bench_trail():
+    """Rastro de 120 pontos (polilinha em degradê e um único blit)"""
+    import math
+    import pygame
+    import space_defender as sd
+    sd.init_display(headless=True)
+    frame = pygame.Surface((sd.SCREEN_WIDTH, sd.SCREEN_HEIGHT))
+    trail = sd.Trail(120)
+    for i in range(120):
+        trail.add_point(400 + int(200 * math.sin(i / 15)), 500)
+    return "trail (120 points)", _time_per_call(lambda: trail.draw(frame), 1000), TRAIL_BUDGET
+
+
+def bench_sound_flush():
+    """Quadro com 20 tiros e 10 explosões pedidos: agrupar, limitar vozes e tocar"""
+    import space_defender as sd
+    sound_manager = sd.SoundManager()
+    
+    def frame():
+        for _ in range(20):
+            sound_manager.play('laser')
+        for _ in range(10):
+            sound_manager.play('explosion')
+        sound_manager.flush()
+    
+    best = _time_per_call(frame, 2000)
+    return f"sound flush ({len(sound_manager.voices)} voices)", best, SOUND_FLUSH_BUDGET
+
+
+def bench_asset_pack():
+    """Criação a frio de sons, fontes e sprites: pacote mapeado contra geração na hora"""
+    import tempfile
+    import space_defender as sd
+    code = (
+        "import time, pygame, space_defender as sd\n"
+        "sd.init_display(headless=True); sd.init_mixer()\n"
+        "t = time.perf_counter()\n"
+        "{load}\n"
+        "sd.SoundManager(); sd.HUD(); sd.ProfilerOverlay(); sd.Player().build_shield_frames()\n"
+        "[sd.PowerUp(0, 0, weapon) for weapon in sd.WeaponType]\n"
+        "print(time.perf_counter() - t)"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'assets.pack')
+        sd.AssetPack.bake(path)
+        generated = _time_in_subprocess(code.format(load="pass"))
+        packed = _time_in_subprocess(code.format(load=f"sd.set_assets(sd.AssetPack({path!r}))"))
+    return "asset pack / generated", packed / generated, ASSET_PACK_RATIO, "x"
+
+
+def bench_snapshot_restore():
+    """Restaurar um snapshot de meio de partida (wave 12) no mesmo mundo"""
+    import random
+    import space_defender as sd
+    random.seed(7)
+    world = sd.GameWorld()
+    world.wave_manager.current_wave = 11
+    world.wave_manager.start_new_wave()
+    world.player.change_weapon(sd.WeaponType.RAPID)
+    for tick in range(480):
+        world.player.invulnerable = 1.0
+        world.step(1 / 60, [(1 if tick % 120 < 60 else -1, tick > 460)])
+    snapshot = world.snapshot()
+    best = _time_per_call(lambda: world.restore(snapshot), 300)
+    return (f"snapshot restore ({len(world.entities)} ent., {len(snapshot.data)} B)", best,
+            SNAPSHOT_RESTORE_BUDGET)
+
+
+def _autopilot_world():
+    import random
+    import space_defender as sd
+    random.seed(5)
+    world = sd.GameWorld(particle_system=sd.ParticleSystem(500))
+    world.wave_manager.current_wave = 7
+    world.wave_manager.start_new_wave()
+    for tick in range(300):
+        world.player.invulnerable = 1.0
+        world.step(1 / 60, [(0, tick % 3 == 0)])
+    return world
+
+
+def bench_autopilot_decision():
+    """CPU de uma decisão do Autopilot (4 ações x 8 simulações de 30 ticks) na thread do jogo
+    
+    Orçamento: o intervalo entre decisões (6 quadros a 60 FPS), ou seja,
+    decisões em tempo real mesmo sem a pool de processos.
+    """
+    import space_defender as sd
+    world = _autopilot_world()
+    autopilot = sd.Autopilot()
+    
+    def decide():
+        autopilot.plan(world)
+        while autopilot.pending is not None:
+            autopilot.continue_plan()
+    best = _time_per_call(decide, 5)
+    return (f"autopilot decision ({len(world.entities)} ent.)", best,
+            autopilot.interval / sd.FPS)
+
+
+def bench_autopilot_frame():
+    """Pior quadro completo (decisão, simulação, partículas e desenho) com o --autopilot padrão
+    
+    Os quadros são cadenciados a 60 FPS como no jogo, para a pool de
+    processos simular nas folgas; conta o início da pool.
+    """
+    import space_defender as sd
+    screen = sd.init_display(headless=True)
+    world = _autopilot_world()
+    particle_system = world.particle_system
+    starfield, hud = sd.StarField(), sd.HUD()
+    snapshot = world.snapshot()
+    best = float('inf')
+    for _ in range(3):
+        world.restore(snapshot)
+        autopilot = sd.Autopilot(workers=sd.parse_args([]).autopilot_workers)
+        worst = 0.0
+        try:
+            for tick in range(240):
+                world.player.invulnerable = 1.0
+                start = time.perf_counter()
+                world.step(1 / 60, [autopilot.act(world)])
+                particle_system.update(1 / 60)
+                sd.draw_world(screen, world, starfield, particle_system, hud)
+                elapsed = time.perf_counter() - start
+                worst = max(worst, elapsed)
+                time.sleep(max(0.0, 1 / 60 - elapsed))
+        finally:
+            autopilot.close()
+        best = min(best, worst)
+    return (f"autopilot worst frame ({autopilot.workers} proc., {autopilot.decisions} dec.)", best,
+            AUTOPILOT_FRAME_BUDGET)
+
+
+def bench_soak_tick():
+    """Custo de um tick do teste de resistência (simulação + invariantes a cada 60 ticks)"""
+    import space_defender as sd
+    ticks = 6000
+    start = time.perf_counter()
+    sd.soak_world(11, ticks)
+    return ("soak tick", (time.perf_counter() - start) / ticks, SOAK_TICK_BUDGET)
+
+
+def bench_horde_frame():
+    """Quadro completo do modo horda (simulação, partículas e desenho) com 2000+ asteroides na tela"""
+    import random
+    import statistics
+    import space_defender as sd
+    screen = sd.init_display(headless=True)
+    random.seed(2)
+    particle_system = sd.ParticleSystem(500)
+    world = sd.GameWorld(particle_system=particle_system, horde=sd.HORDE_CURVE)
+    starfield, hud = sd.StarField(), sd.HUD()
+    frames = []
+    for tick in range(2400):
+        world.player.invulnerable = 1.0
+        start = time.perf_counter()
+        world.step(1 / 60, [(1 if tick % 80 < 40 else -1, True)])
+        particle_system.update(1 / 60)
+        if tick >= 2100:
+            sd.draw_world(screen, world, starfield, particle_system, hud)
+            frames.append(time.perf_counter() - start)
+    return (f"horde frame ({len(world.entities)} ent.)", statistics.median(frames), HORDE_FRAME_BUDGET)
+
+
+def bench_sampling_profiler():
+    """CPU gasta pela thread do SamplingProfiler (intervalo padrão) durante a simulação"""
+    import space_defender as sd
+    sampler = sd.SamplingProfiler()
+    start = time.perf_counter()
+    sampler.start()
+    sd.soak_world(12, 6000)
+    sampler.stop()
+    elapsed = time.perf_counter() - start
+    return (f"sampling profiler ({sum(sampler.samples.values())} am.)", sampler.cost / elapsed * 100,
+            SAMPLING_OVERHEAD_BUDGET * 100, "%")
+
+
+BENCHMARKS = [
+    bench_import_time,
+    bench_startup,
+    bench_observation,
+    bench_lowres_render,
+    bench_coop_bandwidth,
+    bench_score_store_open,
+    bench_telemetry_publish,
+    bench_effects,
+    bench_trail,
+    bench_sound_flush,
+    bench_asset_pack,
+    bench_snapshot_restore,
+    bench_autopilot_decision,
+    bench_autopilot_frame,
+    bench_soak_tick,
+    bench_horde_frame,
+    bench_sampling_profiler,
+]
+
+
+def main():
+    failed = False
+    for bench in BENCHMARKS:
+        name, value, budget, *unit = bench()
+        ok = value <= budget
+        failed |= not ok
+        if unit:
+            shown, shown_budget, unit = value, budget, unit[0]
+        else:
+            shown, shown_budget, unit = value * 1000, budget * 1000, "ms"
+        print(f"{name:<32} {shown:10.4f} {unit:<4} budget {shown_budget:10.4f} {unit:<4} "
+              f"{'OK' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,71 @@
 import pygame
 import random
 import math
+import argparse
+import heapq
+import json
+import mmap
+import os
+import queue
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
 import numpy as np
 from pygame import gfxdraw
 from collections import deque
 from enum import Enum
-import unittest
-
-# Inicialização do Pygame
-pygame.init()
-pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+from operator import attrgetter, itemgetter
 
 # Constantes do jogo
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
 
+# Co-op em rede
+NET_TICK_RATE = 60                # ticks de simulação por segundo no servidor
+NET_SNAPSHOT_RATE = 30            # snapshots por segundo para cada cliente
+NET_BANDWIDTH_BUDGET = 8 * 1024   # bytes/s por cliente na wave 20
+NET_HISTORY = 64                  # snapshots guardados para servir de base de delta
+
+# Servidor de muitas sessões
+SERVER_MAX_SESSIONS = 500
+SERVER_SESSION_BUDGET = 0.002     # custo médio máximo de um tick de sessão (s)
+SERVER_SESSION_TIMEOUT = 10.0     # sessões sem entrada por este tempo são encerradas
+
+# Modo horda (--horde)
+HORDE_CURVE = ((0, 30), (20, 300), (40, 900))  # (segundos, asteroides por segundo), interpolada
+HORDE_MAX_ASTEROIDS = 2500        # asteroides vivos ao mesmo tempo
+HORDE_WAVE_SECONDS = 10.0         # a "wave" mostrada no HUD sobe a cada intervalo destes
+
+# Piloto automático (--autopilot)
+AUTOPILOT_WORKERS = min(4, os.cpu_count() or 1)  # processos padrão para as simulações
+AUTOPILOT_WORKER_NICE = 10        # prioridade reduzida dos processos: o quadro do jogo vem primeiro
+
+# Teste de resistência (--soak)
+SOAK_CHECK_EVERY = 60             # ticks entre verificações das invariantes
+SOAK_MAX_BULLETS = 256            # balas vivas por jogador
+SOAK_MAX_ENTITIES = 512           # asteroides + power-ups vivos
+SOAK_LEAK_SLACK = 20000           # blocos de memória a mais tolerados entre fins de partida
+
+# Níveis de qualidade visual, do mais leve (0) ao completo (último)
+#   particles: limite de partículas vivas      trail: fração do rastro desenhada
+#   stars: estrelas do fundo                   glow: passadas de brilho dos textos do HUD
+#   laser_glow: passadas de brilho do laser    rotation_step: graus entre rotações
+#                                              renderizadas dos asteroides (0 = exata)
+QUALITY_LEVELS = (
+    dict(particles=100, trail=0.3, stars=40, glow=0, laser_glow=0, rotation_step=15),
+    dict(particles=200, trail=0.5, stars=80, glow=1, laser_glow=1, rotation_step=10),
+    dict(particles=350, trail=0.75, stars=120, glow=2, laser_glow=1, rotation_step=5),
+    dict(particles=500, trail=1.0, stars=150, glow=3, laser_glow=2, rotation_step=0),
+)
+
+# Configuração do mixer (inicializado sob demanda, não na importação)
+MIXER_SETTINGS = dict(frequency=22050, size=-16, channels=2, buffer=512)
+
 # Cores Futuristas
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -30,84 +80,365 @@ RED = (255, 50, 50)
 DARK_BLUE = (0, 0, 40)
 GOLD = (255, 215, 0)
 
+# Inicialização sob demanda dos subsistemas do Pygame
+def init_display(headless=False, window_size=None, fullscreen=False):
+    """Inicializa vídeo e fontes e cria a janela do jogo
+    
+    O jogo sempre desenha na resolução interna SCREEN_WIDTH x SCREEN_HEIGHT.
+    Com `window_size` ou `fullscreen` a janela tem outro tamanho e o SDL
+    escala o quadro pronto numa única passada ao apresentar (pygame.SCALED),
+    de modo que o custo por pixel dos efeitos não cresce com a janela.
+    """
+    if headless:
+        # Driver de vídeo sem janela (servidores, gravação em lote)
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.display.init()
+    init_fonts()
+    if window_size or fullscreen:
+        flags = pygame.SCALED | (pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE)
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), flags)
+        if window_size and not fullscreen:
+            from pygame._sdl2.video import Window
+            Window.from_display_module().size = window_size
+    else:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Space Defender - Futuristic Edition")
+    return screen
+
+def init_fonts():
+    """Inicializa o módulo de fontes apenas se necessário"""
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+def load_font(size):
+    """Fonte padrão em `size` pontos: atlas de glifos do pacote de assets, se houver"""
+    atlas = ASSETS.font(size)
+    if atlas is not None:
+        return atlas
+    init_fonts()
+    return pygame.font.Font(None, size)
+
+def init_mixer():
+    """Inicializa o mixer apenas se necessário; retorna False sem dispositivo de áudio"""
+    if pygame.mixer.get_init():
+        return True
+    try:
+        pygame.mixer.init(**MIXER_SETTINGS)
+    except pygame.error:
+        return False
+    return True
+
+def read_move_input():
+    """Direção do movimento pelo teclado: -1 esquerda, 1 direita, 0 parado"""
+    keys = pygame.key.get_pressed()
+    if keys[pygame.K_LEFT]:
+        return -1
+    if keys[pygame.K_RIGHT]:
+        return 1
+    return 0
+
+class QualitySettings:
+    """Parâmetros visuais do nível de qualidade atual, lidos pelos efeitos ao desenhar"""
+    def __init__(self, level=len(QUALITY_LEVELS) - 1):
+        self.apply(level)
+    
+    def apply(self, level):
+        self.level = level
+        for name, value in QUALITY_LEVELS[level].items():
+            setattr(self, name, value)
+
+# Qualidade em uso; o QualityGovernor ajusta conforme o tempo de quadro
+QUALITY = QualitySettings()
+
+# Armas: uma entrada por arma, na ordem dos valores de WeaponType (1, 2, ...).
+# Adicionar uma arma é acrescentar uma entrada aqui; os demais campos podem
+# ser ajustados por um arquivo JSON com WEAPONS.load() (--weapons).
+#   speed: pixels por quadro           cooldown: quadros entre disparos
+#   pattern: ângulos (rad) das balas de cada disparo, 0 = para cima
+#   shape: desenho da bala (Bullet.draw_<shape>)
+#   icon: desenho do power-up (PowerUp.draw_icon_<icon>)
+#   glow: brilho ao redor da bala       homing: persegue o asteroide mais próximo
+#   homing_range: alcance da busca por alvo (0 = sem limite)
+WEAPON_DEFINITIONS = [
+    dict(name='BASIC', label='BASIC', color=CYAN, speed=15, cooldown=10, shape='orb', icon='ring'),
+    dict(name='SPREAD', label='SPREAD', color=YELLOW, speed=12, cooldown=15, pattern=[-0.12, 0.0, 0.12],
+         shape='slug', icon='triad'),
+    dict(name='RAPID', label='RAPID', color=NEON_GREEN, speed=20, cooldown=3, shape='needle', icon='bars'),
+    dict(name='LASER_BEAM', label='LASER', color=PURPLE, speed=25, cooldown=8, shape='beam', icon='beam',
+         glow=True),
+    dict(name='HOMING', label='HOMING', color=HOT_PINK, speed=10, cooldown=20, shape='missile', icon='arrow',
+         homing=True),
+]
+WEAPON_DEFAULTS = dict(damage=1, size=4, pattern=[0.0], glow=False, homing=False, homing_range=0)
+
 # Tipos de armas
-class WeaponType(Enum):
-    BASIC = 1
-    SPREAD = 2
-    RAPID = 3
-    LASER_BEAM = 4
-    HOMING = 5
+WeaponType = Enum('WeaponType', [definition['name'] for definition in WEAPON_DEFINITIONS])
+
+class WeaponRegistry:
+    """Definições das armas compiladas em tabelas indexadas por WeaponType.value
+    
+    O caminho quente (disparo, movimento e desenho das balas) só indexa
+    listas; nenhuma estrutura é montada por chamada. load() recompila as
+    mesmas tabelas no lugar, então referências a WEAPONS continuam válidas.
+    """
+    FIELDS = ('label', 'color', 'speed', 'cooldown', 'damage', 'size', 'pattern',
+              'shape', 'icon', 'glow', 'homing', 'homing_range')
+    
+    def __init__(self, definitions):
+        self.definitions = {}
+        for definition in definitions:
+            self.definitions[definition['name']] = dict(WEAPON_DEFAULTS, **definition)
+        self.compile()
+    
+    def compile(self):
+        # Posição 0 vazia: WeaponType começa em 1
+        for field in self.FIELDS:
+            setattr(self, field, [None])
+        self.velocities = [None]   # (vx, vy) de cada bala de um disparo
+        self.draw_bullet = [None]  # Bullet.draw_<shape>
+        self.draw_icon = [None]    # PowerUp.draw_icon_<icon>
+        for weapon in WeaponType:
+            definition = self.definitions[weapon.name]
+            for field in self.FIELDS:
+                getattr(self, field).append(definition[field])
+            self.color[-1] = tuple(definition['color'])
+            speed = definition['speed']
+            self.velocities.append(tuple((math.sin(angle) * speed, -math.cos(angle) * speed)
+                                         for angle in definition['pattern']))
+            self.draw_bullet.append(getattr(Bullet, 'draw_' + definition['shape']))
+            self.draw_icon.append(getattr(PowerUp, 'draw_icon_' + definition['icon']))
+    
+    def load(self, path):
+        """Ajusta armas existentes a partir de uma lista JSON de objetos com 'name'"""
+        with open(path) as f:
+            entries = json.load(f)
+        for entry in entries:
+            name = entry.get('name')
+            if name not in self.definitions:
+                raise ValueError(f"arma desconhecida em {path}: {name!r} "
+                                 f"(novas armas entram em WEAPON_DEFINITIONS)")
+            unknown = set(entry) - set(self.FIELDS) - {'name'}
+            if unknown:
+                raise ValueError(f"campos desconhecidos para {name} em {path}: {sorted(unknown)}")
+            self.definitions[name].update(entry)
+        self.compile()
 
 class SoundManager:
-    """Gerenciador de efeitos sonoros"""
-    def __init__(self):
+    """Gerenciador de efeitos sonoros com limite de vozes
+    
+    Cada efeito é sintetizado uma vez e pré-mixado num banco de variações
+    de tom e volume. play() só anota o pedido; flush(), chamado uma vez por
+    quadro, toca no máximo uma voz por efeito (pedidos iguais no mesmo
+    quadro viram uma voz um pouco mais alta). Cada efeito tem um limite de
+    vozes simultâneas e uma prioridade: sem canal livre, a voz mais antiga
+    de menor prioridade é interrompida (nunca uma de prioridade maior).
+    """
+    SAMPLE_RATE = 22050
+    CHANNELS = 12
+    VARIATIONS = 6                  # Variações pré-mixadas por efeito
+    PITCH_SPREAD = 0.08             # Tom entre 1 - spread e 1 + spread
+    FADE_MS = 4                     # Entrada suave ao reaproveitar um canal (sem estalos)
+    # Efeito: (vozes simultâneas, prioridade)
+    VOICES = {'laser': (3, 1), 'explosion': (5, 2), 'powerup': (2, 3)}
+    
+    def __init__(self, seed=0, load=True):
         self.sounds = {}
-        self.load_sounds()
+        self.banks = {}
+        self.pending = {}
+        self.next_variation = {}
+        self.channels = []
+        self.voices = {}  # Índice do canal -> (efeito, prioridade, ordem de início)
+        self.started = 0
+        self.dropped = 0
+        self.seed = seed
+        self.rng = None
+        if load:
+            self.load_sounds()
     
     def load_sounds(self):
+        if not init_mixer():
+            return
         try:
-            self.create_laser_sound()
-            self.create_explosion_sound()
-            self.create_powerup_sound()
+            banks = ASSETS.sound_banks()  # None sem pacote ou com outro formato de mixer
+            if banks is None:
+                banks = {name: [pygame.sndarray.make_sound(pcm) for pcm in bank]
+                         for name, bank in self.synthesize().items()}
+            for name, bank in banks.items():
+                self.banks[name] = bank
+                self.sounds[name] = bank[0]
+                self.next_variation[name] = 0
         except:
             pass
+        pygame.mixer.set_num_channels(self.CHANNELS)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.CHANNELS)]
+    
+    def synthesize(self):
+        """Bancos de variações de cada efeito em PCM int16 estéreo (não usa o mixer)"""
+        self.rng = np.random.default_rng(self.seed)  # Não mexe no random do jogo
+        return {
+            'laser': self.build_bank(self.laser_wave()),
+            'explosion': self.build_bank(self.explosion_wave()),
+            'powerup': self.build_bank(self.powerup_wave()),
+        }
+    
+    def build_bank(self, wave):
+        """Cria as variações de tom e volume de `wave` (mono, -1..1)"""
+        bank = []
+        positions = np.arange(len(wave))
+        for pitch in np.linspace(1 - self.PITCH_SPREAD, 1 + self.PITCH_SPREAD, self.VARIATIONS):
+            varied = np.interp(np.arange(0, len(wave) - 1, pitch), positions, wave)
+            varied *= self.rng.uniform(0.8, 1.0)
+            channel = np.clip(varied * 32767, -32767, 32767).astype(np.int16)
+            bank.append(np.ascontiguousarray(np.column_stack((channel, channel))))
+        self.rng.shuffle(bank)
+        return bank
     
-    def create_laser_sound(self):
-        sample_rate = 22050
+    def laser_wave(self):
+        sample_rate = self.SAMPLE_RATE
         duration = 0.2
         frequency = 440
         
         frames = int(duration * sample_rate)
-        arr = np.zeros((frames, 2))
-        
-        for i in range(frames):
-            t = float(i) / sample_rate
-            wave = np.sin(2 * np.pi * frequency * t) * np.exp(-t * 10)
-            wave += np.sin(2 * np.pi * frequency * 2 * t) * 0.3 * np.exp(-t * 15)
-            
-            arr[i] = [wave, wave]
-        
-        arr = (arr * 32767).astype(np.int16)
-        self.sounds['laser'] = pygame.sndarray.make_sound(arr)
+        t = np.arange(frames) / sample_rate
+        wave = np.sin(2 * np.pi * frequency * t) * np.exp(-t * 10)
+        wave += np.sin(2 * np.pi * frequency * 2 * t) * 0.3 * np.exp(-t * 15)
+        return wave
     
-    def create_explosion_sound(self):
-        sample_rate = 22050
+    def explosion_wave(self):
+        sample_rate = self.SAMPLE_RATE
         duration = 0.5
         
         frames = int(duration * sample_rate)
-        arr = np.zeros((frames, 2))
-        
-        for i in range(frames):
-            t = float(i) / sample_rate
-            noise = np.random.normal(0, 0.1)
-            freq = 200 * (1 - t/duration)
-            wave = np.sin(2 * np.pi * freq * t) * (1 - t/duration)
-            
-            arr[i] = [(noise + wave) * 32767 * (1 - t/duration), 
-                     (noise + wave) * 32767 * (1 - t/duration)]
-        
-        arr = np.clip(arr, -32767, 32767).astype(np.int16)
-        self.sounds['explosion'] = pygame.sndarray.make_sound(arr)
+        t = np.arange(frames) / sample_rate
+        noise = self.rng.normal(0, 0.1, frames)
+        freq = 200 * (1 - t/duration)
+        wave = np.sin(2 * np.pi * freq * t) * (1 - t/duration)
+        return (noise + wave) * (1 - t/duration)
     
-    def create_powerup_sound(self):
-        sample_rate = 22050
+    def powerup_wave(self):
+        sample_rate = self.SAMPLE_RATE
         duration = 0.3
         
         frames = int(duration * sample_rate)
-        arr = np.zeros((frames, 2))
+        t = np.arange(frames) / sample_rate
+        # Som ascendente de power-up
+        freq = 400 + t * 800
+        return np.sin(2 * np.pi * freq * t) * (1 - t)
+    
+    def play(self, sound_name):
+        """Pede o efeito neste quadro; toca em flush()"""
+        if sound_name in self.banks:
+            self.pending[sound_name] = self.pending.get(sound_name, 0) + 1
+    
+    def flush(self):
+        """Toca os efeitos pedidos neste quadro, da maior para a menor prioridade"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        # Vozes que já terminaram liberam o canal
+        for index in [index for index in self.voices if not self.channels[index].get_busy()]:
+            del self.voices[index]
+        for name in sorted(pending, key=lambda name: -self.VOICES[name][1]):
+            self.start_voice(name, pending[name])
+    
+    def start_voice(self, name, count):
+        limit, priority = self.VOICES[name]
+        same = [index for index, voice in self.voices.items() if voice[0] == name]
+        if len(same) >= limit:
+            index = min(same, key=lambda index: self.voices[index][2])  # Reinicia a mais antiga
+        else:
+            free = [index for index in range(len(self.channels)) if index not in self.voices]
+            if free:
+                index = free[0]
+            else:
+                candidates = [index for index, voice in self.voices.items() if voice[1] <= priority]
+                if not candidates:
+                    self.dropped += 1
+                    return
+                index = min(candidates, key=lambda index: self.voices[index][1:])
         
-        for i in range(frames):
-            t = float(i) / sample_rate
-            # Som ascendente de power-up
-            freq = 400 + t * 800
-            wave = np.sin(2 * np.pi * freq * t) * (1 - t)
-            arr[i] = [wave * 32767, wave * 32767]
+        bank = self.banks[name]
+        variation = self.next_variation[name]
+        self.next_variation[name] = (variation + 1) % len(bank)
+        channel = self.channels[index]
+        channel.stop()
+        # Pedidos iguais somados num quadro: um pouco mais alto, sem somar amplitudes
+        channel.set_volume(min(1.0, 0.7 + 0.1 * count))
+        channel.play(bank[variation], fade_ms=self.FADE_MS)
+        self.started += 1
+        self.voices[index] = (name, priority, self.started)
+
+class SilentSoundManager:
+    """Substituto do SoundManager para simulação sem áudio"""
+    def play(self, sound_name):
+        pass
+    
+    def flush(self):
+        pass
+
+class EffectLayer:
+    """Camada de efeitos somada ao quadro (BLEND_ADD), opcionalmente em resolução reduzida
+    
+    Recebe desenhos em coordenadas de tela; com `scale` 0.5 tudo é desenhado
+    numa superfície de 400x300 e só a área usada é ampliada na composição.
+    Com `alpha` a camada é transparente (brilhos com alfa por pixel); sem
+    ela, opaca com fundo preto.
+    """
+    def __init__(self, scale=1.0, alpha=False, size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+        self.scale = scale
+        layer_size = (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+        self.surface = pygame.Surface(layer_size, pygame.SRCALPHA if alpha else 0, 32)
+        self.clear_color = (0, 0, 0, 0) if alpha else BLACK
+        self.areas = []  # Áreas usadas neste quadro (coordenadas da camada)
+    
+    def begin(self):
+        """Limpa o que foi desenhado no quadro anterior"""
+        for area in self.areas:
+            self.surface.fill(self.clear_color, area)
+        self.areas = []
+    
+    def mark(self, rect):
+        # Áreas sobrepostas viram uma só; distantes (ex.: topo e rodapé do HUD) ficam separadas
+        index = rect.collidelist(self.areas)
+        while index != -1:
+            rect = rect.union(self.areas.pop(index))
+            index = rect.collidelist(self.areas)
+        self.areas.append(rect)
+    
+    def prepare(self, image):
+        """Reduz `image` para a escala da camada (resultado pode ir para um cache)"""
+        if self.scale == 1.0:
+            return image
+        width, height = image.get_size()
+        return pygame.transform.smoothscale(image, (max(1, round(width * self.scale)),
+                                                    max(1, round(height * self.scale))))
+    
+    def blit(self, image, position, prepared=False):
+        """Copia `image` para a camada na posição de tela `position`
         
-        self.sounds['powerup'] = pygame.sndarray.make_sound(arr.astype(np.int16))
+        `image` está em escala de tela, ou já reduzida por prepare() se `prepared`.
+        """
+        if not prepared:
+            image = self.prepare(image)
+        if self.scale != 1.0:
+            position = (round(position[0] * self.scale), round(position[1] * self.scale))
+        self.mark(self.surface.blit(image, position))
     
-    def play(self, sound_name):
-        if sound_name in self.sounds:
-            self.sounds[sound_name].play()
+    def composite(self, target):
+        """Soma as áreas usadas da camada ao quadro, ampliando se necessário"""
+        bounds = self.surface.get_rect()
+        inverse = 1.0 / self.scale
+        for area in self.areas:
+            area = area.clip(bounds)
+            if not area:
+                continue
+            if self.scale == 1.0:
+                target.blit(self.surface, area, area, special_flags=pygame.BLEND_ADD)
+                continue
+            dest = pygame.Rect(int(area.x * inverse), int(area.y * inverse),
+                               int(area.width * inverse), int(area.height * inverse))
+            image = pygame.transform.smoothscale(self.surface.subsurface(area), dest.size)
+            target.blit(image, dest, special_flags=pygame.BLEND_ADD)
 
 class Particle:
     """Partícula individual otimizada"""
@@ -136,12 +467,15 @@ class Particle:
 
 class ParticleSystem:
     """Sistema de partículas otimizado"""
-    def __init__(self, max_particles=500):
+    def __init__(self, max_particles=500, layer_scale=None):
         self.max_particles = max_particles
         self.particles = []
+        self.layer_scale = layer_scale  # None: desenha direto no quadro
+        self.layer = None
         
     def emit(self, x, y, color, count=30, speed_range=(1, 5), size_range=(1, 4)):
-        for _ in range(min(count, self.max_particles - len(self.particles))):
+        limit = min(self.max_particles, QUALITY.particles)
+        for _ in range(min(count, limit - len(self.particles))):
             angle = random.uniform(0, 2 * math.pi)
             speed = random.uniform(*speed_range)
             size = random.uniform(*size_range)
@@ -160,14 +494,53 @@ class ParticleSystem:
                 self.particles.remove(particle)
     
     def draw(self, surface):
+        if self.layer_scale is not None:
+            self.render_layer()
+            self.layer.composite(surface)
+            return
         for particle in self.particles:
             particle.draw(surface)
+    
+    def render_layer(self):
+        """Desenha as partículas na camada de efeitos (sem tocar no quadro)"""
+        if self.layer is None:
+            self.layer = EffectLayer(self.layer_scale or 1.0)
+        layer = self.layer
+        layer.begin()
+        particles = self.particles
+        if not particles:
+            return
+        scale = layer.scale
+        filled_circle = gfxdraw.filled_circle
+        surface = layer.surface
+        for p in particles:
+            filled_circle(surface, int(p.x * scale), int(p.y * scale), int(p.size * scale),
+                          (*p.color[:3], int(255 * (p.life / p.max_life))))
+        xs = [p.x for p in particles]
+        ys = [p.y for p in particles]
+        radius = max(p.size for p in particles)
+        left, top = (min(xs) - radius) * scale, (min(ys) - radius) * scale
+        right, bottom = (max(xs) + radius) * scale, (max(ys) + radius) * scale
+        layer.mark(pygame.Rect(int(left) - 1, int(top) - 1, int(right - left) + 3, int(bottom - top) + 3))
 
 class Trail:
-    """Classe para gerenciar o rastro da nave"""
-    def __init__(self, max_length=20):
+    """Classe para gerenciar o rastro da nave
+    
+    O rastro é desenhado como uma polilinha em degradê numa superfície do
+    tamanho do seu retângulo envolvente e somado ao quadro com um único
+    blit. O degradê tem um número fixo de faixas (uma chamada de desenho
+    cada), então o custo não cresce com o comprimento do rastro.
+    """
+    DEFAULT_LENGTH = 20  # Pontos guardados (--trail-length)
+    GRADIENT = tuple(tuple(int(c * 0.7 * (band + 1) / 8) for c in ELECTRIC_BLUE) for band in range(8))
+    WIDTH = 3
+    
+    def __init__(self, max_length=None):
+        if max_length is None:
+            max_length = self.DEFAULT_LENGTH
         self.points = deque(maxlen=max_length)
         self.max_length = max_length
+        self.surface = None  # Reaproveitada entre quadros; cresce quando necessário
         
     def add_point(self, x, y):
         self.points.append((x, y))
@@ -176,51 +549,59 @@ class Trail:
         pass
     
     def draw(self, surface):
-        if len(self.points) > 1:
-            for i in range(1, len(self.points)):
-                alpha = int(255 * (i / len(self.points)) * 0.7)
-                color = (*ELECTRIC_BLUE, alpha)
-                
-                start_pos = self.points[i-1]
-                end_pos = self.points[i]
-                
-                trail_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-                pygame.draw.line(trail_surf, color, start_pos, end_pos, 3)
-                surface.blit(trail_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+        # Só os pontos mais recentes, conforme o nível de qualidade
+        points = list(self.points)[-math.ceil(len(self.points) * QUALITY.trail):]
+        count = len(points)
+        if count < 2:
+            return
+        
+        # Retângulo envolvente da polilinha (com a espessura da linha)
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        margin = self.WIDTH
+        left, top = min(xs) - margin, min(ys) - margin
+        area = pygame.Rect(0, 0, max(xs) - left + margin + 1, max(ys) - top + margin + 1)
+        if self.surface is None or not self.surface.get_rect().contains(area):
+            current = self.surface.get_size() if self.surface else (0, 0)
+            self.surface = pygame.Surface((max(area.width, current[0]), max(area.height, current[1])))
+        trail_surf = self.surface
+        trail_surf.fill(BLACK, area)
+        
+        # Uma polilinha por faixa do degradê (cores já multiplicadas pela intensidade)
+        local = [(x - left, y - top) for x, y in points]
+        bands = len(self.GRADIENT)
+        segments = count - 1
+        for band, color in enumerate(self.GRADIENT):
+            start = segments * band // bands
+            end = segments * (band + 1) // bands
+            if end > start:
+                pygame.draw.lines(trail_surf, color, False, local[start:end + 1], self.WIDTH)
+        surface.blit(trail_surf, (left, top), area, special_flags=pygame.BLEND_ADD)
 
 class Bullet:
     """Classe base para projéteis"""
-    def __init__(self, x, y, weapon_type=WeaponType.BASIC):
+    def __init__(self, x, y, weapon_type=WeaponType.BASIC, vx=0.0, vy=None):
+        weapon = weapon_type._value_
         self.x = x
         self.y = y
         self.weapon_type = weapon_type
         self.active = True
-        self.speed = 15
-        self.damage = 1
-        self.size = 4
-        
-        if weapon_type == WeaponType.BASIC:
-            self.color = CYAN
-            self.speed = 15
-        elif weapon_type == WeaponType.SPREAD:
-            self.color = YELLOW
-            self.speed = 12
-        elif weapon_type == WeaponType.RAPID:
-            self.color = NEON_GREEN
-            self.speed = 20
-        elif weapon_type == WeaponType.LASER_BEAM:
-            self.color = PURPLE
-            self.speed = 25
-        elif weapon_type == WeaponType.HOMING:
-            self.color = HOT_PINK
-            self.speed = 10
-            self.target = None
+        self.speed = WEAPONS.speed[weapon]
+        self.damage = WEAPONS.damage[weapon]
+        self.size = WEAPONS.size[weapon]
+        self.color = WEAPONS.color[weapon]
+        self.homing = WEAPONS.homing[weapon]
+        self.target = None
+        # Velocidade em pixels por quadro (padrão: para cima)
+        self.vx = vx
+        self.vy = -self.speed if vy is None else vy
     
     def update(self, asteroids):
-        if self.weapon_type == WeaponType.HOMING and asteroids:
-            # Encontrar o asteroide mais próximo
+        if self.homing and asteroids:
+            # Encontrar o asteroide mais próximo (dentro do alcance, se houver)
             if not self.target or self.target not in asteroids:
-                min_dist = float('inf')
+                min_dist = WEAPONS.homing_range[self.weapon_type._value_] or float('inf')
+                self.target = None
                 for asteroid in asteroids:
                     dist = math.sqrt((asteroid.rect.centerx - self.x)**2 + 
                                    (asteroid.rect.centery - self.y)**2)
@@ -236,41 +617,49 @@ class Bullet:
                 if dist > 0:
                     self.x += (dx / dist) * self.speed
                     self.y += (dy / dist) * self.speed
+            else:
+                self.x += self.vx
+                self.y += self.vy
         else:
-            # Movimento padrão
-            self.y -= self.speed
+            # Movimento em linha reta (o SPREAD abre em leque)
+            self.x += self.vx
+            self.y += self.vy
         
         # Verificar se saiu da tela
         if self.y < -10 or self.x < -10 or self.x > SCREEN_WIDTH + 10:
             self.active = False
     
     def draw(self, surface):
-        if self.weapon_type == WeaponType.BASIC:
-            pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
-            pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), self.size, 1)
-        elif self.weapon_type == WeaponType.SPREAD:
-            pygame.draw.rect(surface, self.color, (int(self.x-3), int(self.y-6), 6, 12))
-            pygame.draw.rect(surface, WHITE, (int(self.x-3), int(self.y-6), 6, 12), 1)
-        elif self.weapon_type == WeaponType.RAPID:
-            pygame.draw.ellipse(surface, self.color, (int(self.x-2), int(self.y-8), 4, 16))
-        elif self.weapon_type == WeaponType.LASER_BEAM:
-            pygame.draw.line(surface, self.color, (int(self.x), int(self.y)), 
-                          (int(self.x), int(self.y-20)), 3)
-            # Brilho
-            for i in range(2):
+        WEAPONS.draw_bullet[self.weapon_type._value_](self, surface)
+    
+    def draw_orb(self, surface):
+        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
+        pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), self.size, 1)
+    
+    def draw_slug(self, surface):
+        pygame.draw.rect(surface, self.color, (int(self.x-3), int(self.y-6), 6, 12))
+        pygame.draw.rect(surface, WHITE, (int(self.x-3), int(self.y-6), 6, 12), 1)
+    
+    def draw_needle(self, surface):
+        pygame.draw.ellipse(surface, self.color, (int(self.x-2), int(self.y-8), 4, 16))
+    
+    def draw_beam(self, surface):
+        pygame.draw.line(surface, self.color, (int(self.x), int(self.y)), 
+                      (int(self.x), int(self.y-20)), 3)
+        # Brilho (superfície do tamanho do feixe, não da tela)
+        if WEAPONS.glow[self.weapon_type._value_]:
+            for i in range(QUALITY.laser_glow):
                 alpha = 100 - i * 40
-                glow_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-                pygame.draw.line(glow_surf, (*self.color, alpha), 
-                               (int(self.x), int(self.y)), 
-                               (int(self.x), int(self.y-20)), 5-i*2)
-                surface.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
-        elif self.weapon_type == WeaponType.HOMING:
-            # Desenhar míssil
-            points = [(int(self.x), int(self.y-8)), 
-                     (int(self.x-4), int(self.y+4)), 
-                     (int(self.x+4), int(self.y+4))]
-            pygame.draw.polygon(surface, self.color, points)
-            pygame.draw.polygon(surface, WHITE, points, 1)
+                glow_surf = pygame.Surface((12, 28), pygame.SRCALPHA)
+                pygame.draw.line(glow_surf, (*self.color, alpha), (6, 24), (6, 4), 5-i*2)
+                surface.blit(glow_surf, (int(self.x) - 6, int(self.y) - 24), special_flags=pygame.BLEND_ADD)
+    
+    def draw_missile(self, surface):
+        points = [(int(self.x), int(self.y-8)), 
+                 (int(self.x-4), int(self.y+4)), 
+                 (int(self.x+4), int(self.y+4))]
+        pygame.draw.polygon(surface, self.color, points)
+        pygame.draw.polygon(surface, WHITE, points, 1)
     
     def get_rect(self):
         return pygame.Rect(self.x - self.size, self.y - self.size, 
@@ -281,73 +670,74 @@ class PowerUp(pygame.sprite.Sprite):
     def __init__(self, x, y, weapon_type):
         super().__init__()
         self.weapon_type = weapon_type
+        self.color = WEAPONS.color[weapon_type._value_]
         
-        # Inicializar cores antes de desenhar
-        self.colors = {
-            WeaponType.BASIC: CYAN,
-            WeaponType.SPREAD: YELLOW,
-            WeaponType.RAPID: NEON_GREEN,
-            WeaponType.LASER_BEAM: PURPLE,
-            WeaponType.HOMING: HOT_PINK
-        }
-        
-        self.image = pygame.Surface((40, 40), pygame.SRCALPHA)
-        self.draw_powerup()
+        self.image = ASSETS.image('powerup', WEAPONS.icon[weapon_type._value_], *self.color)
+        if self.image is None:
+            self.image = pygame.Surface((40, 40), pygame.SRCALPHA)
+            self.draw_powerup()
         self.rect = self.image.get_rect()
         self.rect.centerx = x
         self.rect.centery = y
+        self.speed_x = 0
         self.speed_y = 2
         self.pulse = 0
     
     def draw_powerup(self):
-        color = self.colors[self.weapon_type]
-        center = (20, 20)
-        
-        # Desenhar ícone baseado no tipo de arma
-        if self.weapon_type == WeaponType.BASIC:
-            # Círculo com ponto no centro
-            pygame.draw.circle(self.image, color, center, 15)
-            pygame.draw.circle(self.image, WHITE, center, 15, 2)
-            pygame.draw.circle(self.image, WHITE, center, 5)
-        elif self.weapon_type == WeaponType.SPREAD:
-            # Três pontos em formação de triângulo
-            for i in range(3):
-                angle = i * 2 * math.pi / 3
-                x = center[0] + 10 * math.cos(angle)
-                y = center[1] + 10 * math.sin(angle)
-                pygame.draw.circle(self.image, color, (int(x), int(y)), 6)
-        elif self.weapon_type == WeaponType.RAPID:
-            # Linhas rápidas
-            for i in range(4):
-                y = center[1] - 12 + i * 8
-                pygame.draw.line(self.image, color, (center[0]-8, y), (center[0]+8, y), 3)
-        elif self.weapon_type == WeaponType.LASER_BEAM:
-            # Linha vertical com brilho
-            pygame.draw.line(self.image, color, (center[0], center[1]-15), 
-                           (center[0], center[1]+15), 4)
-            for i in range(2):
-                alpha = 100 - i * 40
-                glow_surf = pygame.Surface((40, 40), pygame.SRCALPHA)
-                pygame.draw.line(glow_surf, (*color, alpha), 
-                               (center[0], center[1]-15), 
-                               (center[0], center[1]+15), 6-i*2)
-                self.image.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
-        elif self.weapon_type == WeaponType.HOMING:
-            # Forma de míssil
-            points = [(center[0], center[1]-10), 
-                     (center[0]-8, center[1]+10), 
-                     (center[0]+8, center[1]+10)]
-            pygame.draw.polygon(self.image, color, points)
-            pygame.draw.polygon(self.image, WHITE, points, 2)
+        # Desenhar ícone da arma
+        WEAPONS.draw_icon[self.weapon_type._value_](self, self.color, (20, 20))
+    
+    def draw_icon_ring(self, color, center):
+        # Círculo com ponto no centro
+        pygame.draw.circle(self.image, color, center, 15)
+        pygame.draw.circle(self.image, WHITE, center, 15, 2)
+        pygame.draw.circle(self.image, WHITE, center, 5)
+    
+    def draw_icon_triad(self, color, center):
+        # Três pontos em formação de triângulo
+        for i in range(3):
+            angle = i * 2 * math.pi / 3
+            x = center[0] + 10 * math.cos(angle)
+            y = center[1] + 10 * math.sin(angle)
+            pygame.draw.circle(self.image, color, (int(x), int(y)), 6)
+    
+    def draw_icon_bars(self, color, center):
+        # Linhas rápidas
+        for i in range(4):
+            y = center[1] - 12 + i * 8
+            pygame.draw.line(self.image, color, (center[0]-8, y), (center[0]+8, y), 3)
+    
+    def draw_icon_beam(self, color, center):
+        # Linha vertical com brilho
+        pygame.draw.line(self.image, color, (center[0], center[1]-15), 
+                       (center[0], center[1]+15), 4)
+        for i in range(2):
+            alpha = 100 - i * 40
+            glow_surf = pygame.Surface((40, 40), pygame.SRCALPHA)
+            pygame.draw.line(glow_surf, (*color, alpha), 
+                           (center[0], center[1]-15), 
+                           (center[0], center[1]+15), 6-i*2)
+            self.image.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+    
+    def draw_icon_arrow(self, color, center):
+        # Forma de míssil
+        points = [(center[0], center[1]-10), 
+                 (center[0]-8, center[1]+10), 
+                 (center[0]+8, center[1]+10)]
+        pygame.draw.polygon(self.image, color, points)
+        pygame.draw.polygon(self.image, WHITE, points, 2)
     
     def update(self, dt):
         self.rect.y += self.speed_y
-        self.pulse += dt * 5
+        self.animate(dt)
         
         # Remover se sair da tela
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
     
+    def animate(self, dt, render=True):
+        self.pulse += dt * 5
+    
     def draw(self, surface):
         # Efeito de pulsação
         pulse_scale = 1 + math.sin(self.pulse) * 0.1
@@ -357,18 +747,26 @@ class PowerUp(pygame.sprite.Sprite):
         scaled_rect = scaled_image.get_rect(center=self.rect.center)
         surface.blit(scaled_image, scaled_rect)
 
+# Tabelas das armas (depois de Bullet e PowerUp, cujos métodos de desenho referenciam)
+WEAPONS = WeaponRegistry(WEAPON_DEFINITIONS)
+
 class Player(pygame.sprite.Sprite):
     """Nave do jogador"""
+    SHIELD_PHASES = 32     # Quadros pré-renderizados por ciclo de pulsação do escudo
+    SHIELD_RADIUS = 40
+    shield_frames = None   # Compartilhados por todas as naves; criados no primeiro uso
+
     __slots__ = ['image', 'rect', 'speed_x', 'lives', 'shoot_cooldown', 'invulnerable', 
                  'angle', 'trail', 'shield_active', 'shield_timer', 'weapon_type', 
-                 'weapon_timer']
+                 'weapon_timer', 'collide_radius', 'health', 'blink_image']
     
-    def __init__(self):
+    def __init__(self, centerx=SCREEN_WIDTH // 2):
         super().__init__()
         
         # Inicializar todos os atributos antes de desenhar a nave
         self.speed_x = 0
         self.lives = 3
+        self.health = 100
         self.shoot_cooldown = 0
         self.invulnerable = 0
         self.angle = -math.pi/2
@@ -379,13 +777,25 @@ class Player(pygame.sprite.Sprite):
         self.weapon_timer = 0
         
         # Agora podemos desenhar a nave
-        self.image = pygame.Surface((60, 50), pygame.SRCALPHA)
         self.draw_spaceship()
         self.rect = self.image.get_rect()
-        self.rect.centerx = SCREEN_WIDTH // 2
+        self.rect.centerx = centerx
         self.rect.bottom = SCREEN_HEIGHT - 30
+        # Raio de colisão equivalente a collide_circle_ratio(0.7)
+        self.collide_radius = 0.5 * math.hypot(*self.rect.size) * 0.7
         
     def draw_spaceship(self):
+        color = WEAPONS.color[self.weapon_type._value_]
+        image = ASSETS.image('ship', *color)
+        if image is None:
+            self.image, self.blink_image = self.render_spaceship(color)
+        else:
+            self.image, self.blink_image = image, ASSETS.image('ship_blink', *color)
+    
+    @staticmethod
+    def render_spaceship(color):
+        """Nave com o destaque da arma em `color` e sua versão semitransparente"""
+        image = pygame.Surface((60, 50), pygame.SRCALPHA)
         # Desenha uma nave futurista
         points = [
             (30, 0),   # Topo
@@ -394,36 +804,38 @@ class Player(pygame.sprite.Sprite):
             (55, 45),  # Base direita
             (45, 30)   # Meio direito
         ]
-        pygame.draw.polygon(self.image, ELECTRIC_BLUE, points)
-        pygame.draw.polygon(self.image, CYAN, points, 2)
+        pygame.draw.polygon(image, ELECTRIC_BLUE, points)
+        pygame.draw.polygon(image, CYAN, points, 2)
         
         # Cabine
-        pygame.draw.circle(self.image, NEON_GREEN, (30, 20), 10)
-        pygame.draw.circle(self.image, WHITE, (30, 20), 10, 2)
+        pygame.draw.circle(image, NEON_GREEN, (30, 20), 10)
+        pygame.draw.circle(image, WHITE, (30, 20), 10, 2)
         
         # Motores
         for x, y in [(18, 40), (42, 40)]:
-            pygame.draw.circle(self.image, HOT_PINK, (x, y), 6)
-            pygame.draw.circle(self.image, YELLOW, (x, y), 3)
+            pygame.draw.circle(image, HOT_PINK, (x, y), 6)
+            pygame.draw.circle(image, YELLOW, (x, y), 3)
         
         # Asas
-        pygame.draw.polygon(self.image, PURPLE, [(0, 30), (15, 25), (15, 40)])
-        pygame.draw.polygon(self.image, PURPLE, [(60, 30), (45, 25), (45, 40)])
+        pygame.draw.polygon(image, PURPLE, [(0, 30), (15, 25), (15, 40)])
+        pygame.draw.polygon(image, PURPLE, [(60, 30), (45, 25), (45, 40)])
         
         # Mudar cor baseado na arma
-        weapon_colors = {
-            WeaponType.BASIC: CYAN,
-            WeaponType.SPREAD: YELLOW,
-            WeaponType.RAPID: NEON_GREEN,
-            WeaponType.LASER_BEAM: PURPLE,
-            WeaponType.HOMING: HOT_PINK
-        }
-        
         # Destacar a arma atual
-        weapon_color = weapon_colors.get(self.weapon_type, CYAN)
-        pygame.draw.circle(self.image, weapon_color, (30, 5), 8, 3)
+        pygame.draw.circle(image, color, (30, 5), 8, 3)
         
-    def update(self, dt):
+        # Versão semitransparente para o piscar da invulnerabilidade
+        blink_image = image.copy()
+        blink_image.fill((255, 255, 255, 128), special_flags=pygame.BLEND_RGBA_MULT)
+        return image, blink_image
+    
+    def sprite(self):
+        """Imagem deste quadro: pisca (meia opacidade) enquanto invulnerável"""
+        if self.invulnerable > 0 and int(self.invulnerable * 10) % 2:
+            return self.blink_image
+        return self.image
+        
+    def update(self, dt, move=None):
         # Atualizar timer da arma
         if self.weapon_timer > 0:
             self.weapon_timer -= dt
@@ -435,12 +847,14 @@ class Player(pygame.sprite.Sprite):
         self.trail.add_point(self.rect.centerx, self.rect.centery)
         
         # Movimento - AUMENTADO A VELOCIDADE DE 8 PARA 12
+        # move: -1 esquerda, 1 direita, 0 parado; None lê o teclado
+        if move is None:
+            move = read_move_input()
         self.speed_x = 0
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
+        if move < 0:
             self.speed_x = -12  # AUMENTADO DE 8 PARA 12
             self.angle = -math.pi/2 - 0.3
-        elif keys[pygame.K_RIGHT]:
+        elif move > 0:
             self.speed_x = 12   # AUMENTADO DE 8 PARA 12
             self.angle = -math.pi/2 + 0.3
         else:
@@ -454,15 +868,7 @@ class Player(pygame.sprite.Sprite):
         if self.rect.right > SCREEN_WIDTH:
             self.rect.right = SCREEN_WIDTH
             
-        # Recarregar tiro baseado na arma
-        cooldowns = {
-            WeaponType.BASIC: 10,
-            WeaponType.SPREAD: 15,
-            WeaponType.RAPID: 3,
-            WeaponType.LASER_BEAM: 8,
-            WeaponType.HOMING: 20
-        }
-        
+        # Recarregar tiro
         if self.shoot_cooldown > 0:
             self.shoot_cooldown -= dt * 60
             
@@ -476,58 +882,63 @@ class Player(pygame.sprite.Sprite):
             
     def shoot(self, sound_manager, bullets):
         if self.shoot_cooldown <= 0:
-            cooldowns = {
-                WeaponType.BASIC: 10,
-                WeaponType.SPREAD: 15,
-                WeaponType.RAPID: 3,
-                WeaponType.LASER_BEAM: 8,
-                WeaponType.HOMING: 20
-            }
-            
-            self.shoot_cooldown = cooldowns[self.weapon_type]
+            weapon_type = self.weapon_type
+            weapon = weapon_type._value_
+            self.shoot_cooldown = WEAPONS.cooldown[weapon]
             sound_manager.play('laser')
+            TELEMETRY.publish('shoot', weapon=weapon_type.name, x=self.rect.centerx)
             
-            # Criar balas baseado no tipo de arma
-            if self.weapon_type == WeaponType.BASIC:
-                bullets.append(Bullet(self.rect.centerx, self.rect.top, self.weapon_type))
-            elif self.weapon_type == WeaponType.SPREAD:
-                # Três balas em formação de leque
-                for angle in [-0.3, 0, 0.3]:
-                    bullet = Bullet(self.rect.centerx, self.rect.top, self.weapon_type)
-                    bullet.vx = math.sin(angle) * 5
-                    bullet.vy = -math.cos(angle) * 15
-                    bullets.append(bullet)
-            elif self.weapon_type == WeaponType.RAPID:
-                # Uma bala rápida
-                bullets.append(Bullet(self.rect.centerx, self.rect.top, self.weapon_type))
-            elif self.weapon_type == WeaponType.LASER_BEAM:
-                # Laser contínuo
-                bullets.append(Bullet(self.rect.centerx, self.rect.top, self.weapon_type))
-            elif self.weapon_type == WeaponType.HOMING:
-                # Míssil teleguiado
-                bullets.append(Bullet(self.rect.centerx, self.rect.top, self.weapon_type))
+            # Uma bala por ângulo do padrão da arma (o SPREAD abre em leque)
+            x, y = self.rect.centerx, self.rect.top
+            for vx, vy in WEAPONS.velocities[weapon]:
+                bullets.append(Bullet(x, y, weapon_type, vx, vy))
+    
+    def is_out(self):
+        """Sem vidas ou sem saúde: fora da partida"""
+        return self.lives <= 0 or self.health <= 0
     
     def change_weapon(self, weapon_type):
         self.weapon_type = weapon_type
         self.weapon_timer = 10.0  # 10 segundos de power-up
         self.draw_spaceship()
     
+    @classmethod
+    def build_shield_frames(cls):
+        """Pré-renderiza um ciclo da pulsação do escudo (raio e alfa por fase)"""
+        frames = [ASSETS.image('shield', cls.SHIELD_RADIUS, phase) for phase in range(cls.SHIELD_PHASES)]
+        if None in frames:
+            frames = cls.render_shield_frames()
+        cls.shield_frames = frames
+        return frames
+    
+    @classmethod
+    def render_shield_frames(cls):
+        size = cls.SHIELD_RADIUS * 2 + 2
+        center = (cls.SHIELD_RADIUS + 1, cls.SHIELD_RADIUS + 1)
+        frames = []
+        for phase in range(cls.SHIELD_PHASES):
+            pulse = math.sin(2 * math.pi * phase / cls.SHIELD_PHASES) * 0.2 + 0.8
+            frame = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(frame, (*CYAN, int(100 * pulse)), center, int(cls.SHIELD_RADIUS * pulse), 3)
+            frames.append(frame)
+        return frames
+    
     def draw_shield(self, surface):
         if self.shield_active:
-            pulse = math.sin(self.shield_timer * 10) * 0.2 + 0.8
-            radius = int(40 * pulse)
-            alpha = int(100 * pulse)
-            
-            shield_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            pygame.draw.circle(shield_surf, (*CYAN, alpha), self.rect.center, radius, 3)
-            surface.blit(shield_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+            frames = self.shield_frames or self.build_shield_frames()
+            # sin(timer * 10): um ciclo a cada 2π/10 segundos
+            phase = int(self.shield_timer * 10 / (2 * math.pi) * self.SHIELD_PHASES) % self.SHIELD_PHASES
+            offset = self.SHIELD_RADIUS + 1
+            surface.blit(frames[phase], (self.rect.centerx - offset, self.rect.centery - offset),
+                         special_flags=pygame.BLEND_ADD)
 
 class Asteroid(pygame.sprite.Sprite):
     """Asteroide com movimento contínuo"""
     __slots__ = ['image', 'rect', 'size', 'speed_y', 'speed_x', 'rotation', 'rotation_speed', 
-                 'health', 'max_health', 'id', 'cracks', 'energy_core', 'original_image', 'size_category']
+                 'health', 'max_health', 'id', 'cracks', 'energy_core', 'original_image', 'size_category',
+                 'handle', 'rendered_angle', 'shape_seed', 'sprite']
     
-    def __init__(self, size_category=1):
+    def __init__(self, size_category=1, size=None):
         super().__init__()
         # Tamanho baseado na categoria (1=pequeno, 2=médio, 3=grande)
         self.size_category = size_category
@@ -540,6 +951,8 @@ class Asteroid(pygame.sprite.Sprite):
         else:
             self.size = random.randint(60, 80)
             self.health = 3
+        if size is not None:
+            self.size = size  # Réplica de um asteroide remoto (co-op)
             
         self.rect = pygame.Rect(0, 0, self.size*2, self.size*2)
         
@@ -548,12 +961,15 @@ class Asteroid(pygame.sprite.Sprite):
         self.speed_x = random.uniform(-1, 1)
         self.rotation = 0
         self.rotation_speed = random.uniform(-2, 2)
+        self.rendered_angle = None  # Ângulo da imagem girada atual (None = refazer)
+        self.sprite = None  # Imagem própria (só os asteroides da horda usam o AsteroidAtlas)
         self.max_health = self.health
         self.id = id(self)
         self.cracks = []
         self.energy_core = random.choice([True, False])
         
-        # Criar imagem original
+        # Criar imagem original (a forma sai de uma semente própria e pode ser refeita)
+        self.shape_seed = random.getrandbits(32)
         self.original_image = pygame.Surface((self.size*2, self.size*2), pygame.SRCALPHA)
         self.draw_asteroid()
         self.image = self.original_image.copy()
@@ -562,15 +978,71 @@ class Asteroid(pygame.sprite.Sprite):
         self.rect.x = random.randint(0, SCREEN_WIDTH - self.size)
         self.rect.y = random.randint(-100, -40)
         
+    @classmethod
+    def from_state(cls, size_category, size, shape_seed, energy_core, original_image=None, sprite=None):
+        """Asteroide com a forma dada, sem consumir o random do jogo (restauração de estado)
+        
+        `original_image` pode ser a imagem de outro asteroide com a mesma forma:
+        ela nunca é desenhada no lugar (rachaduras e rotação desenham em cópias).
+        Com `sprite` (índice no AsteroidAtlas) o asteroide não tem imagem própria.
+        """
+        asteroid = cls.__new__(cls)
+        pygame.sprite.Sprite.__init__(asteroid)
+        asteroid.size_category = size_category
+        asteroid.size = size
+        asteroid.shape_seed = shape_seed
+        asteroid.energy_core = energy_core
+        asteroid.id = id(asteroid)
+        asteroid.cracks = []
+        asteroid.rendered_angle = None
+        asteroid.sprite = sprite
+        asteroid.rect = pygame.Rect(0, 0, size*2, size*2)
+        if sprite is not None:
+            asteroid.original_image = asteroid.image = None
+            return asteroid
+        if original_image is None:
+            asteroid.original_image = pygame.Surface((size*2, size*2), pygame.SRCALPHA)
+            asteroid.draw_asteroid()
+        else:
+            asteroid.original_image = original_image
+        asteroid.image = asteroid.original_image
+        return asteroid
+    
+    @classmethod
+    def horde(cls, size_category, x, y):
+        """Asteroide do modo horda com centro em (x, y): forma e imagens vêm do AsteroidAtlas"""
+        shape = random.randrange(AsteroidAtlas.SHAPES)
+        energy_core = random.random() < 0.5
+        asteroid = cls.from_state(size_category, AsteroidAtlas.SIZES[size_category],
+                                  AsteroidAtlas.shape_seed(size_category, shape), energy_core,
+                                  sprite=AsteroidAtlas.sprite(size_category, shape, energy_core))
+        asteroid.health = asteroid.max_health = size_category
+        asteroid.speed_y = random.uniform(1, 2 + size_category)
+        asteroid.speed_x = random.uniform(-1, 1)
+        asteroid.rotation = 0
+        asteroid.rotation_speed = random.uniform(-2, 2)
+        asteroid.rect.center = (x, y)
+        return asteroid
+    
+    def split(self, x, y):
+        """Dois fragmentos da categoria abaixo, abrindo para os lados a partir de (x, y)"""
+        fragments = []
+        for direction in (-1, 1):
+            fragment = Asteroid.horde(self.size_category - 1, x, y)
+            fragment.speed_x = direction * random.uniform(1, 3)
+            fragments.append(fragment)
+        return fragments
+    
     def draw_asteroid(self):
         center = (self.size, self.size)
+        shape = random.Random(self.shape_seed)
         
         # Base do asteroide
         points = []
         num_points = 12
         for i in range(num_points):
             angle = (2 * math.pi * i) / num_points
-            radius = self.size * random.uniform(0.8, 1.0)
+            radius = self.size * shape.uniform(0.8, 1.0)
             x = center[0] + radius * math.cos(angle)
             y = center[1] + radius * math.sin(angle)
             points.append((x, y))
@@ -580,10 +1052,10 @@ class Asteroid(pygame.sprite.Sprite):
         
         # Adiciona textura com cristais
         for _ in range(int(self.size/8)):
-            crystal_x = random.randint(int(self.size*0.3), int(self.size*1.7))
-            crystal_y = random.randint(int(self.size*0.3), int(self.size*1.7))
-            crystal_size = random.randint(3, int(self.size/6))
-            color = random.choice([CYAN, NEON_GREEN, HOT_PINK])
+            crystal_x = shape.randint(int(self.size*0.3), int(self.size*1.7))
+            crystal_y = shape.randint(int(self.size*0.3), int(self.size*1.7))
+            crystal_size = shape.randint(3, max(3, int(self.size/6)))
+            color = shape.choice([CYAN, NEON_GREEN, HOT_PINK])
             pygame.draw.circle(self.original_image, color, (crystal_x, crystal_y), crystal_size)
         
         # Núcleo de energia para alguns asteroides
@@ -591,31 +1063,53 @@ class Asteroid(pygame.sprite.Sprite):
             pygame.draw.circle(self.original_image, YELLOW, center, int(self.size*0.3))
             pygame.draw.circle(self.original_image, WHITE, center, int(self.size*0.3), 2)
             
-    def add_crack(self):
+    def add_crack(self, rng=random):
         if len(self.cracks) < 5:
-            start_x = random.randint(int(self.size*0.3), int(self.size*1.7))
-            start_y = random.randint(int(self.size*0.3), int(self.size*1.7))
-            length = random.randint(int(self.size*0.2), int(self.size*0.5))
-            angle = random.uniform(0, 2 * math.pi)
+            start_x = rng.randint(int(self.size*0.3), int(self.size*1.7))
+            start_y = rng.randint(int(self.size*0.3), int(self.size*1.7))
+            length = rng.randint(int(self.size*0.2), int(self.size*0.5))
+            angle = rng.uniform(0, 2 * math.pi)
             
             end_x = start_x + length * math.cos(angle)
             end_y = start_y + length * math.sin(angle)
             
             self.cracks.append(((start_x, start_y), (end_x, end_y)))
             
-            # Redesenhar asteroide com rachaduras
-            self.image = self.original_image.copy()
-            for crack in self.cracks:
-                pygame.draw.line(self.image, RED, crack[0], crack[1], 2)
+            if self.sprite is None:
+                self.draw_cracks()
+    
+    def draw_cracks(self):
+        # Redesenhar asteroide com rachaduras
+        self.image = self.original_image.copy()
+        for crack in self.cracks:
+            pygame.draw.line(self.image, RED, crack[0], crack[1], 2)
+        self.rendered_angle = None
             
     def update(self, dt):
         # Atualizar posição
         self.rect.y += self.speed_y * dt * 60
         self.rect.x += self.speed_x * dt * 60
+        self.animate(dt)
+        
+        # Remover se sair da tela
+        if self.rect.top > SCREEN_HEIGHT:
+            self.kill()
+    
+    def animate(self, dt, render=True):
         self.rotation += self.rotation_speed * dt * 60
+        if render:
+            self.render_rotation()
+    
+    def render_rotation(self):
+        # Em qualidade reduzida o ângulo é arredondado e a imagem anterior reaproveitada
+        step = QUALITY.rotation_step
+        angle = round(self.rotation / step) * step % 360 if step else self.rotation
+        if angle == self.rendered_angle:
+            return
+        self.rendered_angle = angle
         
         # Girar o asteroide
-        rotated_image = pygame.transform.rotate(self.original_image, self.rotation)
+        rotated_image = pygame.transform.rotate(self.original_image, angle)
         self.rect = rotated_image.get_rect(center=self.rect.center)
         self.image = rotated_image.copy()
         
@@ -623,20 +1117,74 @@ class Asteroid(pygame.sprite.Sprite):
         if self.cracks:
             for crack in self.cracks:
                 pygame.draw.line(self.image, RED, crack[0], crack[1], 2)
-        
-        # Remover se sair da tela
-        if self.rect.top > SCREEN_HEIGHT:
-            self.kill()
             
     def hit(self, damage=1):
         self.health -= damage
         self.add_crack()
-        if self.health <= 0:
-            return True
-        return False
+        destroyed = self.health <= 0
+        TELEMETRY.publish('asteroid_hit', size=self.size_category, damage=damage, destroyed=destroyed)
+        return destroyed
+
+class AsteroidAtlas:
+    """Asteroides pré-girados do modo horda (desenho instanciado)
+    
+    Para cada categoria há SHAPES formas, com e sem núcleo de energia, cada
+    uma girada em ANGLES ângulos; as imagens do sprite s ficam em
+    images[s * ANGLES:(s + 1) * ANGLES]. Milhares de asteroides desenham com
+    um único Surface.blits sem girar nem copiar nada por quadro. Criado no
+    primeiro desenho (a simulação headless só usa os índices).
+    """
+    SHAPES = 4
+    ANGLES = 24
+    SIZES = {1: 10, 2: 15, 3: 22}  # Raio por categoria: bem menores que os da partida normal
+    instance = None
+    
+    def __init__(self):
+        self.images = []
+        half_w = []
+        half_h = []
+        for category in self.SIZES:
+            for shape in range(self.SHAPES):
+                for energy_core in (False, True):
+                    asteroid = Asteroid.from_state(category, self.SIZES[category],
+                                                   self.shape_seed(category, shape), energy_core)
+                    for step in range(self.ANGLES):
+                        image = pygame.transform.rotate(asteroid.original_image, step * 360 / self.ANGLES)
+                        if pygame.display.get_surface() is not None:
+                            image = image.convert_alpha()
+                        self.images.append(image)
+                        half_w.append(image.get_width() // 2)
+                        half_h.append(image.get_height() // 2)
+        self.half_w = np.array(half_w, dtype=np.float32)
+        self.half_h = np.array(half_h, dtype=np.float32)
+    
+    @classmethod
+    def get(cls):
+        if cls.instance is None:
+            cls.instance = cls()
+        return cls.instance
+    
+    @classmethod
+    def shape_seed(cls, category, shape):
+        return category * cls.SHAPES + shape
+    
+    @classmethod
+    def sprite(cls, category, shape, energy_core):
+        return ((category - 1) * cls.SHAPES + shape) * 2 + energy_core
+    
+    def draw_list(self, sprites, angles, xs, ys):
+        """Pares (imagem, canto) para Surface.blits, em bloco a partir dos arrays do EntityStore"""
+        step = 360 / self.ANGLES
+        frames = sprites * self.ANGLES + np.rint(angles / step).astype(np.int64) % self.ANGLES
+        lefts = (xs - self.half_w[frames]).astype(np.int32).tolist()
+        tops = (ys - self.half_h[frames]).astype(np.int32).tolist()
+        images = self.images
+        return [(images[frame], (left, top)) for frame, left, top in zip(frames.tolist(), lefts, tops)]
 
 class WaveManager:
     """Gerenciador de waves de asteroides"""
+    splits = False  # Asteroides destruídos se partem em fragmentos (modo horda)
+    
     def __init__(self):
         self.current_wave = 1
         self.asteroids_in_wave = 3  # REDUZIDO para começar com menos asteroides
@@ -654,7 +1202,14 @@ class WaveManager:
         self.wave_complete = False
         self.wave_timer = 0
         self.spawn_timer = 0
+        TELEMETRY.publish('wave_start', wave=self.current_wave, asteroids=self.asteroids_in_wave)
         
+    def spawn(self, dt, live=0):
+        """Asteroides a criar neste tick (`live`: entidades vivas, usado pela horda)"""
+        if self.should_spawn_asteroid(dt):
+            return [Asteroid(self.get_asteroid_size())]
+        return []
+    
     def should_spawn_asteroid(self, dt):
         if self.wave_complete:
             self.wave_timer += dt
@@ -682,6 +1237,966 @@ class WaveManager:
         else:
             return random.choice([1, 2, 3])  # Todos os tamanhos
 
+class HordeManager(WaveManager):
+    """Modo horda: asteroides sem fim, a uma taxa dada por uma curva (segundos -> asteroides/s)
+    
+    A taxa é interpolada linearmente entre os pontos de `curve` e fica no
+    último valor depois dele; o total de entidades vivas não passa de
+    `max_asteroids`. Os asteroides usam o AsteroidAtlas e se partem em dois
+    fragmentos menores ao serem destruídos. Os campos do WaveManager são
+    reaproveitados (e com eles o formato do WorldSnapshot): wave_timer é o
+    tempo de horda, spawn_timer a fração acumulada do próximo asteroide e
+    current_wave sobe a cada HORDE_WAVE_SECONDS.
+    """
+    splits = True
+    
+    def __init__(self, curve=HORDE_CURVE, max_asteroids=HORDE_MAX_ASTEROIDS):
+        super().__init__()
+        self.curve = tuple(curve)
+        self.max_asteroids = max_asteroids
+    
+    def rate(self, elapsed):
+        """Asteroides por segundo após `elapsed` segundos de horda"""
+        curve = self.curve
+        if elapsed <= curve[0][0]:
+            return curve[0][1]
+        for (t0, rate0), (t1, rate1) in zip(curve, curve[1:]):
+            if elapsed < t1:
+                return rate0 + (rate1 - rate0) * (elapsed - t0) / (t1 - t0)
+        return curve[-1][1]
+    
+    def spawn(self, dt, live=0):
+        self.wave_timer += dt
+        wave = 1 + int(self.wave_timer // HORDE_WAVE_SECONDS)
+        if wave != self.current_wave:
+            self.current_wave = wave
+            TELEMETRY.publish('wave_start', wave=wave, asteroids=live)
+        self.spawn_timer += self.rate(self.wave_timer) * dt
+        count = int(self.spawn_timer)
+        self.spawn_timer -= count
+        count = max(0, min(count, self.max_asteroids - live))
+        self.asteroids_spawned += count
+        return [Asteroid.horde(self.get_asteroid_size(), random.uniform(0, SCREEN_WIDTH), random.uniform(-60, -20))
+                for _ in range(count)]
+    
+    def get_asteroid_size(self):
+        return random.choice((1, 1, 2, 3))
+
+# Tipos de entidade no EntityStore
+ENTITY_ASTEROID = 1
+ENTITY_POWERUP = 2
+
+class EntityStore:
+    """Armazenamento contíguo de entidades (substitui os pygame.sprite.Group)
+    
+    Cada componente (posição, velocidade, meia-largura/altura, raio de
+    colisão, tipo) fica num array NumPy tipado, indexado pelo slot da
+    entidade. O objeto de cada slot (Asteroid, PowerUp) continua guardando a
+    imagem e o estado de jogo. Handles carregam a geração do slot, então um
+    handle de uma entidade removida nunca aponta para a que reusou o slot.
+    A geração dá a volta em GENERATION_MASK para o handle caber em 32 bits
+    (é assim que ele vai nos snapshots da rede).
+    
+    Entidades com `sprite` (asteroides da horda) giram nos arrays (angle,
+    spin) e são desenhadas em bloco pelo AsteroidAtlas; por quadro só o
+    centro do rect delas é atualizado. Com muitos pares a testar,
+    collide_boxes usa uma grade uniforme em vez de todas contra todas.
+    """
+    INDEX_BITS = 20
+    INDEX_MASK = (1 << INDEX_BITS) - 1
+    GENERATION_MASK = (1 << (32 - INDEX_BITS)) - 1
+    COMPONENTS = ('x', 'y', 'vx', 'vy', 'half_w', 'half_h', 'radius', 'kind', 'alive', 'generation',
+                  'angle', 'spin', 'sprite')
+    GRID_CELL = 64   # Lado da célula da grade de colisão (pixels)
+    GRID_MIN_PAIRS = 50000  # Pares caixa x entidade a partir dos quais a grade compensa
+    
+    def __init__(self, capacity=64):
+        self.capacity = 0
+        self.high_water = 0  # Slots acima deste índice nunca foram usados
+        self.count = 0
+        self.objects = []
+        self.free_slots = []
+        self.x = np.zeros(0, dtype=np.float32)
+        self.y = np.zeros(0, dtype=np.float32)
+        self.vx = np.zeros(0, dtype=np.float32)
+        self.vy = np.zeros(0, dtype=np.float32)
+        self.half_w = np.zeros(0, dtype=np.float32)
+        self.half_h = np.zeros(0, dtype=np.float32)
+        self.radius = np.zeros(0, dtype=np.float32)
+        self.kind = np.zeros(0, dtype=np.int8)
+        self.alive = np.zeros(0, dtype=bool)
+        self.generation = np.zeros(0, dtype=np.uint32)
+        self.angle = np.zeros(0, dtype=np.float32)
+        self.spin = np.zeros(0, dtype=np.float32)
+        self.sprite = np.zeros(0, dtype=np.int16)
+        self.grow(capacity)
+    
+    def grow(self, capacity):
+        """Aumenta todos os arrays de componentes para `capacity` slots"""
+        extra = capacity - self.capacity
+        for name in self.COMPONENTS:
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate((array, np.zeros(extra, dtype=array.dtype))))
+        self.objects.extend([None] * extra)
+        self.free_slots.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+    
+    def __len__(self):
+        return self.count
+    
+    def spawn(self, obj, kind, collide_ratio=0.7):
+        """Adiciona `obj` (com rect e speed_x/speed_y) e retorna seu handle"""
+        if not self.free_slots:
+            self.grow(self.capacity * 2)
+        index = self.free_slots.pop()
+        self.high_water = max(self.high_water, index + 1)
+        
+        rect = obj.rect
+        self.x[index], self.y[index] = rect.center
+        self.vx[index] = obj.speed_x
+        self.vy[index] = obj.speed_y
+        self.half_w[index] = rect.width / 2
+        self.half_h[index] = rect.height / 2
+        # Mesmo raio de pygame.sprite.collide_circle_ratio, calculado uma única vez
+        self.radius[index] = 0.5 * math.hypot(rect.width, rect.height) * collide_ratio
+        self.kind[index] = kind
+        sprite = getattr(obj, 'sprite', None)
+        if sprite is None:
+            self.sprite[index] = -1
+        else:
+            self.sprite[index] = sprite
+            self.angle[index] = obj.rotation
+            self.spin[index] = obj.rotation_speed
+        self.alive[index] = True
+        self.objects[index] = obj
+        self.count += 1
+        
+        handle = (int(self.generation[index]) << self.INDEX_BITS) | index
+        obj.handle = handle
+        return handle
+    
+    def is_alive(self, handle):
+        index = handle & self.INDEX_MASK
+        return (index < self.capacity and self.alive[index]
+                and int(self.generation[index]) == handle >> self.INDEX_BITS)
+    
+    def get(self, handle):
+        """Objeto do handle, ou None se a entidade já foi removida"""
+        return self.objects[handle & self.INDEX_MASK] if self.is_alive(handle) else None
+    
+    def kill(self, handle):
+        """Remove a entidade; retorna False se o handle já era inválido"""
+        if not self.is_alive(handle):
+            return False
+        self.release(handle & self.INDEX_MASK)
+        return True
+    
+    def release(self, index):
+        self.alive[index] = False
+        self.objects[index] = None
+        self.generation[index] = (int(self.generation[index]) + 1) & self.GENERATION_MASK
+        self.free_slots.append(index)
+        self.count -= 1
+    
+    def clear(self):
+        for index in self.live_indices().tolist():
+            self.release(index)
+    
+    def live_indices(self, kind=None):
+        """Índices ocupados (opcionalmente só de um tipo), em ordem de slot"""
+        alive = self.alive[:self.high_water]
+        if kind is not None:
+            alive = alive & (self.kind[:self.high_water] == kind)
+        return alive.nonzero()[0]
+    
+    def live_objects(self, kind=None):
+        objects = self.objects
+        return [objects[i] for i in self.live_indices(kind).tolist()]
+    
+    def update(self, dt, render=True):
+        """Move todas as entidades de uma vez, remove as que saíram da tela e anima as restantes
+        
+        Com render=False (simulação headless) as imagens não são giradas.
+        """
+        n = self.high_water
+        step = dt * 60
+        self.x[:n] += self.vx[:n] * step
+        self.y[:n] += self.vy[:n] * step
+        self.angle[:n] += self.spin[:n] * step
+        
+        offscreen = self.alive[:n] & (self.y[:n] - self.half_h[:n] > SCREEN_HEIGHT)
+        for index in offscreen.nonzero()[0].tolist():
+            self.release(index)
+        
+        # Instanciados: só o centro do rect (a rotação fica nos arrays)
+        alive = self.alive[:n]
+        instanced = alive & (self.sprite[:n] >= 0)
+        objects = self.objects
+        if instanced.any():
+            indices = instanced.nonzero()[0]
+            for index, x, y in zip(indices.tolist(), self.x[indices].tolist(), self.y[indices].tolist()):
+                objects[index].rect.center = (x, y)
+            alive = alive & ~instanced
+        
+        # Sincronizar rects e animar (rotação dos asteroides, pulso dos power-ups)
+        indices = alive.nonzero()[0].tolist()
+        xs = self.x[indices].tolist()
+        ys = self.y[indices].tolist()
+        if not render:
+            # Sem rotação os rects não mudam de tamanho
+            for index, x, y in zip(indices, xs, ys):
+                obj = objects[index]
+                obj.rect.center = (x, y)
+                obj.animate(dt, False)
+            return
+        half_w = []
+        half_h = []
+        for index, x, y in zip(indices, xs, ys):
+            obj = objects[index]
+            obj.rect.center = (x, y)
+            obj.animate(dt, render)
+            half_w.append(obj.rect.width / 2)
+            half_h.append(obj.rect.height / 2)
+        self.half_w[indices] = half_w
+        self.half_h[indices] = half_h
+    
+    def draw_list(self):
+        """Pares (imagem, rect ou canto) prontos para Surface.blits"""
+        n = self.high_water
+        sprites = self.sprite[:n]
+        alive = self.alive[:n]
+        objects = self.objects
+        pairs = [(objects[i].image, objects[i].rect) for i in (alive & (sprites < 0)).nonzero()[0].tolist()]
+        instanced = (alive & (sprites >= 0)).nonzero()[0]
+        if len(instanced):
+            pairs += AsteroidAtlas.get().draw_list(sprites[instanced], self.angle[instanced],
+                                                   self.x[instanced], self.y[instanced])
+        return pairs
+    
+    def collide_circle(self, x, y, radius, kind):
+        """Índices de `kind` cujo círculo de colisão toca o círculo dado"""
+        indices = self.live_indices(kind)
+        dx = self.x[indices] - x
+        dy = self.y[indices] - y
+        reach = self.radius[indices] + radius
+        return indices[dx * dx + dy * dy <= reach * reach]
+    
+    def collide_boxes(self, xs, ys, half_w, half_h, kind):
+        """Índices de `kind` e matriz (caixas x entidades) de sobreposição AABB"""
+        indices = self.live_indices(kind)
+        xs = np.asarray(xs, dtype=np.float32)[:, None]
+        ys = np.asarray(ys, dtype=np.float32)[:, None]
+        half_w = np.asarray(half_w, dtype=np.float32).reshape(-1, 1)
+        half_h = np.asarray(half_h, dtype=np.float32).reshape(-1, 1)
+        if len(indices) * len(xs) >= self.GRID_MIN_PAIRS:
+            return indices, self.grid_overlaps(indices, xs[:, 0], ys[:, 0],
+                                               np.broadcast_to(half_w[:, 0], len(xs)),
+                                               np.broadcast_to(half_h[:, 0], len(xs)))
+        overlap_x = np.abs(self.x[indices] - xs) < self.half_w[indices] + half_w
+        overlap_y = np.abs(self.y[indices] - ys) < self.half_h[indices] + half_h
+        return indices, overlap_x & overlap_y
+    
+    def grid_overlaps(self, indices, xs, ys, half_w, half_h):
+        """Mesma matriz de collide_boxes, testando só pares em células vizinhas de uma grade uniforme
+        
+        As entidades vão para a célula do centro (fora da tela, para a célula
+        da borda) e são ordenadas por célula; como as células de uma linha
+        têm chaves seguidas, cada caixa consulta uma fatia contígua por linha
+        (duas buscas binárias para todas as caixas de uma vez).
+        """
+        cols = SCREEN_WIDTH // self.GRID_CELL + 1
+        rows = SCREEN_HEIGHT // self.GRID_CELL + 1
+        
+        def cells(values, limit):
+            # Truncar em vez de arredondar para baixo só muda células já fora da borda
+            cell = (values * (1 / self.GRID_CELL)).astype(np.int64)
+            return np.clip(cell, 0, limit - 1, out=cell)
+        
+        ex = self.x[indices]
+        ey = self.y[indices]
+        ehw = self.half_w[indices]
+        ehh = self.half_h[indices]
+        keys = cells(ey, rows) * cols + cells(ex, cols)
+        order = np.argsort(keys)
+        keys = keys[order]
+        
+        # Faixa de células de cada caixa, alargada pela maior meia-extensão das entidades
+        reach_x = half_w + ehw.max()
+        reach_y = half_h + ehh.max()
+        col0 = cells(xs - reach_x, cols)
+        col1 = cells(xs + reach_x, cols)
+        row0 = cells(ys - reach_y, rows)
+        row1 = cells(ys + reach_y, rows)
+        
+        # Uma consulta por (caixa, linha)
+        span = row1 - row0 + 1
+        box = np.repeat(np.arange(len(xs)), span)
+        row = row0[box] + np.arange(len(box)) - np.repeat(np.cumsum(span) - span, span)
+        starts = np.searchsorted(keys, row * cols + col0[box], 'left')
+        ends = np.searchsorted(keys, row * cols + col1[box], 'right')
+        counts = ends - starts
+        
+        # Pares candidatos e teste exato
+        pair_box = np.repeat(box, counts)
+        pair = order[np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())]
+        hit = ((np.abs(ex[pair] - xs[pair_box]) < ehw[pair] + half_w[pair_box]) &
+               (np.abs(ey[pair] - ys[pair_box]) < ehh[pair] + half_h[pair_box]))
+        overlaps = np.zeros((len(xs), len(indices)), dtype=bool)
+        overlaps[pair_box[hit], pair[hit]] = True
+        return overlaps
+
+class GameWorld:
+    """Núcleo da simulação: jogadores, asteroides, power-ups, balas e waves
+    
+    Não desenha nada. main(), o modo co-op e os agentes avançam o jogo com
+    step(dt, inputs), onde cada entrada é um par (movimento, atirar) por
+    jogador. Sem sound_manager/particle_system a simulação roda muda e sem
+    partículas; com render=False as imagens dos asteroides não são giradas.
+    Com `horde` (curva de HordeManager) a partida é o modo horda.
+    """
+    POWERUP_INTERVAL = 15.0  # AUMENTADO para 15 segundos
+    
+    def __init__(self, num_players=1, sound_manager=None, particle_system=None, render=True, horde=None):
+        self.sound_manager = sound_manager or SilentSoundManager()
+        self.particle_system = particle_system or ParticleSystem(0)
+        self.render = render
+        self.horde = horde
+        self.entities = EntityStore()
+        self.reset(num_players)
+    
+    def reset(self, num_players=None):
+        """Recomeça a partida do zero"""
+        if num_players is None:
+            num_players = len(self.players)
+        # Naves distribuídas igualmente pela largura da tela
+        self.players = [Player(SCREEN_WIDTH * (i + 1) // (num_players + 1)) for i in range(num_players)]
+        self.entities.clear()
+        self.bullets = []
+        self.wave_manager = WaveManager() if self.horde is None else HordeManager(self.horde)
+        self.score = 0
+        self.powerup_spawn_timer = 0
+        self.game_over = False
+        self.tick = 0
+        self.elapsed = 0.0
+        self.kills = {}  # Nome da arma -> asteroides destruídos
+    
+    @property
+    def player(self):
+        return self.players[0]
+    
+    def snapshot(self):
+        """Estado completo da partida (WorldSnapshot), para restore()"""
+        return WorldSnapshot.capture(self)
+    
+    def restore(self, snapshot):
+        """Volta a partida ao estado de `snapshot` (WorldSnapshot ou seus bytes)"""
+        if not isinstance(snapshot, WorldSnapshot):
+            snapshot = WorldSnapshot(snapshot)
+        snapshot.restore(self)
+    
+    def step(self, dt, inputs=()):
+        """Avança a simulação em `dt` segundos"""
+        self.tick += 1
+        self.elapsed += dt
+        sound_manager = self.sound_manager
+        particle_system = self.particle_system
+        entities = self.entities
+        bullets = self.bullets
+        players = [(player, inputs[i] if i < len(inputs) else (0, False))
+                   for i, player in enumerate(self.players) if not player.is_out()]
+        
+        # Tiros
+        for player, (move, shoot) in players:
+            if shoot:
+                player.shoot(sound_manager, bullets)
+        
+        # Spawn de asteroides baseado em waves
+        wave_manager = self.wave_manager
+        for asteroid in wave_manager.spawn(dt, len(entities)):
+            entities.spawn(asteroid, ENTITY_ASTEROID)
+        
+        # Spawn de power-ups
+        self.powerup_spawn_timer += dt
+        if self.powerup_spawn_timer > self.POWERUP_INTERVAL:
+            self.powerup_spawn_timer = 0
+            weapon_type = random.choice(list(WeaponType))
+            powerup = PowerUp(random.randint(50, SCREEN_WIDTH-50), -40, weapon_type)
+            entities.spawn(powerup, ENTITY_POWERUP)
+        
+        # Atualizar
+        for player, (move, shoot) in players:
+            player.update(dt, move)
+        entities.update(dt, self.render)
+        
+        # Atualizar balas
+        asteroids = entities.live_objects(ENTITY_ASTEROID)
+        for bullet in bullets[:]:
+            bullet.update(asteroids)
+            if not bullet.active:
+                bullets.remove(bullet)
+        
+        # Verificar colisões - balas com asteroides (todas as balas de uma vez)
+        if bullets and asteroids:
+            sizes = [bullet.size for bullet in bullets]
+            indices, overlaps = entities.collide_boxes([bullet.x for bullet in bullets],
+                                                       [bullet.y for bullet in bullets],
+                                                       sizes, sizes, ENTITY_ASTEROID)
+        else:
+            overlaps = ()
+        for bullet, overlap in zip(bullets[:], overlaps):
+            for index in indices[overlap].tolist():
+                asteroid = entities.objects[index]
+                if asteroid is None:
+                    continue  # Já destruído por outra bala neste quadro
+                if asteroid.hit(bullet.damage):
+                    self.score += 20 if asteroid.energy_core else 10
+                    weapon = bullet.weapon_type.name
+                    self.kills[weapon] = self.kills.get(weapon, 0) + 1
+                    sound_manager.play('explosion')
+                    
+                    # Explosão
+                    particle_system.emit(
+                        asteroid.rect.centerx, 
+                        asteroid.rect.centery, 
+                        YELLOW if asteroid.energy_core else ORANGE, 
+                        count=40 if asteroid.energy_core else 30
+                    )
+                    entities.release(index)
+                    if wave_manager.splits and asteroid.size_category > 1:
+                        for fragment in asteroid.split(*asteroid.rect.center):
+                            entities.spawn(fragment, ENTITY_ASTEROID)
+                else:
+                    particle_system.emit(
+                        asteroid.rect.centerx, 
+                        asteroid.rect.centery, 
+                        CYAN, 
+                        count=15
+                    )
+                if bullet in bullets:
+                    bullets.remove(bullet)
+                break
+        
+        for player, _ in players:
+            # Verificar colisões - jogador com asteroides
+            if player.invulnerable <= 0:
+                hits = entities.collide_circle(player.rect.centerx, player.rect.centery,
+                                               player.collide_radius, ENTITY_ASTEROID)
+                for index in hits.tolist():
+                    TELEMETRY.publish('player_hit', x=player.rect.centerx, lives=player.lives - 1,
+                                      asteroid=entities.objects[index].size_category,
+                                      wave=self.wave_manager.current_wave)
+                    entities.release(index)
+                    player.lives -= 1
+                    player.invulnerable = 2.0
+                    player.health = max(0, player.health - 25)
+                    
+                    particle_system.emit(
+                        player.rect.centerx, 
+                        player.rect.centery, 
+                        RED, 
+                        count=40
+                    )
+                    if player.is_out():
+                        break  # Fim de jogo: os outros asteroides do mesmo quadro não tiram mais vidas
+            else:
+                # Recuperar saúde lentamente
+                player.health = min(100, player.health + dt * 5)
+            
+            # Verificar colisões - jogador com power-ups
+            indices, overlaps = entities.collide_boxes([player.rect.centerx], [player.rect.centery],
+                                                       player.rect.width / 2, player.rect.height / 2,
+                                                       ENTITY_POWERUP)
+            for index in indices[overlaps[0]].tolist():
+                powerup = entities.objects[index]
+                entities.release(index)
+                player.change_weapon(powerup.weapon_type)
+                sound_manager.play('powerup')
+                TELEMETRY.publish('powerup', weapon=powerup.weapon_type.name,
+                                  wave=self.wave_manager.current_wave)
+                particle_system.emit(
+                    powerup.rect.centerx,
+                    powerup.rect.centery,
+                    powerup.color,
+                    count=30
+                )
+        
+        # Game over quando nenhuma nave continua na partida
+        if all(player.is_out() for player in self.players):
+            self.game_over = True
+
+class WorldSnapshot:
+    """Estado exato de um GameWorld em formato binário compacto
+    
+    Guarda placar, waves, jogadores, o estado do `random` do jogo, os arrays
+    do EntityStore (em bloco, com slots, gerações e a ordem dos slots livres,
+    então handles antigos continuam valendo), os campos de cada asteroide
+    (inclusive rotação, rachaduras e semente da forma), power-up e bala.
+    restore() não consome o random do jogo: do mesmo snapshot, as mesmas
+    entradas levam à mesma partida (repetir uma wave, save-states, simulações
+    ramificadas de agentes). Restaurar só num mundo do mesmo modo (normal ou
+    horda): a curva da horda é configuração, não estado.
+    
+    `data` é imutável e pode ir para disco (save()/load()). As imagens dos
+    asteroides capturados ficam em `images` e são compartilhadas pelos
+    asteroides restaurados (cópia só ao desenhar rachaduras ou girar); um
+    snapshot lido do disco redesenha cada forma pela semente. O rastro da nave
+    e as partículas são só visuais e não entram no estado.
+    """
+    MAGIC = b'SDWS'
+    VERSION = 2
+    
+    header = struct.Struct('<4sHBI')           # magic, versão, jogadores, armas com abates
+    world = struct.Struct('<IQdd?')            # tick, placar, tempo de jogo, timer de power-up, game over
+    wave = struct.Struct('<IIIdddd?')          # wave, asteroides na wave, já criados, timers, completa
+    kill = struct.Struct('<BI')                # arma, abates
+    player = struct.Struct('<iiBdidddd?dd')    # posição, arma, velocidade, vidas, saúde, recarga, ...
+    random_tail = struct.Struct('<?d')         # gauss_next do random (presente, valor)
+    store = struct.Struct('<IIII')             # capacidade, high water, quantidade, slots livres
+    asteroid = struct.Struct('<IBBI?ddddiiB')  # slot, categoria, tamanho, semente, núcleo, ..., rachaduras
+    crack = struct.Struct('<dddd')
+    powerup = struct.Struct('<IBddd')          # slot, arma, velocidades, pulso
+    count = struct.Struct('<I')
+    bullet = struct.Struct('<ddddBi')          # posição, velocidade, arma, slot do alvo (-1 = nenhum)
+    
+    PLAYER_FIELDS = ('speed_x', 'lives', 'health', 'shoot_cooldown', 'invulnerable', 'angle',
+                     'shield_active', 'shield_timer', 'weapon_timer')
+    WAVE_FIELDS = ('current_wave', 'asteroids_in_wave', 'asteroids_spawned', 'wave_timer', 'spawn_timer',
+                   'spawn_delay', 'time_between_waves', 'wave_complete')
+    ASTEROID_FIELDS = ('speed_x', 'speed_y', 'rotation', 'rotation_speed', 'health', 'max_health')
+    
+    def __init__(self, data, images=None):
+        if data[:4] != self.MAGIC or self.header.unpack_from(data)[1] != self.VERSION:
+            raise ValueError("snapshot inválido ou de outra versão")
+        self.data = bytes(data)
+        self.images = images or {}  # (tamanho, semente, núcleo) -> imagem original
+    
+    @classmethod
+    def capture(cls, world):
+        parts = []
+        images = {}
+        kills = [(WeaponType[name].value, count) for name, count in world.kills.items()]
+        parts.append(cls.header.pack(cls.MAGIC, cls.VERSION, len(world.players), len(kills)))
+        parts.append(cls.world.pack(world.tick, world.score, world.elapsed, world.powerup_spawn_timer,
+                                    world.game_over))
+        parts.append(cls.wave.pack(*attrgetter(*cls.WAVE_FIELDS)(world.wave_manager)))
+        parts.extend(cls.kill.pack(*kill) for kill in kills)
+        player_fields = attrgetter(*cls.PLAYER_FIELDS)
+        for player in world.players:
+            parts.append(cls.player.pack(player.rect.x, player.rect.y, player.weapon_type.value,
+                                         *player_fields(player)))
+        
+        version, internal, gauss_next = random.getstate()
+        parts.append(np.array(internal, dtype=np.uint32).tobytes())
+        parts.append(cls.random_tail.pack(gauss_next is not None, gauss_next or 0.0))
+        
+        # Componentes em bloco: acima de high_water todos os slots estão zerados
+        store = world.entities
+        n = store.high_water
+        parts.append(cls.store.pack(store.capacity, n, store.count, len(store.free_slots)))
+        parts.append(np.array(store.free_slots, dtype=np.uint32).tobytes())
+        parts.extend(getattr(store, name)[:n].tobytes() for name in EntityStore.COMPONENTS)
+        
+        asteroid_fields = attrgetter(*cls.ASTEROID_FIELDS)
+        slots = {}
+        for index in store.live_indices().tolist():
+            obj = store.objects[index]
+            slots[id(obj)] = index
+            if store.kind[index] == ENTITY_ASTEROID:
+                parts.append(cls.asteroid.pack(index, obj.size_category, obj.size, obj.shape_seed,
+                                               obj.energy_core, *asteroid_fields(obj), len(obj.cracks)))
+                parts.extend(cls.crack.pack(*start, *end) for start, end in obj.cracks)
+                if obj.sprite is None:
+                    images[(obj.size, obj.shape_seed, obj.energy_core)] = obj.original_image
+            else:
+                parts.append(cls.powerup.pack(index, obj.weapon_type.value, obj.speed_x, obj.speed_y, obj.pulse))
+        
+        parts.append(cls.count.pack(len(world.bullets)))
+        for bullet in world.bullets:
+            target = slots.get(id(bullet.target), -1) if bullet.target is not None else -1
+            parts.append(cls.bullet.pack(bullet.x, bullet.y, bullet.vx, bullet.vy,
+                                         bullet.weapon_type.value, target))
+        return cls(b''.join(parts), images)
+    
+    def restore(self, world):
+        data = self.data
+        _, _, num_players, num_kills = self.header.unpack_from(data)
+        offset = self.header.size
+        world.tick, world.score, world.elapsed, world.powerup_spawn_timer, world.game_over = \
+            self.world.unpack_from(data, offset)
+        offset += self.world.size
+        
+        wave_manager = world.wave_manager
+        for name, value in zip(self.WAVE_FIELDS, self.wave.unpack_from(data, offset)):
+            setattr(wave_manager, name, value)
+        offset += self.wave.size
+        world.kills = {}
+        for _ in range(num_kills):
+            weapon, count = self.kill.unpack_from(data, offset)
+            world.kills[WeaponType(weapon).name] = count
+            offset += self.kill.size
+        
+        if len(world.players) != num_players:
+            world.players = [Player() for _ in range(num_players)]
+        for player in world.players:
+            x, y, weapon, *fields = self.player.unpack_from(data, offset)
+            offset += self.player.size
+            player.rect.topleft = (x, y)
+            for name, value in zip(self.PLAYER_FIELDS, fields):
+                setattr(player, name, value)
+            if player.weapon_type.value != weapon:
+                player.weapon_type = WeaponType(weapon)
+                player.draw_spaceship()
+            player.trail.points.clear()
+        
+        internal = np.frombuffer(data, dtype=np.uint32, count=625, offset=offset)
+        offset += internal.nbytes
+        has_gauss, gauss_next = self.random_tail.unpack_from(data, offset)
+        offset += self.random_tail.size
+        random.setstate((3, tuple(internal.tolist()), gauss_next if has_gauss else None))
+        
+        capacity, n, count, num_free = self.store.unpack_from(data, offset)
+        offset += self.store.size
+        store = EntityStore(capacity)
+        store.high_water = n
+        store.count = count
+        store.free_slots = np.frombuffer(data, dtype=np.uint32, count=num_free, offset=offset).tolist()
+        offset += num_free * 4
+        for name in EntityStore.COMPONENTS:
+            array = getattr(store, name)
+            chunk = np.frombuffer(data, dtype=array.dtype, count=n, offset=offset)
+            array[:n] = chunk
+            offset += chunk.nbytes
+        
+        objects = store.objects
+        for index in store.live_indices().tolist():
+            x = float(store.x[index])
+            y = float(store.y[index])
+            if store.kind[index] == ENTITY_ASTEROID:
+                index, category, size, seed, energy_core, *fields, num_cracks = \
+                    self.asteroid.unpack_from(data, offset)
+                offset += self.asteroid.size
+                key = (size, seed, energy_core)
+                sprite = int(store.sprite[index])
+                if sprite >= 0:
+                    obj = Asteroid.from_state(category, size, seed, energy_core, sprite=sprite)
+                else:
+                    obj = Asteroid.from_state(category, size, seed, energy_core, self.images.get(key))
+                    self.images[key] = obj.original_image
+                for name, value in zip(self.ASTEROID_FIELDS, fields):
+                    setattr(obj, name, value)
+                for _ in range(num_cracks):
+                    sx, sy, ex, ey = self.crack.unpack_from(data, offset)
+                    obj.cracks.append(((sx, sy), (ex, ey)))
+                    offset += self.crack.size
+                obj.rect.center = (x, y)
+                if sprite < 0:  # Os da horda são desenhados pelo AsteroidAtlas
+                    if world.render:
+                        obj.render_rotation()
+                    elif obj.cracks:
+                        obj.draw_cracks()
+            else:
+                index, weapon, speed_x, speed_y, pulse = self.powerup.unpack_from(data, offset)
+                offset += self.powerup.size
+                obj = PowerUp(x, y, WeaponType(weapon))
+                obj.speed_x, obj.speed_y, obj.pulse = speed_x, speed_y, pulse
+                obj.rect.center = (x, y)
+            obj.handle = (int(store.generation[index]) << EntityStore.INDEX_BITS) | index
+            objects[index] = obj
+        world.entities = store
+        
+        num_bullets, = self.count.unpack_from(data, offset)
+        offset += self.count.size
+        world.bullets = bullets = []
+        for _ in range(num_bullets):
+            x, y, vx, vy, weapon, target = self.bullet.unpack_from(data, offset)
+            offset += self.bullet.size
+            bullet = Bullet(x, y, WeaponType(weapon), vx, vy)
+            bullet.target = objects[target] if target >= 0 else None
+            bullets.append(bullet)
+    
+    def save(self, path):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(self.data)
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+def init_rollout_worker():
+    """Inicializa um processo da pool do Autopilot"""
+    set_telemetry(NullTelemetry())
+    if hasattr(os, 'nice'):
+        # Numa máquina com poucos núcleos as simulações disputam a CPU com o jogo
+        os.nice(AUTOPILOT_WORKER_NICE)
+
+def run_rollouts(data, jobs, horizon, interval, slot=0):
+    """Valor de cada simulação (índice da ação inicial, semente) a partir de um WorldSnapshot
+    
+    Roda num processo da pool do Autopilot ou na própria thread do jogo; o
+    estado do random e a telemetria de quem chama são preservados.
+    """
+    snapshot = WorldSnapshot(data)
+    world = GameWorld(render=False)
+    actions = Autopilot.ACTIONS
+    random_state = random.getstate()
+    telemetry = set_telemetry(NullTelemetry())
+    try:
+        values = []
+        for action, seed in jobs:
+            snapshot.restore(world)
+            random.seed(seed)  # Cada simulação sorteia seu próprio futuro (spawns, tamanhos, power-ups)
+            player = world.players[slot]
+            score, lives = world.score, player.lives
+            inputs = [(0, False)] * len(world.players)
+            move = actions[action]
+            for tick in range(horizon):
+                if tick and tick % interval == 0:
+                    move = random.choice(actions)  # Depois da primeira decisão: jogo aleatório
+                inputs[slot] = move
+                world.step(1 / FPS, inputs)
+                if world.game_over:
+                    break
+            values.append(world.score - score + Autopilot.LIFE_PENALTY * (player.lives - lives))
+        return values
+    finally:
+        set_telemetry(telemetry)
+        random.setstate(random_state)
+
+class Autopilot:
+    """Jogador automático por busca Monte-Carlo em cópias da simulação
+    
+    A cada `interval` ticks tira um WorldSnapshot e, para cada ação (atirar,
+    parado, esquerda, direita), roda `rollouts` simulações de `horizon` ticks
+    em que a ação é mantida por `interval` ticks e depois vêm ações
+    aleatórias, cada uma com um futuro sorteado. Escolhe a ação de maior
+    valor médio: pontos ganhos menos LIFE_PENALTY por vida perdida (empates
+    ficam com a primeira ação, atirar).
+    
+    O planejamento nunca trava o quadro: o jogo segue com a ação anterior
+    até a decisão sair. Com `workers` > 0 as simulações são divididas numa
+    pool de processos (a simulação é Python puro: threads não rodariam em
+    paralelo); com `workers` = 0 elas rodam em act(), uma fatia por quadro,
+    e a decisão fica pronta em `interval` quadros. Serve também de teste de
+    carga e de balanceamento (--autopilot --headless com telemetria).
+    """
+    ACTIONS = ((0, True), (0, False), (-1, False), (1, False))
+    LIFE_PENALTY = 200
+    
+    def __init__(self, rollouts=8, horizon=30, interval=6, workers=0, slot=0, seed=0):
+        self.rollouts = rollouts
+        self.horizon = horizon
+        self.interval = interval
+        self.workers = workers
+        self.slot = slot
+        self.rng = random.Random(seed)  # Sementes das simulações; não mexe no random do jogo
+        self.pool = None
+        if workers:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(workers, initializer=init_rollout_worker)
+        self.action = self.ACTIONS[0]
+        self.ticks = 0
+        self.pending = None   # (tarefas, futures) do planejamento em andamento
+        self.values = None    # Valor médio de cada ação na última decisão
+        self.decisions = 0
+    
+    def act(self, world):
+        """Entrada (movimento, atirar) do jogador `slot` neste tick"""
+        if self.pending is not None:
+            self.continue_plan()
+        if self.ticks % self.interval == 0 and self.pending is None:
+            self.plan(world)
+            self.continue_plan()
+        self.ticks += 1
+        return self.action
+    
+    def plan(self, world):
+        """Começa uma decisão a partir do estado atual de `world`"""
+        data = world.snapshot().data
+        jobs = [(action, self.rng.getrandbits(32))
+                for action in range(len(self.ACTIONS)) for _ in range(self.rollouts)]
+        if self.pool is None:
+            self.pending = (data, jobs, [])  # Valores calculados até agora
+            return
+        chunks = [jobs[i::self.workers] for i in range(self.workers)]
+        self.pending = (chunks, [self.pool.submit(run_rollouts, data, chunk, self.horizon, self.interval, self.slot)
+                                 for chunk in chunks])
+    
+    def continue_plan(self):
+        """Roda a próxima fatia das simulações (ou confere a pool); decide quando todas terminam"""
+        if self.pool is not None:
+            if all(future.done() for future in self.pending[1]):
+                self.decide(*self.pending)
+                self.pending = None
+            return
+        data, jobs, values = self.pending
+        per_tick = -(-len(jobs) // self.interval)
+        done = len(values)
+        values.extend(run_rollouts(data, jobs[done:done + per_tick], self.horizon, self.interval, self.slot))
+        if len(values) == len(jobs):
+            self.decide([jobs], [values])
+            self.pending = None
+    
+    def decide(self, chunks, results):
+        totals = [0.0] * len(self.ACTIONS)
+        counts = [0] * len(self.ACTIONS)
+        for chunk, values in zip(chunks, results):
+            if not isinstance(values, list):
+                values = values.result()
+            for (action, _), value in zip(chunk, values):
+                totals[action] += value
+                counts[action] += 1
+        self.values = [total / max(1, count) for total, count in zip(totals, counts)]
+        self.action = self.ACTIONS[max(range(len(self.ACTIONS)), key=self.values.__getitem__)]
+        self.decisions += 1
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+class RandomPilot:
+    """Jogador aleatório (soak e modo demonstração): movimento e tiro sorteados, mantidos por 1 a 30 ticks"""
+    def __init__(self, rng):
+        self.rng = rng
+        self.action = (0, False)
+        self.hold = 0
+    
+    def act(self, world=None):
+        if self.hold <= 0:
+            rng = self.rng
+            self.action = (rng.choice((-1, 0, 0, 1)), rng.random() < 0.7)
+            self.hold = rng.randint(1, 30)
+        self.hold -= 1
+        return self.action
+
+def check_world(world, particle_system=None):
+    """Invariantes da simulação; retorna a lista de violações (vazia se tudo certo)"""
+    problems = []
+    for i, player in enumerate(world.players):
+        if player.lives < 0:
+            problems.append(f"jogador {i}: {player.lives} vidas")
+        if not 0 <= player.health <= 100:
+            problems.append(f"jogador {i}: saúde {player.health}")
+        if player.rect.left < 0 or player.rect.right > SCREEN_WIDTH:
+            problems.append(f"jogador {i}: fora da tela em x={player.rect.x}")
+    if world.score < 0:
+        problems.append(f"placar negativo: {world.score}")
+    
+    bullets = world.bullets
+    if len(bullets) > SOAK_MAX_BULLETS * len(world.players):
+        problems.append(f"{len(bullets)} balas vivas")
+    if len({id(bullet) for bullet in bullets}) != len(bullets):
+        problems.append("bala repetida na lista")
+    if not all(bullet.active for bullet in bullets):
+        problems.append("bala inativa na lista")
+    if particle_system is not None and len(particle_system.particles) > particle_system.max_particles:
+        problems.append(f"{len(particle_system.particles)} partículas vivas")
+    
+    # Consistência do EntityStore: contagem, slots livres e objetos dos slots
+    entities = world.entities
+    if len(entities) > SOAK_MAX_ENTITIES:
+        problems.append(f"{len(entities)} entidades vivas")
+    alive = entities.alive
+    if int(alive.sum()) != entities.count:
+        problems.append(f"count={entities.count}, mas {int(alive.sum())} slots vivos")
+    if len(set(entities.free_slots)) != len(entities.free_slots) or \
+            len(entities.free_slots) + entities.count != entities.capacity:
+        problems.append("lista de slots livres inconsistente")
+    if any(alive[index] for index in entities.free_slots):
+        problems.append("slot vivo na lista de livres")
+    if any((obj is not None) != alive[index] for index, obj in enumerate(entities.objects)):
+        problems.append("objeto em slot morto (ou slot vivo sem objeto)")
+    return problems
+
+def soak_world(seed, ticks, check_every=SOAK_CHECK_EVERY):
+    """Joga `ticks` quadros sem janela com entradas aleatórias; retorna o relatório
+    
+    Repete o que main() faz a cada quadro (step, partículas, rastro e reset
+    no game over) com movimento e tiro sorteados e, de vez em quando, um dt
+    de quadro travado. A cada `check_every` ticks e em todo game over confere
+    check_world(). A memória (blocos alocados pelo Python, depois de um
+    gc.collect()) é medida logo após cada reset, quando o estado é mínimo:
+    crescimento acima de SOAK_LEAK_SLACK entre a segunda e a última partida
+    conta como vazamento (a primeira aquece os caches). O estado do random de
+    quem chama é preservado.
+    """
+    import gc
+    rng = random.Random(seed)
+    pilot = RandomPilot(rng)
+    random_state = random.getstate()
+    random.seed(seed)
+    particle_system = ParticleSystem(500)
+    world = GameWorld(particle_system=particle_system, render=False)
+    violations = []
+    memory = []  # (tick, blocos alocados) após cada reset
+    games = best_score = best_wave = 0
+    tick = 0
+    try:
+        while tick < ticks and len(violations) < 10:
+            tick += 1
+            action = pilot.act()
+            dt = 1 / FPS if rng.random() < 0.99 else rng.uniform(0.0, 0.25)
+            world.step(dt, [action])
+            particle_system.update(dt)
+            world.player.trail.update()
+            if tick % check_every == 0 or world.game_over:
+                violations.extend(f"tick {tick}: {problem}" for problem in check_world(world, particle_system))
+            if world.game_over:
+                games += 1
+                best_score = max(best_score, world.score)
+                best_wave = max(best_wave, world.wave_manager.current_wave)
+                particle_system.particles.clear()
+                world.reset()
+                gc.collect()
+                memory.append((tick, sys.getallocatedblocks()))
+    finally:
+        random.setstate(random_state)
+    
+    growth = memory[-1][1] - memory[1][1] if len(memory) > 2 else 0
+    if growth > SOAK_LEAK_SLACK:
+        violations.append(f"memória cresceu {growth} blocos em {games} partidas")
+    return dict(seed=seed, ticks=tick, games=games, best_score=best_score, best_wave=best_wave,
+                memory_growth=growth, memory=memory, violations=violations)
+
+def run_soak(seeds, ticks, workers=0):
+    """soak_world() para cada semente, em paralelo numa pool de processos se `workers` > 0"""
+    if not workers:
+        return [soak_world(seed, ticks) for seed in seeds]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers, initializer=set_telemetry, initargs=(NullTelemetry(),)) as pool:
+        return list(pool.map(soak_world, seeds, [ticks] * len(seeds)))
+
+def draw_world(surface, world, starfield, particle_system, hud, local_player=0):
+    """Desenha um quadro completo do mundo (visão do jogador `local_player`)"""
+    player = world.players[local_player]
+    surface.fill(BLACK)
+    starfield.draw(surface)
+    
+    # Desenhar rastro das naves
+    for ship in world.players:
+        ship.trail.draw(surface)
+    
+    # Desenhar sprites (naves piscam enquanto invulneráveis)
+    surface.blits([(ship.sprite(), ship.rect) for ship in world.players if not ship.is_out()], doreturn=False)
+    surface.blits(world.entities.draw_list(), doreturn=False)
+    
+    # Desenhar balas
+    for bullet in world.bullets:
+        bullet.draw(surface)
+    
+    # Desenhar partículas
+    particle_system.draw(surface)
+    
+    # Desenhar escudo
+    for ship in world.players:
+        ship.draw_shield(surface)
+    
+    # Desenhar HUD
+    hud.draw(surface, world.score, player.lives, player.health, 
+             world.wave_manager.current_wave, player.weapon_type, player.weapon_timer)
+
 class StarField:
     """Campo de estrelas"""
     def __init__(self):
@@ -696,23 +2211,26 @@ class StarField:
             self.stars.append([x, y, size, speed, brightness, color])
             
     def update(self):
-        for star in self.stars:
+        for star in self.stars[:QUALITY.stars]:
             star[1] += star[3]
             if star[1] > SCREEN_HEIGHT:
                 star[1] = 0
                 star[0] = random.randint(0, SCREEN_WIDTH)
                     
     def draw(self, surface):
-        for star in self.stars:
+        for star in self.stars[:QUALITY.stars]:
             color = (*star[5][:3], star[4])
             gfxdraw.filled_circle(surface, int(star[0]), int(star[1]), int(star[2]), color)
 
 class HUD:
     """Interface HUD"""
-    def __init__(self):
-        self.font_small = pygame.font.Font(None, 24)
-        self.font_medium = pygame.font.Font(None, 36)
-        self.font_large = pygame.font.Font(None, 48)
+    def __init__(self, glow_scale=1.0):
+        self.font_small = load_font(24)
+        self.font_medium = load_font(36)
+        self.font_large = load_font(48)
+        self.glow = EffectLayer(glow_scale, alpha=True)  # Brilhos dos textos, somados de uma vez
+        self.texts = None  # Textos adiados até o brilho ser composto (dentro de draw())
+        self.text_cache = {}  # (texto, fonte, cor, passadas) -> (texto renderizado, brilho)
         
     def draw_health_bar(self, surface, x, y, width, height, health, max_health):
         # Fundo
@@ -725,12 +2243,29 @@ class HUD:
         pygame.draw.rect(surface, health_color, (x, y, health_width, height))
         
         # Efeito de brilho
-        glow_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        pygame.draw.rect(glow_surf, (*health_color, 50), (x-2, y-2, width+4, height+4), 2)
-        surface.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+        glow_surf = pygame.Surface((width + 4, height + 4), pygame.SRCALPHA)
+        pygame.draw.rect(glow_surf, (*health_color, 50), (0, 0, width + 4, height + 4), 2)
+        surface.blit(glow_surf, (x - 2, y - 2), special_flags=pygame.BLEND_ADD)
+    
+    def render_text(self, text, font, color):
+        """Texto e brilho já renderizados (a maior parte dos textos do HUD muda raramente)"""
+        key = (text, id(font), color, QUALITY.glow)
+        cached = self.text_cache.get(key)
+        if cached is None:
+            if len(self.text_cache) >= 64:
+                self.text_cache.clear()
+            text_surface = font.render(text, True, color)
+            glow = None
+            if QUALITY.glow:
+                glow = pygame.Surface(text_surface.get_size(), pygame.SRCALPHA)
+                for i in range(QUALITY.glow):
+                    glow.blit(font.render(text, True, (*color, 50 - i*15)), (0, 0))
+                glow = self.glow.prepare(glow)
+            cached = self.text_cache[key] = (text_surface, glow)
+        return cached
     
     def draw_text_with_glow(self, surface, text, font, x, y, color, center=False):
-        text_surface = font.render(text, True, color)
+        text_surface, glow = self.render_text(text, font, color)
         text_rect = text_surface.get_rect()
         
         if center:
@@ -739,17 +2274,23 @@ class HUD:
             text_rect.topleft = (x, y)
             
         # Desenha brilho
-        glow_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        for i in range(3):
-            glow_text = font.render(text, True, (*color, 50 - i*15))
-            glow_rect = glow_text.get_rect(center=text_rect.center)
-            glow_surf.blit(glow_text, glow_rect)
-        surface.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+        batched = self.texts is not None
+        if not batched:
+            self.glow.begin()
+        if glow:
+            self.glow.blit(glow, text_rect.topleft, prepared=True)
         
-        # Desenha texto principal
-        surface.blit(text_surface, text_rect)
+        # Desenha texto principal (em draw(), depois que todos os brilhos forem somados)
+        if batched:
+            self.texts.append((text_surface, text_rect))
+        else:
+            self.glow.composite(surface)
+            surface.blit(text_surface, text_rect)
     
     def draw(self, surface, score, lives, player_health=100, wave=1, weapon_type=WeaponType.BASIC, weapon_timer=0):
+        self.glow.begin()
+        self.texts = []
+        
         # Pontuação
         self.draw_text_with_glow(surface, f"SCORE: {score}", self.font_medium, 60, 20, NEON_GREEN)
         
@@ -757,14 +2298,7 @@ class HUD:
         self.draw_text_with_glow(surface, f"WAVE: {wave}", self.font_medium, SCREEN_WIDTH//2, 20, YELLOW)
         
         # Arma atual
-        weapon_names = {
-            WeaponType.BASIC: "BASIC",
-            WeaponType.SPREAD: "SPREAD",
-            WeaponType.RAPID: "RAPID",
-            WeaponType.LASER_BEAM: "LASER",
-            WeaponType.HOMING: "HOMING"
-        }
-        weapon_text = f"WEAPON: {weapon_names[weapon_type]}"
+        weapon_text = f"WEAPON: {WEAPONS.label[weapon_type._value_]}"
         if weapon_timer > 0:
             weapon_text += f" ({int(weapon_timer)}s)"
         self.draw_text_with_glow(surface, weapon_text, self.font_small, SCREEN_WIDTH - 150, 20, PURPLE)
@@ -779,6 +2313,11 @@ class HUD:
         # Barra de saúde
         self.draw_health_bar(surface, 20, SCREEN_HEIGHT - 40, 200, 20, player_health, 100)
         self.draw_text_with_glow(surface, "SHIELD", self.font_small, 230, SCREEN_HEIGHT - 30, CYAN)
+        
+        # Brilhos numa única composição, textos por cima
+        self.glow.composite(surface)
+        surface.blits(self.texts, doreturn=False)
+        self.texts = None
 
 class Button:
     """Botão interativo"""
@@ -789,7 +2328,7 @@ class Button:
         self.text_color = text_color
         self.hover_color = tuple(min(255, c + 50) for c in color)
         self.current_color = color
-        self.font = pygame.font.Font(None, 36)
+        self.font = load_font(36)
         self.hovered = False
         
     def update(self, mouse_pos):
@@ -815,394 +2354,2337 @@ class Button:
     def is_clicked(self, event):
         return event.type == pygame.MOUSEBUTTONDOWN and self.hovered
 
-def show_start_screen(screen, clock):
-    """Tela inicial do jogo"""
-    screen.fill(BLACK)
-    
-    # Título
-    title_font = pygame.font.Font(None, 72)
-    title_text = title_font.render("SPACE DEFENDER", True, CYAN)
-    title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, 150))
-    screen.blit(title_text, title_rect)
-    
-    # Subtítulo
-    subtitle_font = pygame.font.Font(None, 36)
-    subtitle_text = subtitle_font.render("FUTURISTIC EDITION", True, ELECTRIC_BLUE)
-    subtitle_rect = subtitle_text.get_rect(center=(SCREEN_WIDTH//2, 220))
-    screen.blit(subtitle_text, subtitle_rect)
-    
-    # Controles
-    controls_font = pygame.font.Font(None, 28)
-    controls = [
-        "CONTROLES:",
-        "← → : Mover a nave",
-        "ESPAÇO : Atirar",
-        "ENTER : Começar o jogo"
-    ]
-    
-    y = 320
-    for control in controls:
-        control_text = controls_font.render(control, True, WHITE)
-        control_rect = control_text.get_rect(center=(SCREEN_WIDTH//2, y))
-        screen.blit(control_text, control_rect)
-        y += 40
-    
-    # Instrução adicional
-    instruction_font = pygame.font.Font(None, 24)
-    instruction_text = instruction_font.render("Colete power-ups para mudar sua arma!", True, NEON_GREEN)
-    instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH//2, 500))
-    screen.blit(instruction_text, instruction_rect)
-    
-    pygame.display.flip()
-    
-    waiting = True
-    while waiting:
-        clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return False
-            if event.type == pygame.KEYUP:
-                if event.key == pygame.K_RETURN:
-                    waiting = False
-    return True
+class QualityGovernor:
+    """Ajusta o nível de qualidade pelo tempo de trabalho de cada quadro
+    
+    Usa a média móvel do tempo de quadro com histerese: só reduz a qualidade
+    depois de `down_frames` quadros seguidos acima de `high` x orçamento e só
+    aumenta depois de `up_frames` quadros seguidos abaixo de `low` x orçamento.
+    Se um aumento estoura o orçamento logo em seguida, a próxima tentativa de
+    subir espera o dobro (até `max_up_frames`), evitando oscilar entre níveis.
+    """
+    def __init__(self, target_fps=FPS, settings=None, high=0.9, low=0.6,
+                 down_frames=30, up_frames=180, max_up_frames=1800):
+        self.settings = settings or QUALITY
+        self.budget = 1.0 / target_fps
+        self.high = high
+        self.low = low
+        self.down_frames = down_frames
+        self.base_up_frames = up_frames
+        self.up_frames = up_frames
+        self.max_up_frames = max_up_frames
+        self.average = 0.0
+        self.over = 0
+        self.under = 0
+        self.since_raise = None  # Quadros desde o último aumento de nível
+    
+    @property
+    def level(self):
+        return self.settings.level
+    
+    def observe(self, frame_time):
+        """Registra o tempo de um quadro; retorna o nível em uso depois do ajuste"""
+        self.average += (frame_time - self.average) * 0.1
+        if self.since_raise is not None:
+            self.since_raise += 1
+        
+        if self.average > self.budget * self.high:
+            self.over += 1
+            self.under = 0
+            if self.over >= self.down_frames and self.level > 0:
+                if self.since_raise is not None and self.since_raise < self.up_frames:
+                    # O nível de cima não se sustenta: esperar mais antes de tentar de novo
+                    self.up_frames = min(self.up_frames * 2, self.max_up_frames)
+                self.since_raise = None
+                self.change(self.level - 1)
+        elif self.average < self.budget * self.low:
+            self.under += 1
+            self.over = 0
+            if self.under >= self.up_frames and self.level < len(QUALITY_LEVELS) - 1:
+                self.since_raise = 0
+                self.change(self.level + 1)
+        else:
+            self.over = self.under = 0
+            if self.since_raise is not None and self.since_raise >= self.up_frames:
+                self.up_frames = self.base_up_frames  # Nível estável por tempo suficiente
+        return self.level
+    
+    def change(self, level):
+        self.settings.apply(level)
+        self.over = self.under = 0
+        TELEMETRY.publish('quality', level=level, ms=round(self.average * 1000, 2))
 
-def show_game_over_screen(screen, clock, score, wave):
-    """Tela de game over moderna"""
-    screen.fill(BLACK)
-    
-    # Fundo com efeito de grade
-    for x in range(0, SCREEN_WIDTH, 40):
-        pygame.draw.line(screen, (20, 20, 30), (x, 0), (x, SCREEN_HEIGHT))
-    for y in range(0, SCREEN_HEIGHT, 40):
-        pygame.draw.line(screen, (20, 20, 30), (0, y), (SCREEN_WIDTH, y))
-    
-    # Título Game Over
-    title_font = pygame.font.Font(None, 72)
-    title_text = title_font.render("GAME OVER", True, RED)
-    title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, 150))
-    
-    # Efeito de brilho
-    glow_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    for i in range(5):
-        glow_text = title_font.render("GAME OVER", True, (*RED, 50 - i*10))
-        glow_rect = glow_text.get_rect(center=title_rect.center)
-        glow_surf.blit(glow_text, glow_rect)
-    screen.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
-    screen.blit(title_text, title_rect)
-    
-    # Estatísticas
-    stats_font = pygame.font.Font(None, 48)
-    score_text = stats_font.render(f"SCORE: {score}", True, YELLOW)
-    score_rect = score_text.get_rect(center=(SCREEN_WIDTH//2, 250))
-    screen.blit(score_text, score_rect)
-    
-    wave_text = stats_font.render(f"WAVE: {wave}", True, CYAN)
-    wave_rect = wave_text.get_rect(center=(SCREEN_WIDTH//2, 310))
-    screen.blit(wave_text, wave_rect)
-    
-    # Botão de jogar novamente
-    play_button = Button(SCREEN_WIDTH//2 - 150, 400, 300, 60, "PLAY AGAIN", NEON_GREEN)
-    
-    # Mensagem adicional
-    msg_font = pygame.font.Font(None, 24)
-    msg_text = msg_font.render("Clique no botão ou pressione ENTER", True, WHITE)
-    msg_rect = msg_text.get_rect(center=(SCREEN_WIDTH//2, 500))
-    screen.blit(msg_text, msg_rect)
-    
-    pygame.display.flip()
-    
-    waiting = True
-    while waiting:
-        clock.tick(FPS)
-        mouse_pos = pygame.mouse.get_pos()
-        play_button.update(mouse_pos)
-        play_button.draw(screen)
-        pygame.display.flip()
+class ProfilerOverlay:
+    """Painel de desempenho (F3): FPS, tempo de quadro, nível de qualidade e contagens"""
+    def __init__(self, visible=False):
+        self.font = load_font(20)
+        self.visible = visible
+        self.frame_times = deque(maxlen=60)
+    
+    def toggle(self):
+        self.visible = not self.visible
+    
+    def record(self, frame_time):
+        self.frame_times.append(frame_time)
+    
+    def draw(self, surface, clock, world, particle_system, governor=None):
+        if not self.visible:
+            return
+        average = sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0.0
+        worst = max(self.frame_times, default=0.0)
+        level = governor.level if governor else QUALITY.level
+        lines = [
+            f"FPS {clock.get_fps():5.1f}",
+            f"quadro {average * 1000:5.2f} ms (pior {worst * 1000:5.2f})",
+            f"qualidade {level}/{len(QUALITY_LEVELS) - 1}" + (" auto" if governor else ""),
+            f"entidades {len(world.entities)}  balas {len(world.bullets)}",
+            f"partículas {len(particle_system.particles)}/{min(particle_system.max_particles, QUALITY.particles)}",
+        ]
+        x = SCREEN_WIDTH - 230
+        y = SCREEN_HEIGHT - 20 * len(lines) - 10
+        panel = pygame.Surface((220, 20 * len(lines) + 6), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        surface.blit(panel, (x - 5, y - 3))
+        for line in lines:
+            surface.blit(self.font.render(line, True, NEON_GREEN), (x, y))
+            y += 20
+
+class SamplingProfiler:
+    """Profiler por amostragem da thread do jogo, com saída "folded" para flamegraphs
+    
+    Uma thread de fundo lê sys._current_frames() a cada `interval` segundos e
+    conta a pilha da thread alvo; sem tracing (cProfile), o jogo roda na
+    velocidade normal e o custo é uma leitura de pilha por amostra. A amostra
+    espera o jogo soltar o GIL, então tende a cair nas chamadas em C que o
+    soltam (flip, blits); com `fine_switch` o intervalo de troca do GIL cai
+    para 1/50 do intervalo enquanto amostra, o que corrige esse viés mas
+    muda o escalonamento de todas as threads do processo. dump()
+    grava uma linha "raiz;...;função contagem" por pilha distinta, o formato
+    de flamegraph.pl, inferno e speedscope.
+    """
+    DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+    
+    def __init__(self, interval=0.005, fine_switch=False):
+        self.interval = interval
+        self.fine_switch = fine_switch
+        self.samples = {}  # Pilha "a;b;c" -> amostras
+        self.labels = {}   # Código -> nome do quadro na pilha
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.switch_interval = None  # Valor original de sys.getswitchinterval()
+        self.cost = 0.0  # Tempo de CPU gasto pela thread de amostragem (s)
+    
+    @property
+    def running(self):
+        return self.thread is not None
+    
+    def start(self, thread_id=None):
+        """Começa a amostrar a thread `thread_id` (padrão: a que chamou)"""
+        if self.thread is not None:
+            return
+        if self.fine_switch:
+            self.switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self.switch_interval, self.interval / 50))
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._sample_loop, args=(thread_id or threading.get_ident(),),
+                                       name="sampling-profiler", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        if self.switch_interval is not None:
+            sys.setswitchinterval(self.switch_interval)
+            self.switch_interval = None
+    
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+    
+    def label(self, code):
+        label = self.labels[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+    
+    def _sample_loop(self, thread_id):
+        started = time.thread_time()
+        current_frames = sys._current_frames
+        labels = self.labels
+        while not self.stop_event.wait(self.interval):
+            frame = current_frames().get(thread_id)
+            if frame is None:
+                break  # A thread amostrada terminou
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(labels.get(code) or self.label(code))
+                frame = frame.f_back
+            stack.reverse()
+            key = ';'.join(stack)
+            samples = self.samples  # dump() troca o dicionário
+            samples[key] = samples.get(key, 0) + 1
+        self.cost += time.thread_time() - started
+    
+    def dump(self, path):
+        """Grava as pilhas acumuladas em `path` e recomeça a contagem; retorna o total de amostras"""
+        samples, self.samples = self.samples, {}
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(samples.items()):
+                f.write(f"{stack} {count}\n")
+        os.replace(temp_path, path)
+        return sum(samples.values())
+
+class Leaderboard:
+    """Índice do histórico de partidas: top N e totais, sem as partidas em si"""
+    def __init__(self, size=100):
+        self.size = size
+        self.runs = 0
+        self.log_size = 0  # Bytes do log já contabilizados neste índice
+        self.top = []      # [pontuação, wave, timestamp], maior primeiro
+        self.kills = {}    # Nome da arma -> asteroides destruídos
+    
+    def add(self, run):
+        self.runs += 1
+        for weapon, count in run['kills'].items():
+            self.kills[weapon] = self.kills.get(weapon, 0) + count
+        if len(self.top) < self.size or run['score'] > self.top[-1][0]:
+            self.top.append([run['score'], run['wave'], run['time']])
+            self.top.sort(key=lambda entry: -entry[0])
+            del self.top[self.size:]
+    
+    def to_json(self):
+        return {'version': 1, 'size': self.size, 'runs': self.runs, 'log_size': self.log_size,
+                'top': self.top, 'kills': self.kills}
+    
+    @classmethod
+    def from_json(cls, data):
+        board = cls(data['size'])
+        board.runs = data['runs']
+        board.log_size = data['log_size']
+        board.top = data['top']
+        board.kills = data['kills']
+        return board
+    
+    def copy(self):
+        return Leaderboard.from_json(json.loads(json.dumps(self.to_json())))
+
+class ScoreStore:
+    """Histórico persistente de partidas: log JSONL só de acréscimo + índice do placar
+    
+    Cada partida vira uma linha em runs.jsonl. O arquivo leaderboard.json
+    guarda o top N, os totais de abates por arma e até que byte do log ele
+    já cobre; na abertura só o índice é lido (e, após uma queda, apenas o
+    final do log que o índice ainda não cobria). As gravações acontecem em
+    lote numa thread separada, então o game over nunca espera pelo disco.
+    """
+    LOG_NAME = 'runs.jsonl'
+    INDEX_NAME = 'leaderboard.json'
+    DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scores')
+    
+    def __init__(self, directory, size=100):
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, self.LOG_NAME)
+        self.index_path = os.path.join(directory, self.INDEX_NAME)
+        self.leaderboard = self.load_index(size)
+        self.persisted = self.leaderboard.copy()  # Visão da thread de gravação
+        self.unsaved = 0  # Partidas que a thread de gravação ainda não conseguiu gravar
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._writer_loop, name="ScoreStore", daemon=True)
+        self.thread.start()
+    
+    def load_index(self, size):
+        try:
+            with open(self.index_path) as f:
+                board = Leaderboard.from_json(json.load(f))
+        except (OSError, ValueError, KeyError):
+            board = Leaderboard(size)  # Sem índice: reconstrói a partir do log inteiro
+        if self.log_bytes() < board.log_size:
+            board = Leaderboard(board.size)  # Log apagado ou perdido numa queda: o índice não vale mais
+        self.replay_log(board)
+        return board
+    
+    def log_bytes(self):
+        try:
+            return os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+    
+    def replay_log(self, board):
+        """Acrescenta a `board` as partidas do log a partir de board.log_size"""
+        try:
+            with open(self.log_path, 'rb') as log:
+                log.seek(board.log_size)
+                for line in log:
+                    if not line.endswith(b'\n'):
+                        break  # Linha incompleta de uma gravação interrompida
+                    run = self.parse_run(line)
+                    if run is not None:  # Linhas corrompidas são puladas
+                        board.add(run)
+                    board.log_size += len(line)
+        except FileNotFoundError:
+            pass
+        except OSError as error:
+            print(f"Placar: falha ao ler {self.log_path}: {error}", file=sys.stderr)
+    
+    @staticmethod
+    def parse_run(line):
+        try:
+            run = json.loads(line)
+        except ValueError:  # Inclui UnicodeDecodeError (bytes nulos, lixo)
+            return None
+        if (isinstance(run, dict) and isinstance(run.get('kills'), dict)
+                and all(key in run for key in ('score', 'wave', 'time'))):
+            return run
+        return None
+    
+    def record_run(self, score, wave, kills, duration):
+        """Registra uma partida; retorna a posição no placar (1 = recorde) ou None"""
+        run = {'time': time.time(), 'score': score, 'wave': wave,
+               'duration': round(duration, 2), 'kills': dict(kills)}
+        self.leaderboard.add(run)
+        self.pending.put(run)
+        for rank, entry in enumerate(self.leaderboard.top, 1):
+            if entry[2] == run['time'] and entry[0] == score:
+                return rank
+        return None
+    
+    def top(self, n=10):
+        return [tuple(entry) for entry in self.leaderboard.top[:n]]
+    
+    def best_score(self):
+        return self.leaderboard.top[0][0] if self.leaderboard.top else 0
+    
+    def weapon_kills(self):
+        return dict(self.leaderboard.kills)
+    
+    def _writer_loop(self):
+        running = True
+        unsaved = []  # Partidas de um lote que falhou, tentadas de novo no próximo
+        while running:
+            batch = [self.pending.get()]
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+            batch = unsaved + batch
+            if batch:
+                unsaved = self._write_batch(batch)
+            self.unsaved = len(unsaved)
+    
+    def _write_batch(self, batch):
+        """Grava o lote; retorna as partidas que não chegaram ao log"""
+        lines = [(json.dumps(run, separators=(',', ':')) + '\n').encode() for run in batch]
+        try:
+            if self.log_bytes() < self.persisted.log_size:
+                # O log encolheu por fora: reconstrói o índice em vez de preencher com zeros
+                self.persisted = Leaderboard(self.persisted.size)
+                self.replay_log(self.persisted)
+            with open(self.log_path, 'ab') as log:
+                log.truncate(self.persisted.log_size)  # Descarta linha incompleta de uma queda
+                log.write(b''.join(lines))
+        except OSError as error:
+            print(f"Placar: falha ao gravar {self.log_path}: {error}", file=sys.stderr)
+            return batch
+        for run, line in zip(batch, lines):
+            self.persisted.add(run)
+            self.persisted.log_size += len(line)
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return False
-            if event.type == pygame.KEYUP:
-                if event.key == pygame.K_RETURN:
-                    waiting = False
-            if play_button.is_clicked(event):
-                waiting = False
-                
-    return True
+        # Troca atômica do índice (se falhar, a próxima abertura relê o final do log)
+        temp_path = self.index_path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.persisted.to_json(), f)
+            os.replace(temp_path, self.index_path)
+        except OSError as error:
+            print(f"Placar: falha ao gravar {self.index_path}: {error}", file=sys.stderr)
+        return []
+    
+    def close(self):
+        """Grava as partidas pendentes e encerra a thread"""
+        self.pending.put(None)
+        self.thread.join()
+        if self.unsaved:
+            print(f"Placar: {self.unsaved} partida(s) não gravada(s) em {self.log_path}", file=sys.stderr)
+
+class NullTelemetry:
+    """Telemetria desligada: publicar não custa quase nada"""
+    def publish(self, kind, **fields):
+        pass
+    
+    def close(self):
+        pass
+
+class TelemetryBus:
+    """Barramento de eventos de telemetria com buffer circular e amostragem por tipo
+    
+    O jogo (único produtor) grava cada evento numa posição do anel e só então
+    avança `head`; a thread de gravação lê de `tail` até `head` sem travas.
+    Se o consumidor ficar uma volta inteira para trás, os eventos mais antigos
+    são sobrescritos e contados em `dropped`. Os eventos vão, em JSONL, para
+    telemetry.jsonl, que é rotacionado (telemetry.jsonl.1, .2, ...) ao passar
+    de `max_bytes`.
+    """
+    FILE_NAME = 'telemetry.jsonl'
+    DEFAULT_RATES = {'frame': 0.05, 'shoot': 0.1, 'asteroid_hit': 0.25}
+    
+    def __init__(self, directory, rates=None, capacity=4096, max_bytes=4 * 1024 * 1024,
+                 backups=5, flush_interval=0.5):
+        assert capacity & (capacity - 1) == 0, "capacidade deve ser potência de 2"
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self.rates = dict(self.DEFAULT_RATES, **(rates or {}))
+        self.credit = {}  # Amostragem determinística: não consome o random do jogo
+        self.slots = [None] * capacity
+        self.mask = capacity - 1
+        self.head = 0     # Próxima posição a ser escrita (só o produtor altera)
+        self.tail = 0     # Próxima posição a ser lida (só o consumidor altera)
+        self.dropped = 0
+        self.written = 0
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._writer_loop, name="Telemetry", daemon=True)
+        self.thread.start()
+    
+    def publish(self, kind, **fields):
+        rate = self.rates.get(kind, 1.0)
+        if rate < 1.0:
+            credit = self.credit.get(kind, 0.0) + rate
+            if credit < 1.0:
+                self.credit[kind] = credit
+                return
+            self.credit[kind] = credit - 1.0
+        head = self.head
+        self.slots[head & self.mask] = (time.time(), kind, fields)
+        self.head = head + 1
+    
+    def drain(self):
+        """Retira os eventos publicados desde a última chamada (thread de gravação)"""
+        capacity = self.mask + 1
+        head = self.head
+        tail = max(self.tail, head - capacity)
+        events = [self.slots[i & self.mask] for i in range(tail, head)]
+        # Posições reescritas pelo produtor enquanto copiávamos
+        overrun = self.head - capacity - tail
+        if overrun > 0:
+            events = events[overrun:]
+        self.dropped += (tail - self.tail) + max(0, overrun)
+        self.tail = head
+        return events
+    
+    def _writer_loop(self):
+        while not self.stopping.wait(self.flush_interval):
+            self._write(self.drain())
+        self._write(self.drain())
+    
+    def _write(self, events):
+        if not events:
+            return
+        data = ''.join(json.dumps({'t': round(t, 4), 'type': kind, **fields}, separators=(',', ':')) + '\n'
+                       for t, kind, fields in events).encode()
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'ab') as f:
+            f.write(data)
+        self.written += len(events)
+    
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+    
+    def close(self):
+        """Grava os eventos restantes e encerra a thread"""
+        self.stopping.set()
+        self.thread.join()
+
+# Barramento usado pelos publicadores do jogo; trocado por set_telemetry()
+TELEMETRY = NullTelemetry()
+
+def set_telemetry(bus):
+    """Instala `bus` como barramento global de telemetria; retorna o anterior"""
+    global TELEMETRY
+    previous, TELEMETRY = TELEMETRY, bus
+    return previous
+
+def parse_sample_rates(text):
+    """'frame=0.1,shoot=0.5' -> {'frame': 0.1, 'shoot': 0.5}"""
+    rates = {}
+    for item in filter(None, text.split(',')):
+        kind, _, rate = item.partition('=')
+        rates[kind.strip()] = float(rate)
+    return rates
 
-# Testes unitários
-class TestSpaceDefender(unittest.TestCase):
-    def test_bullet_creation(self):
-        """Testa se as balas são criadas corretamente"""
-        bullet = Bullet(100, 100, WeaponType.BASIC)
-        self.assertEqual(bullet.x, 100)
-        self.assertEqual(bullet.y, 100)
-        self.assertEqual(bullet.weapon_type, WeaponType.BASIC)
-        self.assertTrue(bullet.active)
-    
-    def test_player_shoot_basic(self):
-        """Testa se o jogador atira corretamente com a arma básica"""
-        player = Player()
-        bullets = []
-        sound_manager = SoundManager()
-        
-        player.shoot(sound_manager, bullets)
-        self.assertEqual(len(bullets), 1)
-        self.assertEqual(bullets[0].weapon_type, WeaponType.BASIC)
-    
-    def test_player_shoot_spread(self):
-        """Testa se o jogador atira corretamente com a arma spread"""
-        player = Player()
-        player.weapon_type = WeaponType.SPREAD
-        bullets = []
-        sound_manager = SoundManager()
-        
-        player.shoot(sound_manager, bullets)
-        self.assertEqual(len(bullets), 3)  # Spread dispara 3 balas
+class NullAssets:
+    """Sem pacote de assets: sprites, sons e textos são gerados na hora"""
+    def image(self, *key):
+        return None
+    
+    def sound_banks(self):
+        return None
+    
+    def font(self, size):
+        return None
+
+class AssetPack:
+    """Sprites, bancos de sons e atlas de glifos pré-renderizados num único arquivo
+    
+    Formato: cabeçalho (magic, versão, posição e tamanho do índice), seção de
+    pixels (BGRA, o formato nativo das superfícies com alfa) e seção de PCM,
+    cada uma começando numa página de 4 KiB, e o índice JSON no fim. O arquivo
+    é mapeado com mmap e as superfícies são criadas com frombuffer direto
+    sobre o mapeamento, então a partida só lê do disco as páginas dos assets
+    que usa. Os nomes incluem a cor e o ícone de cada arma ('ship/0,255,255'):
+    armas alteradas por --weapons que não estão no pacote são desenhadas na hora.
+    """
+    MAGIC = b'SDPK'
+    VERSION = 1
+    PAGE = 4096
+    HEADER = struct.Struct('<4sIQQ')
+    FONT_SIZES = (20, 24, 28, 36, 48, 72)
+    GLYPHS = ''.join(map(chr, [*range(32, 127), *range(160, 256)]))
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'space_defender.pack')
+    
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            # Cópia privada: páginas lidas sob demanda e nenhuma escrita volta ao arquivo
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, index_offset, index_size = self.HEADER.unpack_from(self.map)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{path}: pacote de assets inválido ou de outra versão (refaça com --bake-assets)")
+        self.index = json.loads(self.map[index_offset:index_offset + index_size])
+        self.view = memoryview(self.map)
+        self.surfaces = {}
+        self.fonts = {}
+    
+    @staticmethod
+    def key(*parts):
+        return '/'.join(map(str, parts))
+    
+    def image(self, *key):
+        """Superfície do asset `key` (compartilhada: não desenhar nela) ou None"""
+        name = self.key(*key)
+        surface = self.surfaces.get(name)
+        if surface is None:
+            entry = self.index['images'].get(name)
+            if entry is None:
+                return None
+            offset, width, height = entry
+            surface = pygame.image.frombuffer(self.view[offset:offset + width * height * 4],
+                                              (width, height), 'BGRA')
+            self.surfaces[name] = surface
+        return surface
+    
+    def sound_banks(self):
+        """Bancos de variações por efeito; None se o mixer não estiver no formato do pacote"""
+        if pygame.mixer.get_init() != tuple(self.index['mixer']):
+            return None
+        return {name: [pygame.mixer.Sound(buffer=self.view[offset:offset + size]) for offset, size in bank]
+                for name, bank in self.index['sounds'].items()}
+    
+    def font(self, size):
+        atlas = self.fonts.get(size)
+        if atlas is None:
+            entry = self.index['fonts'].get(str(size))
+            if entry is None:
+                return None
+            atlas = self.fonts[size] = GlyphAtlas(self.image('font', size), entry['height'],
+                                                  entry['glyphs'], size)
+        return atlas
+    
+    @classmethod
+    def bake(cls, path):
+        """Renderiza sprites, sons e glifos e grava o pacote em `path`; retorna o índice"""
+        images = {}
+        previous = set_assets(NullAssets())  # Desenhar tudo na hora, mesmo com outro pacote em uso
+        try:
+            for weapon in WeaponType:
+                color = WEAPONS.color[weapon._value_]
+                ship, blink = Player.render_spaceship(color)
+                images[cls.key('ship', *color)] = ship
+                images[cls.key('ship_blink', *color)] = blink
+                images[cls.key('powerup', WEAPONS.icon[weapon._value_], *color)] = PowerUp(0, 0, weapon).image
+        finally:
+            set_assets(previous)
+        for phase, frame in enumerate(Player.render_shield_frames()):
+            images[cls.key('shield', Player.SHIELD_RADIUS, phase)] = frame
+        
+        init_fonts()
+        fonts = {}
+        for size in cls.FONT_SIZES:
+            font = pygame.font.Font(None, size)
+            # Glifos mais altos que a linha (acentos em maiúsculas) mudariam a base do texto: ficam com a fonte real
+            height = font.get_height()
+            rendered = [(char, font.render(char, True, WHITE)) for char in cls.GLYPHS if font.size(char)[0]]
+            rendered = [(char, glyph) for char, glyph in rendered if glyph.get_height() == height]
+            atlas = pygame.Surface((sum(glyph.get_width() for _, glyph in rendered), height), pygame.SRCALPHA)
+            glyphs = {}
+            x = 0
+            for char, glyph in rendered:
+                atlas.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)  # Cópia, sem misturar
+                glyphs[char] = [x, glyph.get_width()]
+                x += glyph.get_width()
+            images[cls.key('font', size)] = atlas
+            fonts[str(size)] = {'height': height, 'glyphs': glyphs}
+        
+        sounds = SoundManager(load=False).synthesize()
+        index = {'mixer': [MIXER_SETTINGS[field] for field in ('frequency', 'size', 'channels')],
+                 'images': {}, 'sounds': {}, 'fonts': fonts}
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(bytes(cls.PAGE))  # Cabeçalho, preenchido no fim
+            for name, surface in images.items():
+                index['images'][name] = [f.tell(), *surface.get_size()]
+                f.write(pygame.image.tobytes(surface, 'BGRA'))
+            cls.pad(f)
+            for name, bank in sounds.items():
+                index['sounds'][name] = entries = []
+                for pcm in bank:
+                    entries.append([f.tell(), pcm.nbytes])
+                    f.write(pcm.tobytes())
+            cls.pad(f)
+            index_offset = f.tell()
+            data = json.dumps(index, separators=(',', ':')).encode()
+            f.write(data)
+            f.seek(0)
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, index_offset, len(data)))
+        os.replace(temp_path, path)
+        return index
+    
+    @classmethod
+    def pad(cls, f):
+        """Completa o arquivo até o início da próxima página"""
+        f.write(bytes(-f.tell() % cls.PAGE))
+
+class GlyphAtlas:
+    """Fonte desenhada a partir de um atlas de glifos brancos do AssetPack
+    
+    Implementa a parte de pygame.font.Font usada pelo jogo; textos com
+    caracteres fora do atlas são repassados à fonte real, criada sob demanda.
+    """
+    def __init__(self, atlas, height, glyphs, size):
+        self.atlas = atlas
+        self.height = height
+        self.glyphs = glyphs  # Caractere -> [x no atlas, largura]
+        self.points = size
+        self.fallback = None
+    
+    def real_font(self):
+        if self.fallback is None:
+            init_fonts()
+            self.fallback = pygame.font.Font(None, self.points)
+        return self.fallback
+    
+    def get_height(self):
+        return self.height
+    
+    def size(self, text):
+        if not all(char in self.glyphs for char in text):
+            return self.real_font().size(text)
+        return sum(self.glyphs[char][1] for char in text), self.height
+    
+    def render(self, text, antialias, color, background=None):
+        glyphs = self.glyphs
+        if background is not None or not all(char in glyphs for char in text):
+            return self.real_font().render(text, antialias, color, background)
+        surface = pygame.Surface((max(1, sum(glyphs[char][1] for char in text)), self.height),
+                                 pygame.SRCALPHA)
+        blits = []
+        x = 0
+        for char in text:
+            glyph_x, width = glyphs[char]
+            blits.append((self.atlas, (x, 0), (glyph_x, 0, width, self.height), pygame.BLEND_RGBA_MAX))
+            x += width
+        surface.blits(blits, doreturn=False)
+        # Glifos brancos: multiplicar pinta na cor (e alfa) pedida
+        surface.fill((*color[:3], color[3] if len(color) > 3 else 255), special_flags=pygame.BLEND_RGBA_MULT)
+        return surface
+
+# Assets pré-renderizados em uso; trocado por set_assets()
+ASSETS = NullAssets()
+
+def set_assets(pack):
+    """Instala `pack` (AssetPack ou NullAssets) como fonte de assets; retorna o anterior"""
+    global ASSETS
+    previous, ASSETS = ASSETS, pack
+    return previous
+
+class ObservationEncoder:
+    """Exporta o estado do jogo como um vetor float32 de tamanho fixo para agentes
+    
+    Layout do vetor (todas as posições relativas à nave e normalizadas pela tela):
+      jogador:     x, arma (one-hot), tempo da arma, vidas, saúde
+      asteroides:  K mais próximos ordenados por distância:
+                   presente, dx, dy, vx, vy, categoria de tamanho, saúde
+      balas:       as mais recentes: presente, dx, dy, arma
+      power-ups:   presente, dx, dy, arma
+    Posições vazias ficam zeradas. O vetor devolvido é sempre o mesmo buffer
+    (nenhum array novo por passo; copie-o se precisar guardar): os campos são
+    montados numa lista e copiados de uma vez com um struct pré-compilado, o
+    que no CPython sai mais barato que escrever campo a campo no array.
+    """
+    PLAYER_FIELDS = 4 + len(WeaponType)
+    ASTEROID_FIELDS = 7
+    BULLET_FIELDS = 4
+    POWERUP_FIELDS = 4
+    
+    def __init__(self, k_asteroids=8, max_bullets=8, max_powerups=2):
+        self.k_asteroids = k_asteroids
+        self.max_bullets = max_bullets
+        self.max_powerups = max_powerups
+        
+        self.asteroid_offset = self.PLAYER_FIELDS
+        self.bullet_offset = self.asteroid_offset + k_asteroids * self.ASTEROID_FIELDS
+        self.powerup_offset = self.bullet_offset + max_bullets * self.BULLET_FIELDS
+        self.size = self.powerup_offset + max_powerups * self.POWERUP_FIELDS
+        self.buffer = np.zeros(self.size, dtype=np.float32)
+        
+        # Um único struct pré-compilado escreve o vetor inteiro direto no buffer do NumPy
+        self.vector_struct = struct.Struct(f'{self.size}f')
+        self.asteroid_padding = [(0.0,) * (self.ASTEROID_FIELDS * n) for n in range(k_asteroids + 1)]
+        self.bullet_padding = [(0.0,) * (self.BULLET_FIELDS * n) for n in range(max_bullets + 1)]
+        self.powerup_padding = [(0.0,) * (self.POWERUP_FIELDS * n) for n in range(max_powerups + 1)]
+        # Tabelas indexadas por WeaponType.value (evita o hash de Enum no caminho quente)
+        self.weapon_one_hot = [()] + [tuple(1.0 if other is weapon else 0.0 for other in WeaponType)
+                                      for weapon in WeaponType]
+        self.weapon_index = [0.0] + [(weapon.value - 1) / (len(WeaponType) - 1) for weapon in WeaponType]
+        self.distance = itemgetter(0)
+    
+    def encode(self, player, player_health, asteroids, bullets, powerups):
+        px, py = player.rect.center
+        inv_w = 1.0 / SCREEN_WIDTH
+        inv_h = 1.0 / SCREEN_HEIGHT
+        third = 1.0 / 3.0
+        weapon_index = self.weapon_index
+        
+        values = [px * inv_w, *self.weapon_one_hot[player.weapon_type._value_],
+                  player.weapon_timer / 10.0, player.lives / 3.0, player_health / 100.0]
+        extend = values.extend
+        
+        # K asteroides mais próximos (seleção parcial quando há mais de K)
+        k = self.k_asteroids
+        nearest = []
+        append = nearest.append
+        for a in asteroids:
+            dx, dy = a.rect.center
+            dx -= px
+            dy -= py
+            append((dx * dx + dy * dy, dx, dy, a))
+        if len(nearest) > k:
+            nearest = heapq.nsmallest(k, nearest, key=self.distance)
+        else:
+            nearest.sort(key=self.distance)
+        for _, dx, dy, a in nearest:
+            extend((1.0, dx * inv_w, dy * inv_h, a.speed_x * 0.1, a.speed_y * 0.1,
+                    a.size_category * third, a.health * third))
+        extend(self.asteroid_padding[k - len(nearest)])
+        
+        # Balas ativas mais recentes
+        recent = bullets[-self.max_bullets:]
+        for b in recent:
+            extend((1.0, (b.x - px) * inv_w, (b.y - py) * inv_h, weapon_index[b.weapon_type._value_]))
+        extend(self.bullet_padding[self.max_bullets - len(recent)])
+        
+        # Power-ups na tela
+        count = 0
+        for p in powerups:
+            if count == self.max_powerups:
+                break
+            cx, cy = p.rect.center
+            extend((1.0, (cx - px) * inv_w, (cy - py) * inv_h, weapon_index[p.weapon_type._value_]))
+            count += 1
+        extend(self.powerup_padding[self.max_powerups - count])
+        
+        self.vector_struct.pack_into(self.buffer, 0, *values)
+        return self.buffer
+
+class LowResRenderer:
+    """Renderizador em baixa resolução e tons de cinza para agentes baseados em pixels
+    
+    Desenha primitivas simplificadas direto num buffer NumPy pequeno, sem
+    estrelas, partículas nem brilho. Os últimos `stack` quadros ficam
+    empilhados em `frames` (o mais recente por último).
+    """
+    PLAYER_SHADE = 255
+    ASTEROID_SHADE = 140
+    BULLET_SHADE = 220
+    POWERUP_SHADE = 190
+    
+    def __init__(self, width=84, height=84, stack=4):
+        self.width = width
+        self.height = height
+        self.scale_x = width / SCREEN_WIDTH
+        self.scale_y = height / SCREEN_HEIGHT
+        self.frames = np.zeros((stack, height, width), dtype=np.uint8)
+        self.disc_masks = {}
+        
+        # Máscara triangular da nave na escala do buffer
+        ship_w = max(1, round(60 * self.scale_x))
+        ship_h = max(1, round(50 * self.scale_y))
+        rows = np.arange(ship_h)[:, None] + 1
+        cols = np.abs(np.arange(ship_w)[None, :] - (ship_w - 1) / 2)
+        self.ship_mask = cols <= rows * ship_w / (2 * ship_h)
+        self.bullet_w = max(1, round(4 * self.scale_x))
+        self.bullet_h = max(1, round(12 * self.scale_y))
+        self.powerup_half = max(1, round(15 * min(self.scale_x, self.scale_y)))
+    
+    def disc_mask(self, radius):
+        mask = self.disc_masks.get(radius)
+        if mask is None:
+            span = np.arange(-radius, radius + 1)
+            mask = span[:, None] ** 2 + span[None, :] ** 2 <= radius * radius
+            self.disc_masks[radius] = mask
+        return mask
+    
+    def stamp(self, frame, x, y, mask, shade):
+        """Pinta `mask` com o canto superior esquerdo em (x, y), recortando nas bordas"""
+        mask_h, mask_w = mask.shape
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + mask_w, self.width)
+        y1 = min(y + mask_h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        region = frame[y0:y1, x0:x1]
+        region[mask[y0 - y:y1 - y, x0 - x:x1 - x]] = shade
+    
+    def fill_rect(self, frame, x, y, w, h, shade):
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        frame[y0:max(y + h, 0), x0:max(x + w, 0)] = shade
+    
+    def render(self, player, asteroids, bullets, powerups):
+        """Desenha o estado atual e devolve a pilha de quadros (stack, altura, largura)"""
+        frames = self.frames
+        frames[:-1] = frames[1:]
+        frame = frames[-1]
+        frame.fill(0)
+        sx = self.scale_x
+        sy = self.scale_y
+        
+        for asteroid in asteroids:
+            radius = max(1, int(asteroid.size * sx))
+            cx, cy = asteroid.rect.center
+            self.stamp(frame, int(cx * sx) - radius, int(cy * sy) - radius,
+                       self.disc_mask(radius), self.ASTEROID_SHADE)
+        
+        half = self.powerup_half
+        for powerup in powerups:
+            cx, cy = powerup.rect.center
+            self.fill_rect(frame, int(cx * sx) - half, int(cy * sy) - half,
+                           2 * half, 2 * half, self.POWERUP_SHADE)
+        
+        bullet_w = self.bullet_w
+        bullet_h = self.bullet_h
         for bullet in bullets:
-            self.assertEqual(bullet.weapon_type, WeaponType.SPREAD)
+            self.fill_rect(frame, int(bullet.x * sx), int(bullet.y * sy) - bullet_h,
+                           bullet_w, bullet_h, self.BULLET_SHADE)
+        
+        self.stamp(frame, int(player.rect.x * sx), int(player.rect.y * sy),
+                   self.ship_mask, self.PLAYER_SHADE)
+        return frames
+
+class FrameRecorder:
+    """Captura quadros da tela e grava em disco numa thread separada
+    
+    O loop do jogo só copia os pixels para um buffer reaproveitado; a escrita
+    (RGB bruto, sequência PNG ou pipe para o ffmpeg) acontece na thread de
+    gravação. Se a fila estiver cheia o quadro é descartado em vez de
+    bloquear o jogo. Se a escrita falhar (pipe do ffmpeg quebrado, disco
+    cheio) a thread guarda o erro e capture()/close() levantam RuntimeError.
+    """
+    FORMATS = ('raw', 'png', 'ffmpeg')
+    
+    def __init__(self, output_dir, size=(SCREEN_WIDTH, SCREEN_HEIGHT), fmt='auto', fps=FPS, max_queue=60):
+        if fmt == 'auto':
+            fmt = 'ffmpeg' if shutil.which('ffmpeg') else 'raw'
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Formato de captura desconhecido: {fmt}")
+        if fmt == 'ffmpeg' and not shutil.which('ffmpeg'):
+            raise RuntimeError("ffmpeg não encontrado no PATH")
+        
+        self.output_dir = output_dir
+        self.width, self.height = size
+        self.fmt = fmt
+        self.fps = fps
+        self.frames_captured = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.error = None  # Exceção que encerrou a thread de gravação
+        self.encoder = None
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Buffers reaproveitados entre quadros, alocados sob demanda até max_queue
+        self.free_buffers = deque()
+        self.buffers_allocated = 0
+        self.max_queue = max_queue
+        self.pending = queue.Queue(maxsize=max_queue)
+        self.thread = threading.Thread(target=self._writer_loop, name="FrameRecorder", daemon=True)
+        self.thread.start()
     
-    def test_wave_manager(self):
-        """Testa o gerenciador de waves"""
-        wave_manager = WaveManager()
+    def capture(self, surface):
+        """Copia os pixels de `surface` para a fila; retorna False se o quadro foi descartado"""
+        self.check()
+        if self.free_buffers:
+            buffer = self.free_buffers.pop()
+        elif self.buffers_allocated < self.max_queue:
+            buffer = np.empty((self.width, self.height, 3), dtype=np.uint8)
+            self.buffers_allocated += 1
+        else:
+            self.frames_dropped += 1
+            return False
+        
+        # pixels3d é uma visão direta da superfície (sem cópia); a única cópia
+        # é para o buffer, já que a tela será redesenhada no próximo quadro
+        pixels = pygame.surfarray.pixels3d(surface)
+        buffer[...] = pixels
+        del pixels  # Libera o lock da superfície
         
-        # Testa a primeira wave
-        self.assertEqual(wave_manager.current_wave, 1)
-        self.assertEqual(wave_manager.asteroids_in_wave, 3)
+        self.pending.put_nowait(buffer)
+        self.frames_captured += 1
+        return True
+    
+    def _open_output(self):
+        if self.fmt == 'raw':
+            with open(os.path.join(self.output_dir, 'frames.json'), 'w') as meta:
+                json.dump({'width': self.width, 'height': self.height, 'fps': self.fps,
+                           'pixel_format': 'rgb24'}, meta)
+            return open(os.path.join(self.output_dir, 'frames.rgb'), 'wb')
+        if self.fmt == 'ffmpeg':
+            self.encoder = subprocess.Popen(
+                ['ffmpeg', '-y', '-loglevel', 'error',
+                 '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                 '-s', f'{self.width}x{self.height}', '-r', str(self.fps), '-i', '-',
+                 '-pix_fmt', 'yuv420p', os.path.join(self.output_dir, 'capture.mp4')],
+                stdin=subprocess.PIPE)
+            return self.encoder.stdin
+        return None
+    
+    def _writer_loop(self):
+        output = None
+        try:
+            output = self._open_output()
+            while True:
+                buffer = self.pending.get()
+                if buffer is None:
+                    break
+                if self.fmt == 'png':
+                    frame_path = os.path.join(self.output_dir, f'frame_{self.frames_written:06d}.png')
+                    pygame.image.save(pygame.surfarray.make_surface(buffer), frame_path)
+                else:
+                    # Linhas na ordem da imagem (altura, largura, RGB)
+                    output.write(buffer.transpose(1, 0, 2).tobytes())
+                self.frames_written += 1
+                self.free_buffers.append(buffer)
+        except Exception as error:  # pygame.error também cai aqui
+            self.error = error
+        finally:
+            try:
+                if output is not None:
+                    output.close()
+            except OSError as error:
+                self.error = self.error or error
+            if self.encoder is not None and self.encoder.wait() and self.error is None:
+                self.error = RuntimeError(f"ffmpeg saiu com código {self.encoder.returncode}")
+    
+    def check(self):
+        """Levanta RuntimeError se a thread de gravação falhou"""
+        if self.error is not None:
+            raise RuntimeError(f"Falha na gravação dos quadros em {self.output_dir}: {self.error}") from self.error
+    
+    def close(self):
+        """Grava os quadros pendentes e encerra a thread de gravação"""
+        # Com a thread morta a fila pode estar cheia para sempre: não bloqueia nela
+        while self.thread.is_alive():
+            try:
+                self.pending.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.thread.join()
+        self.check()
+
+class NetChannel:
+    """Socket UDP não bloqueante, com latência e perda de pacotes simuladas
+    
+    A latência é aplicada no envio: o pacote fica numa fila até a hora de
+    entrega, e é de fato enviado na próxima chamada a flush()/receive().
+    """
+    MAX_PACKET = 65507
+    
+    def __init__(self, bind=('127.0.0.1', 0), latency=0.0, loss=0.0, clock=time.monotonic, seed=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(bind)
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()
+        self.latency = latency
+        self.loss = loss
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.outbox = []
+        self.sequence = 0
+        self.bytes_sent = {}  # Por destino
+    
+    def send(self, data, address):
+        self.bytes_sent[address] = self.bytes_sent.get(address, 0) + len(data)
+        if self.loss and self.rng.random() < self.loss:
+            return
+        if self.latency:
+            self.sequence += 1
+            heapq.heappush(self.outbox, (self.clock() + self.latency, self.sequence, data, address))
+        else:
+            self.sock.sendto(data, address)
+    
+    def flush(self):
+        now = self.clock()
+        while self.outbox and self.outbox[0][0] <= now:
+            _, _, data, address = heapq.heappop(self.outbox)
+            self.sock.sendto(data, address)
+    
+    def receive(self):
+        """Pacotes que já chegaram: lista de (dados, endereço)"""
+        self.flush()
+        packets = []
+        while True:
+            try:
+                packets.append(self.sock.recvfrom(self.MAX_PACKET))
+            except (BlockingIOError, InterruptedError):
+                return packets
+            except ConnectionResetError:
+                continue  # ICMP de porta fechada (Windows)
+    
+    def close(self):
+        self.sock.close()
+
+class SnapshotCodec:
+    """Codificação binária compacta dos snapshots do co-op
+    
+    Um estado é (placar, wave, jogadores, entidades, balas), já quantizado:
+    posições em int16, rotação em 1/256 de volta, tempos em centésimos.
+    As entidades são codificadas em delta contra um estado base: só entram
+    as novas (completas), as alteradas (só os campos que mudaram, com
+    posição em int8 quando o deslocamento cabe) e a lista de removidas.
+    """
+    INPUT = b'I'
+    SNAPSHOT = b'S'
+    
+    # Bits de campos alterados de uma entidade
+    NEW = 0x01
+    POS8 = 0x02
+    POS16 = 0x04
+    ROTATION = 0x08
+    HEALTH = 0x10
+    
+    header = struct.Struct('<cIIBIIH')      # tipo, tick, tick base, slot, entrada processada, placar, wave
+    player = struct.Struct('<hbBBBB')       # x, vidas, saúde, arma, tempo da arma, invulnerável
+    entity_new = struct.Struct('<BhhBBBBBI')  # tipo, x, y, rotação, saúde, tamanho, categoria/arma, núcleo, forma
+    entity_id = struct.Struct('<IB')        # handle, bits de campos
+    pos8 = struct.Struct('<bb')
+    pos16 = struct.Struct('<hh')
+    byte = struct.Struct('<B')
+    count = struct.Struct('<H')
+    handle = struct.Struct('<I')
+    bullet = struct.Struct('<hhB')
+    input_header = struct.Struct('<cIIB')   # tipo, seq. da entrada mais nova, tick confirmado, quantidade
+    input_entry = struct.Struct('<bB')      # movimento, atirar
+    
+    @staticmethod
+    def capture(world):
+        """Estado quantizado do mundo para envio"""
+        players = tuple(
+            (int(p.rect.centerx), max(-128, min(127, p.lives)), int(p.health),
+             p.weapon_type.value, min(255, int(p.weapon_timer * 20)), min(255, int(max(0, p.invulnerable) * 100)))
+            for p in world.players)
+        entities = {}
+        for index in world.entities.live_indices().tolist():
+            obj = world.entities.objects[index]
+            x = int(round(float(world.entities.x[index])))
+            y = int(round(float(world.entities.y[index])))
+            if world.entities.kind[index] == ENTITY_ASTEROID:
+                entities[obj.handle] = (ENTITY_ASTEROID, x, y, int(obj.rotation * 256 / 360) & 0xFF,
+                                        max(0, obj.health), obj.size, obj.size_category, int(obj.energy_core),
+                                        obj.shape_seed)
+            else:
+                entities[obj.handle] = (ENTITY_POWERUP, x, y, 0, 0, 20, obj.weapon_type.value, 0, 0)
+        bullets = tuple((int(b.x), int(b.y), b.weapon_type.value) for b in world.bullets)
+        return (world.score, world.wave_manager.current_wave, players, entities, bullets)
+    
+    @classmethod
+    def encode(cls, tick, base_tick, slot, input_seq, state, base_state):
+        score, wave, players, entities, bullets = state
+        base_entities = base_state[3] if base_state is not None else {}
+        parts = [cls.header.pack(cls.SNAPSHOT, tick, base_tick, slot, input_seq, score, min(wave, 0xFFFF)),
+                 cls.byte.pack(len(players))]
+        parts.extend(cls.player.pack(*p) for p in players)
         
-        # Testa o spawn de asteroides com dt maior que o delay
-        dt = 0.6  # Maior que o spawn_delay de 0.5
-        should_spawn = wave_manager.should_spawn_asteroid(dt)
-        self.assertTrue(should_spawn)
+        # Entidades removidas desde a base
+        removed = [h for h in base_entities if h not in entities]
+        parts.append(cls.count.pack(len(removed)))
+        parts.extend(cls.handle.pack(h) for h in removed)
         
-        # Testa se completa a wave
-        for _ in range(3):
-            wave_manager.should_spawn_asteroid(dt)
+        # Entidades novas ou alteradas
+        records = []
+        for h, entity in entities.items():
+            base = base_entities.get(h)
+            if base is None:
+                records.append(cls.entity_id.pack(h, cls.NEW) + cls.entity_new.pack(*entity))
+                continue
+            flags = 0
+            fields = []
+            dx = entity[1] - base[1]
+            dy = entity[2] - base[2]
+            if dx or dy:
+                if -128 <= dx <= 127 and -128 <= dy <= 127:
+                    flags |= cls.POS8
+                    fields.append(cls.pos8.pack(dx, dy))
+                else:
+                    flags |= cls.POS16
+                    fields.append(cls.pos16.pack(entity[1], entity[2]))
+            if entity[3] != base[3]:
+                flags |= cls.ROTATION
+                fields.append(cls.byte.pack(entity[3]))
+            if entity[4] != base[4]:
+                flags |= cls.HEALTH
+                fields.append(cls.byte.pack(entity[4]))
+            if flags:
+                records.append(cls.entity_id.pack(h, flags) + b''.join(fields))
+        parts.append(cls.count.pack(len(records)))
+        parts.extend(records)
         
-        # Após completar, não deve spawnar mais asteroides imediatamente
-        should_spawn = wave_manager.should_spawn_asteroid(dt)
-        self.assertFalse(should_spawn)
+        parts.append(cls.count.pack(len(bullets)))
+        parts.extend(cls.bullet.pack(*b) for b in bullets)
+        return b''.join(parts)
     
-    def test_asteroid_health(self):
-        """Testa a saúde dos asteroides"""
-        asteroid = Asteroid(1)  # Asteroide pequeno
-        self.assertEqual(asteroid.health, 1)
-        self.assertEqual(asteroid.max_health, 1)
+    @classmethod
+    def decode(cls, data, base_states):
+        """Decodifica um snapshot; retorna None se a base não estiver em `base_states`"""
+        _, tick, base_tick, slot, input_seq, score, wave = cls.header.unpack_from(data, 0)
+        if base_tick and base_tick not in base_states:
+            return None
+        entities = dict(base_states[base_tick][3]) if base_tick else {}
+        offset = cls.header.size
         
-        # Testa dano
-        destroyed = asteroid.hit(1)
-        self.assertTrue(destroyed)
+        num_players, = cls.byte.unpack_from(data, offset)
+        offset += 1
+        players = []
+        for _ in range(num_players):
+            players.append(cls.player.unpack_from(data, offset))
+            offset += cls.player.size
         
-        # Testa asteroide médio
-        asteroid = Asteroid(2)
-        self.assertEqual(asteroid.health, 2)
+        removed, = cls.count.unpack_from(data, offset)
+        offset += 2
+        for _ in range(removed):
+            entities.pop(cls.handle.unpack_from(data, offset)[0], None)
+            offset += 4
         
-        destroyed = asteroid.hit(1)
-        self.assertFalse(destroyed)
-        self.assertEqual(asteroid.health, 1)
+        changed, = cls.count.unpack_from(data, offset)
+        offset += 2
+        for _ in range(changed):
+            h, flags = cls.entity_id.unpack_from(data, offset)
+            offset += cls.entity_id.size
+            if flags & cls.NEW:
+                entities[h] = cls.entity_new.unpack_from(data, offset)
+                offset += cls.entity_new.size
+                continue
+            entity = list(entities[h])
+            if flags & cls.POS8:
+                dx, dy = cls.pos8.unpack_from(data, offset)
+                entity[1] += dx
+                entity[2] += dy
+                offset += 2
+            elif flags & cls.POS16:
+                entity[1], entity[2] = cls.pos16.unpack_from(data, offset)
+                offset += 4
+            if flags & cls.ROTATION:
+                entity[3] = data[offset]
+                offset += 1
+            if flags & cls.HEALTH:
+                entity[4] = data[offset]
+                offset += 1
+            entities[h] = tuple(entity)
+        
+        num_bullets, = cls.count.unpack_from(data, offset)
+        offset += 2
+        bullets = tuple(cls.bullet.unpack_from(data, offset + i * cls.bullet.size) for i in range(num_bullets))
+        
+        state = (score, wave, tuple(players), entities, bullets)
+        return tick, slot, input_seq, state
 
-def main():
-    # Configuração da tela
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Space Defender - Futuristic Edition")
-    clock = pygame.time.Clock()
+class CoopServer:
+    """Servidor autoritativo do co-op: roda a simulação e envia snapshots em delta
     
-    # Gerenciador de som
-    sound_manager = SoundManager()
+    Cada cliente recebe snapshots codificados contra o último tick que ele
+    confirmou (ou completos, se a base já saiu do histórico). As entradas
+    chegam com redundância e são aplicadas em ordem, uma por tick; se uma
+    rajada de perdas maior que a redundância abre uma lacuna, o servidor
+    pula para a entrada mais antiga recebida.
+    """
+    MAX_BUFFERED_INPUTS = 64  # Entradas futuras guardadas por cliente
     
-    # Efeitos visuais
-    starfield = StarField()
-    particle_system = ParticleSystem(500)
-    hud = HUD()
+    def __init__(self, channel, num_players=2, snapshot_rate=NET_SNAPSHOT_RATE):
+        self.channel = channel
+        self.world = GameWorld(num_players, render=False)
+        self.snapshot_interval = max(1, NET_TICK_RATE // snapshot_rate)
+        self.clients = {}  # endereço -> estado do cliente
+        self.history = {}  # tick -> estado capturado
     
-    # Grupos de sprites
-    all_sprites = pygame.sprite.Group()
-    asteroids = pygame.sprite.Group()
-    powerups = pygame.sprite.Group()
+    def handle_input(self, data, address):
+        if data[:1] != SnapshotCodec.INPUT:
+            return
+        client = self.clients.get(address)
+        if client is None:
+            taken = {c['slot'] for c in self.clients.values()}
+            free = [slot for slot in range(len(self.world.players)) if slot not in taken]
+            if not free:
+                return  # Partida cheia
+            client = self.clients[address] = {
+                'slot': free[0], 'inputs': {}, 'processed': 0, 'move': 0, 'ack': 0}
+        _, newest, ack, count = SnapshotCodec.input_header.unpack_from(data, 0)
+        client['ack'] = max(client['ack'], ack)
+        offset = SnapshotCodec.input_header.size
+        for i in range(count):
+            seq = newest - i
+            if seq > client['processed']:
+                client['inputs'][seq] = SnapshotCodec.input_entry.unpack_from(data, offset)
+            offset += SnapshotCodec.input_entry.size
+        inputs = client['inputs']
+        while len(inputs) > self.MAX_BUFFERED_INPUTS:
+            del inputs[min(inputs)]
     
-    # Lista de balas - MOVIDA PARA FORA DO LOOP
-    bullets = []
+    def tick(self):
+        for data, address in self.channel.receive():
+            self.handle_input(data, address)
+        self.advance()
     
-    # Variáveis do jogo
-    running = True
-    game_over = False
-    score = 0
-    player_health = 100
+    def advance(self, steps=1):
+        """Avança `steps` ticks de uma vez (servidor sobrecarregado agrupa ticks e pula snapshots)
+        
+        Cada tick do lote é um passo normal de 1/NET_TICK_RATE com a sua própria
+        entrada, porque balas e asteroides andam uma distância fixa por passo.
+        """
+        world = self.world
+        dt = 1 / NET_TICK_RATE
+        snapshot_due = False
+        for _ in range(steps):
+            # Uma entrada por cliente por tick; sem entrada nova, mantém o último movimento
+            inputs = [(0, False)] * len(world.players)
+            for client in self.clients.values():
+                shoot = False
+                pending = client['inputs']
+                if pending:
+                    seq = client['processed'] + 1
+                    if seq not in pending:
+                        seq = min(pending)  # Lacuna que a redundância não cobre: não há como recuperá-la
+                    next_input = pending.pop(seq)
+                    client['processed'] = seq
+                    client['move'] = next_input[0]
+                    shoot = bool(next_input[1])
+                inputs[client['slot']] = (client['move'], shoot)
+            
+            world.step(dt, inputs)
+            if world.game_over:
+                world.reset()
+            snapshot_due = snapshot_due or world.tick % self.snapshot_interval == 0
+        
+        if snapshot_due:
+            self.send_snapshots()
     
-    # Mostrar tela inicial
-    if not show_start_screen(screen, clock):
-        return
+    def send_snapshots(self):
+        tick = self.world.tick
+        state = SnapshotCodec.capture(self.world)
+        self.history[tick] = state
+        if len(self.history) > NET_HISTORY:
+            del self.history[next(iter(self.history))]  # Ticks em lote nem sempre caem no intervalo
+        for address, client in self.clients.items():
+            base_tick = client['ack'] if client['ack'] in self.history else 0
+            packet = SnapshotCodec.encode(tick, base_tick, client['slot'], client['processed'],
+                                          state, self.history.get(base_tick))
+            self.channel.send(packet, address)
     
-    # Criar jogador
-    player = Player()
-    all_sprites.add(player)
+    def serve_forever(self):
+        interval = 1 / NET_TICK_RATE
+        next_tick = time.monotonic()
+        while True:
+            self.tick()
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+class CoopClient:
+    """Cliente do co-op com predição local do movimento da própria nave
     
-    # Gerenciador de waves
-    wave_manager = WaveManager()
+    A posição da nave é prevista aplicando cada entrada imediatamente; a
+    cada snapshot ela é reconciliada com a posição do servidor mais as
+    entradas que o servidor ainda não processou.
+    """
+    REDUNDANCY = 8  # Entradas repetidas em cada pacote para sobreviver a perdas
     
-    # Variáveis de spawn
-    powerup_spawn_timer = 0
+    def __init__(self, channel, server_address):
+        self.channel = channel
+        self.server_address = server_address
+        self.input_seq = 0
+        self.processed = 0  # Última entrada aplicada pelo servidor
+        self.pending = deque()
+        self.recent_inputs = deque(maxlen=self.REDUNDANCY)
+        self.states = {}
+        self.tick = 0
+        self.state = None
+        self.slot = None
+        self.predicted_x = None
+        self.remote = {}  # handle do servidor -> réplica local (Asteroid/PowerUp)
     
-    # Loop principal do jogo
-    while running:
-        # Delta time
-        dt = clock.tick(FPS) / 1000.0
+    @staticmethod
+    def predict_x(x, move):
+        # Mesma regra de Player.update com dt fixo de um tick
+        x += move * 12 * 60 / NET_TICK_RATE
+        return max(30, min(SCREEN_WIDTH - 30, x))
+    
+    def send_input(self, move, shoot):
+        self.input_seq += 1
+        entry = (move, int(shoot))
+        self.recent_inputs.appendleft(entry)
+        self.pending.append((self.input_seq, move))
+        if self.predicted_x is not None:
+            self.predicted_x = self.predict_x(self.predicted_x, move)
         
-        # Processar eventos
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    player.shoot(sound_manager, bullets)
+        packet = [SnapshotCodec.input_header.pack(SnapshotCodec.INPUT, self.input_seq, self.tick,
+                                                  len(self.recent_inputs))]
+        packet.extend(SnapshotCodec.input_entry.pack(*e) for e in self.recent_inputs)
+        self.channel.send(b''.join(packet), self.server_address)
+    
+    def poll(self):
+        """Processa os snapshots recebidos; retorna True se o estado mudou"""
+        updated = False
+        for data, _ in self.channel.receive():
+            if data[:1] != SnapshotCodec.SNAPSHOT:
+                continue
+            decoded = SnapshotCodec.decode(data, self.states)
+            if decoded is None:
+                continue  # Base desconhecida; o servidor reenvia contra a última confirmada
+            tick, slot, processed, state = decoded
+            if tick <= self.tick:
+                continue  # Fora de ordem
+            self.processed = processed
+            self.states[tick] = state
+            if len(self.states) > NET_HISTORY:
+                del self.states[min(self.states)]
+            self.tick = tick
+            self.state = state
+            self.slot = slot
+            
+            # Reconciliação: posição do servidor + entradas ainda não processadas
+            while self.pending and self.pending[0][0] <= processed:
+                self.pending.popleft()
+            x = state[2][slot][0]
+            for _, move in self.pending:
+                x = self.predict_x(x, move)
+            self.predicted_x = x
+            updated = True
+        return updated
+    
+    def apply_to(self, world):
+        """Atualiza um GameWorld local (só para desenho) com o último snapshot"""
+        if self.state is None:
+            return
+        score, wave, players, entities, bullets = self.state
+        world.score = score
+        world.wave_manager.current_wave = wave
+        for i, (x, lives, health, weapon, weapon_timer, invulnerable) in enumerate(players):
+            player = world.players[i]
+            if i == self.slot and self.predicted_x is not None:
+                x = self.predicted_x
+            player.trail.add_point(player.rect.centerx, player.rect.centery)
+            player.rect.centerx = x
+            player.lives = lives
+            player.health = health
+            player.weapon_timer = weapon_timer / 20
+            player.invulnerable = invulnerable / 100
+            player.shield_active = player.invulnerable > 0
+            player.shield_timer = player.invulnerable
+            if player.weapon_type.value != weapon:
+                player.weapon_type = WeaponType(weapon)
+                player.draw_spaceship()
         
-        # Spawn de asteroides baseado em waves
-        if wave_manager.should_spawn_asteroid(dt):
-            size = wave_manager.get_asteroid_size()
-            asteroid = Asteroid(size)
-            all_sprites.add(asteroid)
-            asteroids.add(asteroid)
+        store = world.entities
+        for h in [h for h in self.remote if h not in entities]:
+            store.kill(self.remote.pop(h).handle)
+        for h, (kind, x, y, rotation, health, size, variant, energy_core, shape_seed) in entities.items():
+            obj = self.remote.get(h)
+            if obj is None:
+                if kind == ENTITY_ASTEROID:
+                    # Mesma forma do servidor, sem consumir o random local
+                    obj = Asteroid.from_state(variant, size, shape_seed, bool(energy_core))
+                    obj.health = obj.max_health = variant
+                    obj.speed_x = obj.speed_y = obj.rotation = obj.rotation_speed = 0
+                else:
+                    obj = PowerUp(x, y, WeaponType(variant))
+                obj.rect.center = (x, y)
+                store.spawn(obj, kind)
+                self.remote[h] = obj
+            index = obj.handle & EntityStore.INDEX_MASK
+            store.x[index] = x
+            store.y[index] = y
+            obj.rect.center = (x, y)
+            if kind == ENTITY_ASTEROID:
+                while obj.health > health and obj.health > 0:
+                    obj.health -= 1
+                    obj.add_crack(random.Random(obj.shape_seed + len(obj.cracks)))
+                obj.rotation = rotation * 360 / 256
+                obj.render_rotation()
         
-        # Spawn de power-ups
-        powerup_spawn_timer += dt
-        if powerup_spawn_timer > 15.0:  # AUMENTADO para 15 segundos
-            powerup_spawn_timer = 0
-            weapon_type = random.choice(list(WeaponType))
-            powerup = PowerUp(random.randint(50, SCREEN_WIDTH-50), -40, weapon_type)
-            all_sprites.add(powerup)
-            powerups.add(powerup)
+        world.bullets = [Bullet(x, y, WeaponType(weapon)) for x, y, weapon in bullets]
+
+class Scene:
+    """Uma tela na pilha do SceneStack (início, partida, pausa, game over)
+    
+    Só a cena do topo recebe eventos e update(dt). Com `overlay` a cena de
+    baixo é desenhada antes (a pausa por cima da partida congelada). Cenas
+    `idle` não animam: o SceneStack só redesenha depois de eventos que mudam
+    a tela (marcando `dirty`) e dorme em pygame.event.wait em vez de girar a
+    60 Hz; com `wait_ms` > 0 a espera termina em NOEVENT após esse tempo.
+    """
+    idle = False
+    overlay = False
+    wait_ms = 0
+    stack = None
+    
+    def handle(self, event):
+        pass
+    
+    def update(self, dt):
+        pass
+    
+    def draw(self, surface):
+        pass
+    
+    def close(self):
+        """Chamado quando a cena sai da pilha"""
+
+class SceneStack:
+    """Pilha de cenas conduzida por um único laço (substitui os laços próprios das telas)"""
+    def __init__(self, screen, clock):
+        self.screen = screen
+        self.clock = clock
+        self.scenes = []
+        self.dirty = True
+        self.frames = 0  # Quadros desenhados (com cenas idle, só os que mudaram)
+    
+    @property
+    def top(self):
+        return self.scenes[-1] if self.scenes else None
+    
+    def push(self, scene):
+        scene.stack = self
+        self.scenes.append(scene)
+        self.dirty = True
+    
+    def pop(self):
+        scene = self.scenes.pop()
+        scene.close()
+        self.dirty = True
+        return scene
+    
+    def clear(self):
+        while self.scenes:
+            self.pop()
+    
+    def draw(self):
+        # A partir da cena mais alta que cobre a tela inteira
+        start = len(self.scenes) - 1
+        while start > 0 and self.scenes[start].overlay:
+            start -= 1
+        for scene in self.scenes[start:]:
+            scene.draw(self.screen)
+        pygame.display.flip()
+        self.frames += 1
+        self.dirty = False
+    
+    def run(self):
+        """Conduz as cenas até a pilha esvaziar (QUIT esvazia a pilha)"""
+        clock = self.clock
+        while self.scenes:
+            scene = self.scenes[-1]
+            if scene.idle:
+                if self.dirty:
+                    self.draw()
+                events = [pygame.event.wait(scene.wait_ms)] + pygame.event.get()
+                clock.tick()  # O tempo parado não entra no dt do próximo quadro
+                dt = 0.0
+            else:
+                dt = clock.tick(FPS) / 1000.0
+                events = pygame.event.get()
+            
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.clear()
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.dirty = True
+                if not self.scenes:
+                    return
+                self.scenes[-1].handle(event)
+            
+            scene = self.top
+            if scene is None or scene.idle:
+                continue
+            scene.update(dt)
+            if self.top is not None and not self.top.idle:
+                self.draw()
+
+class StartScene(Scene):
+    """Tela inicial; ENTER começa o jogo
+    
+    Com `attract` > 0 segundos sem nenhuma entrada, entra o modo
+    demonstração (DemoScene) até a próxima tecla ou clique.
+    """
+    idle = True
+    
+    def __init__(self, attract=0):
+        self.wait_ms = int(attract * 1000)
+    
+    def handle(self, event):
+        if event.type == pygame.NOEVENT and self.wait_ms:
+            self.stack.push(DemoScene())
+        elif event.type == pygame.KEYUP and event.key == pygame.K_RETURN:
+            self.stack.pop()
+    
+    def draw(self, surface):
+        surface.fill(BLACK)
         
-        # Atualizar
-        all_sprites.update(dt)
-        starfield.update()
-        particle_system.update(dt)
-        player.trail.update()
+        # Título
+        title_font = load_font(72)
+        title_text = title_font.render("SPACE DEFENDER", True, CYAN)
+        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, 150))
+        surface.blit(title_text, title_rect)
         
-        # Atualizar balas
-        for bullet in bullets[:]:
-            bullet.update(asteroids)
-            if not bullet.active:
-                bullets.remove(bullet)
+        # Subtítulo
+        subtitle_font = load_font(36)
+        subtitle_text = subtitle_font.render("FUTURISTIC EDITION", True, ELECTRIC_BLUE)
+        subtitle_rect = subtitle_text.get_rect(center=(SCREEN_WIDTH//2, 220))
+        surface.blit(subtitle_text, subtitle_rect)
         
-        # Verificar colisões - balas com asteroides
-        for bullet in bullets[:]:
-            bullet_rect = bullet.get_rect()
-            for asteroid in asteroids:
-                if bullet_rect.colliderect(asteroid.rect):
-                    if asteroid.hit(bullet.damage):
-                        score += 20 if asteroid.energy_core else 10
-                        sound_manager.play('explosion')
-                        
-                        # Explosão
-                        particle_system.emit(
-                            asteroid.rect.centerx, 
-                            asteroid.rect.centery, 
-                            YELLOW if asteroid.energy_core else ORANGE, 
-                            count=40 if asteroid.energy_core else 30
-                        )
-                        asteroid.kill()
-                    else:
-                        particle_system.emit(
-                            asteroid.rect.centerx, 
-                            asteroid.rect.centery, 
-                            CYAN, 
-                            count=15
-                        )
-                    if bullet in bullets:
-                        bullets.remove(bullet)
-                    break
+        # Controles
+        controls_font = load_font(28)
+        controls = [
+            "CONTROLES:",
+            "← → : Mover a nave",
+            "ESPAÇO : Atirar      P : Pausar",
+            "ENTER : Começar o jogo"
+        ]
         
-        # Verificar colisões - jogador com asteroides
-        if player.invulnerable <= 0:
-            hits = pygame.sprite.spritecollide(player, asteroids, True, pygame.sprite.collide_circle_ratio(0.7))
-            for hit in hits:
-                player.lives -= 1
-                player.invulnerable = 2.0
-                player_health = max(0, player_health - 25)
-                
-                particle_system.emit(
-                    player.rect.centerx, 
-                    player.rect.centery, 
-                    RED, 
-                    count=40
-                )
-                
-                if player.lives <= 0 or player_health <= 0:
-                    game_over = True
+        y = 320
+        for control in controls:
+            control_text = controls_font.render(control, True, WHITE)
+            control_rect = control_text.get_rect(center=(SCREEN_WIDTH//2, y))
+            surface.blit(control_text, control_rect)
+            y += 40
+        
+        # Instrução adicional
+        instruction_font = load_font(24)
+        instruction_text = instruction_font.render("Colete power-ups para mudar sua arma!", True, NEON_GREEN)
+        instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH//2, 500))
+        surface.blit(instruction_text, instruction_rect)
+
+class DemoScene(Scene):
+    """Modo demonstração: uma partida jogada pelo RandomPilot atrás do convite para jogar"""
+    def __init__(self):
+        self.particle_system = ParticleSystem(200)
+        self.world = GameWorld(particle_system=self.particle_system)
+        self.pilot = RandomPilot(random.Random())
+        self.starfield = StarField()
+        self.hud = HUD()
+        self.prompt = load_font(36).render("PRESSIONE ENTER PARA JOGAR", True, GOLD)
+        self.blink = 0.0
+    
+    def handle(self, event):
+        if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            self.stack.pop()
+    
+    def update(self, dt):
+        world = self.world
+        world.step(dt, [self.pilot.act(world)])
+        self.starfield.update()
+        self.particle_system.update(dt)
+        world.player.trail.update()
+        if world.game_over:
+            self.particle_system.particles.clear()
+            world.reset()
+        self.blink = (self.blink + dt) % 1.0
+    
+    def draw(self, surface):
+        draw_world(surface, self.world, self.starfield, self.particle_system, self.hud)
+        if self.blink < 0.6:
+            surface.blit(self.prompt, self.prompt.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2)))
+
+class PauseScene(Scene):
+    """Pausa (P ou ESC) por cima da partida congelada"""
+    idle = True
+    overlay = True
+    
+    def __init__(self):
+        self.shade = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.shade.fill((0, 0, 0, 150))
+        self.title = load_font(72).render("PAUSADO", True, CYAN)
+        self.hint = load_font(24).render("P ou ESC: continuar", True, WHITE)
+    
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN and event.key in (pygame.K_p, pygame.K_ESCAPE):
+            self.stack.pop()
+    
+    def draw(self, surface):
+        surface.blit(self.shade, (0, 0))
+        surface.blit(self.title, self.title.get_rect(center=(SCREEN_WIDTH//2, 250)))
+        surface.blit(self.hint, self.hint.get_rect(center=(SCREEN_WIDTH//2, 330)))
+
+class GameOverScene(Scene):
+    """Tela de game over moderna
+    
+    ENTER ou PLAY AGAIN recomeçam a partida; R ou RETRY WAVE voltam ao
+    início da wave `retry_wave` (botão só aparece se houver ponto de retorno).
+    """
+    idle = True
+    
+    def __init__(self, play, score, wave, best=None, rank=None, retry_wave=None):
+        self.play = play
+        self.score = score
+        self.wave = wave
+        self.best = best
+        self.rank = rank
+        self.retry_wave = retry_wave
+        
+        # Botão de jogar novamente (e de repetir a wave, se houver ponto de retorno)
+        self.retry_button = None
+        if retry_wave is None:
+            self.play_button = Button(SCREEN_WIDTH//2 - 150, 400, 300, 60, "PLAY AGAIN", NEON_GREEN)
+            self.message = "Clique no botão ou pressione ENTER"
         else:
-            # Recuperar saúde lentamente
-            player_health = min(100, player_health + dt * 5)
-        
-        # Verificar colisões - jogador com power-ups
-        powerup_hits = pygame.sprite.spritecollide(player, powerups, True)
-        for powerup in powerup_hits:
-            player.change_weapon(powerup.weapon_type)
-            sound_manager.play('powerup')
-            particle_system.emit(
-                powerup.rect.centerx,
-                powerup.rect.centery,
-                powerup.colors[powerup.weapon_type],
-                count=30
-            )
+            self.play_button = Button(SCREEN_WIDTH//2 - 310, 400, 300, 60, "PLAY AGAIN", NEON_GREEN)
+            self.retry_button = Button(SCREEN_WIDTH//2 + 10, 400, 300, 60, f"RETRY WAVE {retry_wave}", ELECTRIC_BLUE)
+            self.message = "ENTER: jogar de novo    R: repetir a wave"
+        self.buttons = [button for button in (self.play_button, self.retry_button) if button]
+        self.hover(pygame.mouse.get_pos())
+    
+    def hover(self, mouse_pos):
+        """Atualiza o destaque dos botões; True se algum mudou"""
+        changed = False
+        for button in self.buttons:
+            hovered = button.hovered
+            button.update(mouse_pos)
+            changed |= button.hovered != hovered
+        return changed
+    
+    def handle(self, event):
+        if event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN) and self.hover(event.pos):
+            self.stack.dirty = True  # Só o destaque mudou: um redesenho, não 60 por segundo
+        if event.type == pygame.KEYUP:
+            if event.key == pygame.K_RETURN:
+                self.finish(False)
+            elif event.key == pygame.K_r and self.retry_button:
+                self.finish(True)
+        elif self.play_button.is_clicked(event):
+            self.finish(False)
+        elif self.retry_button and self.retry_button.is_clicked(event):
+            self.finish(True)
+    
+    def finish(self, retry):
+        self.stack.pop()
+        self.play.restart(self.retry_wave if retry else None)
+    
+    def draw(self, surface):
+        surface.fill(BLACK)
         
-        # Desenhar
-        screen.fill(BLACK)
-        starfield.draw(screen)
+        # Fundo com efeito de grade
+        for x in range(0, SCREEN_WIDTH, 40):
+            pygame.draw.line(surface, (20, 20, 30), (x, 0), (x, SCREEN_HEIGHT))
+        for y in range(0, SCREEN_HEIGHT, 40):
+            pygame.draw.line(surface, (20, 20, 30), (0, y), (SCREEN_WIDTH, y))
         
-        # Desenhar rastro da nave
-        player.trail.draw(screen)
+        # Título Game Over
+        title_font = load_font(72)
+        title_text = title_font.render("GAME OVER", True, RED)
+        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, 150))
         
-        # Desenhar sprites
-        all_sprites.draw(screen)
+        # Efeito de brilho
+        glow_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        for i in range(5):
+            glow_text = title_font.render("GAME OVER", True, (*RED, 50 - i*10))
+            glow_rect = glow_text.get_rect(center=title_rect.center)
+            glow_surf.blit(glow_text, glow_rect)
+        surface.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+        surface.blit(title_text, title_rect)
         
-        # Desenhar balas
-        for bullet in bullets:
-            bullet.draw(screen)
+        # Estatísticas
+        stats_font = load_font(48)
+        score_text = stats_font.render(f"SCORE: {self.score}", True, YELLOW)
+        score_rect = score_text.get_rect(center=(SCREEN_WIDTH//2, 250))
+        surface.blit(score_text, score_rect)
         
-        # Desenhar partículas
-        particle_system.draw(screen)
+        wave_text = stats_font.render(f"WAVE: {self.wave}", True, CYAN)
+        wave_rect = wave_text.get_rect(center=(SCREEN_WIDTH//2, 310))
+        surface.blit(wave_text, wave_rect)
         
-        # Desenhar escudo
-        player.draw_shield(screen)
+        # Recorde salvo
+        if self.best is not None:
+            rank = self.rank
+            record_font = load_font(28)
+            record = "NOVO RECORDE!" if rank == 1 else f"RECORDE: {self.best}" + (f"  (#{rank})" if rank else "")
+            record_text = record_font.render(record, True, GOLD)
+            record_rect = record_text.get_rect(center=(SCREEN_WIDTH//2, 355))
+            surface.blit(record_text, record_rect)
         
-        # Desenhar HUD
-        hud.draw(screen, score, player.lives, player_health, 
-                wave_manager.current_wave, player.weapon_type, player.weapon_timer)
+        for button in self.buttons:
+            button.draw(surface)
         
-        # Efeito de piscar quando invulnerável
-        if player.invulnerable > 0 and int(player.invulnerable * 10) % 2:
-            player.image.set_alpha(128)
+        # Mensagem adicional
+        msg_font = load_font(24)
+        msg_text = msg_font.render(self.message, True, WHITE)
+        msg_rect = msg_text.get_rect(center=(SCREEN_WIDTH//2, 500))
+        surface.blit(msg_text, msg_rect)
+
+class PlayScene(Scene):
+    """A partida: entrada, simulação, desenho, save-states e game over"""
+    def __init__(self, args, world, particle_system, hud):
+        self.args = args
+        self.world = world
+        self.sound_manager = world.sound_manager
+        self.particle_system = particle_system
+        self.hud = hud
+        self.starfield = StarField()
+        self.shoot = False
+        
+        # Gravação de quadros (opcional)
+        self.recorder = FrameRecorder(args.record, fmt=args.record_format) if args.record else None
+        self.frame_count = 0
+        self.frame_start = None  # Início do quadro em andamento (None: redesenho sem simular)
+        
+        # Jogador automático (opcional)
+        self.autopilot = None
+        if args.autopilot:
+            self.autopilot = Autopilot(rollouts=args.autopilot_rollouts, workers=args.autopilot_workers)
+        
+        # Pontos de retorno: início de cada wave (repetir a wave) e save-state rápido (F5/F9)
+        self.checkpoints = {}
+        self.quicksave = None
+        self.quicksave_path = os.path.join(args.scores_dir, 'quicksave.sdws') if args.scores_dir else None
+        
+        # Histórico de partidas (só o índice do placar é lido aqui)
+        self.score_store = ScoreStore(args.scores_dir) if args.scores_dir else None
+        
+        # Qualidade visual: automática (governador) ou fixa
+        self.governor = None
+        if args.quality == 'auto':
+            QUALITY.apply(len(QUALITY_LEVELS) - 1)
+            self.governor = QualityGovernor()
         else:
-            player.image.set_alpha(255)
+            QUALITY.apply(int(args.quality))
+        self.profiler = ProfilerOverlay(args.profile)
         
-        pygame.display.flip()
+        # Profiler por amostragem (F4 liga/desliga); pilhas gravadas a cada game over
+        self.sampler = SamplingProfiler(args.sample_interval / 1000, args.sample_fine_switch)
+        self.sample_dir = args.sample_dir
+        if args.sample_profile:
+            self.sampler.start()
+    
+    def handle(self, event):
+        if event.type != pygame.KEYDOWN:
+            return
+        world = self.world
+        if event.key == pygame.K_SPACE:
+            self.shoot = True
+        elif event.key == pygame.K_F3:
+            self.profiler.toggle()
+        elif event.key == pygame.K_F4:
+            self.sampler.toggle()
+        elif event.key in (pygame.K_p, pygame.K_ESCAPE):
+            self.stack.push(PauseScene())
+        elif event.key == pygame.K_F5:
+            self.quicksave = world.snapshot()
+            if self.quicksave_path:
+                self.quicksave.save(self.quicksave_path)
+        elif event.key == pygame.K_F9:
+            if self.quicksave is None and self.quicksave_path and os.path.exists(self.quicksave_path):
+                self.quicksave = WorldSnapshot.load(self.quicksave_path)
+            if self.quicksave is not None:
+                world.restore(self.quicksave)
+                self.particle_system.particles.clear()
+    
+    def update(self, dt):
+        world = self.world
+        # Game over do quadro anterior (já desenhado) e limite de quadros
+        if world.game_over:
+            self.end_game()
+            return
+        if self.args.max_frames and self.frame_count >= self.args.max_frames:
+            self.stack.clear()
+            return
         
-        # Verificar game over
-        if game_over:
-            if not show_game_over_screen(screen, clock, score, wave_manager.current_wave):
-                running = False
-            game_over = False
-            score = 0
-            player_health = 100
-            
-            # Resetar jogo
-            all_sprites.empty()
-            asteroids.empty()
-            powerups.empty()
-            particle_system.particles.clear()
-            bullets.clear()  # Limpar a lista de balas
+        self.frame_start = time.perf_counter()
+        shoot, self.shoot = self.shoot, False
+        world.step(dt, [self.autopilot.act(world) if self.autopilot else (read_move_input(), shoot)])
+        if world.wave_manager.current_wave not in self.checkpoints:
+            self.checkpoints[world.wave_manager.current_wave] = world.snapshot()
+        self.sound_manager.flush()
+        self.starfield.update()
+        self.particle_system.update(dt)
+        world.player.trail.update()
+    
+    def draw(self, surface):
+        world = self.world
+        draw_world(surface, world, self.starfield, self.particle_system, self.hud)
+        self.profiler.draw(surface, self.stack.clock, world, self.particle_system, self.governor)
+        if self.frame_start is None:
+            return  # Redesenho por baixo da pausa: não é um quadro da partida
+        
+        # Tempo de trabalho do quadro (sem a espera do clock)
+        frame_time = time.perf_counter() - self.frame_start
+        self.frame_start = None
+        self.profiler.record(frame_time)
+        if self.governor:
+            self.governor.observe(frame_time)
+        TELEMETRY.publish('frame', ms=round(frame_time * 1000, 2))
+        if frame_time > 1.0 / FPS:
+            TELEMETRY.publish('frame_spike', ms=round(frame_time * 1000, 2), wave=world.wave_manager.current_wave,
+                              entities=len(world.entities), bullets=len(world.bullets),
+                              particles=len(self.particle_system.particles))
+        
+        if self.recorder:
+            try:
+                self.recorder.capture(surface)
+            except RuntimeError as error:
+                print(error, file=sys.stderr)
+                self.recorder = None  # A thread de gravação já terminou
+        self.frame_count += 1
+    
+    def end_game(self):
+        world = self.world
+        wave = world.wave_manager.current_wave
+        TELEMETRY.publish('game_over', score=world.score, wave=wave,
+                          duration=round(world.elapsed, 2), kills=world.kills)
+        best = rank = None
+        if self.score_store:
+            rank = self.score_store.record_run(world.score, wave, world.kills, world.elapsed)
+            best = self.score_store.best_score()
+        self.dump_samples()
+        self.particle_system.particles.clear()
+        if self.args.headless:
+            self.stack.clear()
+            return
+        self.stack.push(GameOverScene(self, world.score, wave, best, rank,
+                                      wave if wave in self.checkpoints else None))
+    
+    def dump_samples(self):
+        """Grava as pilhas amostradas desde o último game over (profile-DATA-HORA.folded)"""
+        if not self.sampler.samples:
+            return
+        os.makedirs(self.sample_dir, exist_ok=True)
+        path = os.path.join(self.sample_dir, time.strftime('profile-%Y%m%d-%H%M%S.folded'))
+        samples = self.sampler.dump(path)
+        TELEMETRY.publish('profile_dump', path=path, samples=samples)
+    
+    def restart(self, retry_wave=None):
+        """Recomeça a partida (ou volta ao início da wave `retry_wave`)"""
+        if retry_wave is not None:
+            self.world.restore(self.checkpoints[retry_wave])
+            # Checkpoints de waves posteriores são da tentativa anterior, não desta
+            for wave in [wave for wave in self.checkpoints if wave > retry_wave]:
+                del self.checkpoints[wave]
+        else:
+            self.world.reset()
+            self.checkpoints.clear()
+    
+    def close(self):
+        self.sampler.stop()
+        self.dump_samples()
+        if self.recorder:
+            try:
+                self.recorder.close()
+            except RuntimeError as error:
+                print(error, file=sys.stderr)
+        if self.score_store:
+            self.score_store.close()
+        if self.autopilot:
+            self.autopilot.close()
+
+def main(args=None):
+    if args is None:
+        args = parse_args([])
+    
+    # Ajustes das armas (valem também para os servidores)
+    if args.weapons:
+        WEAPONS.load(args.weapons)
+    
+    # Pré-renderizar os assets num pacote e sair
+    if args.bake_assets:
+        index = AssetPack.bake(args.bake_assets)
+        print(f"{args.bake_assets}: {len(index['images'])} imagens, "
+              f"{sum(map(len, index['sounds'].values()))} sons, {len(index['fonts'])} fontes "
+              f"({os.path.getsize(args.bake_assets)} bytes)")
+        return
+    
+    # Teste de resistência: invariantes e memória em milhões de ticks, sem janela
+    if args.soak:
+        reports = run_soak(range(args.soak_seeds), args.soak, args.soak_workers)
+        for report in reports:
+            report.pop('memory')
+            print(json.dumps(report))
+        if any(report['violations'] for report in reports):
+            raise SystemExit(1)
+        return
+    
+    # Servidor de muitas sessões e teste de carga: sem janela
+    if args.server is not None or args.loadtest:
+        import asyncio
+    if args.server is not None:
+        server = GameServer(max_sessions=args.max_sessions)
+        print(f"Servidor de sessões escutando na porta UDP {args.server}")
+        asyncio.run(server.run(port=args.server, report_every=5.0))
+        return
+    if args.loadtest:
+        host, port = args.loadtest.rsplit(':', 1)
+        report = asyncio.run(run_load_test((socket.gethostbyname(host), int(port)),
+                                           args.loadtest_clients, args.loadtest_seconds))
+        print(json.dumps(report, indent=2))
+        return
+    
+    # Servidor co-op: só simulação, sem janela
+    if args.coop_server:
+        channel = NetChannel(('0.0.0.0', args.coop_server), latency=args.net_latency, loss=args.net_loss)
+        print(f"Servidor co-op escutando em {channel.address[0]}:{channel.address[1]}")
+        CoopServer(channel).serve_forever()
+        return
+    
+    # Assets pré-renderizados, se o pacote existir
+    if args.assets and os.path.exists(args.assets):
+        set_assets(AssetPack(args.assets))
+    
+    # Configuração da tela
+    screen = init_display(args.headless, args.window, args.fullscreen)
+    clock = pygame.time.Clock()
+    
+    if args.coop_connect:
+        run_coop_client(args, screen, clock)
+        return
+    
+    # Gerenciador de som
+    sound_manager = SoundManager()
+    
+    # Efeitos visuais (partículas e brilhos do HUD podem ficar em meia resolução)
+    particle_system = ParticleSystem(500, None if args.effects_scale == 1.0 else args.effects_scale)
+    hud = HUD(args.effects_scale)
+    
+    # Simulação (jogador, waves, asteroides, power-ups e balas)
+    Trail.DEFAULT_LENGTH = args.trail_length
+    world = GameWorld(sound_manager=sound_manager, particle_system=particle_system, horde=args.horde)
+    
+    if args.load_state:
+        world.restore(WorldSnapshot.load(args.load_state))
+    
+    # Telemetria (opcional)
+    if args.telemetry:
+        set_telemetry(TelemetryBus(args.telemetry, parse_sample_rates(args.telemetry_sample)))
+    TELEMETRY.publish('session_start', headless=args.headless)
+    
+    # Cenas num único laço: a tela inicial fica por cima da partida até o ENTER
+    # (sem janela: direto na partida, que termina no game over)
+    stack = SceneStack(screen, clock)
+    stack.push(PlayScene(args, world, particle_system, hud))
+    if not args.headless:
+        stack.push(StartScene(args.attract))
+    stack.run()
+    
+    set_telemetry(NullTelemetry()).close()
+    pygame.quit()
+
+class DatagramQueue:
+    """Protocolo de datagramas do asyncio com a mesma interface do NetChannel (send/receive/close)
+    
+    Os datagramas recebidos ficam numa fila até a próxima chamada a receive(),
+    feita pelo loop de ticks. (asyncio só é importado por quem usa a rede.)
+    """
+    def __init__(self):
+        self.transport = None
+        self.address = None
+        self.inbox = []
+        self.bytes_sent = {}
+    
+    def connection_made(self, transport):
+        self.transport = transport
+        self.address = transport.get_extra_info('sockname')
+    
+    def datagram_received(self, data, address):
+        self.inbox.append((data, address))
+    
+    def error_received(self, exc):
+        pass  # ICMP de destino inalcançável: o cliente saiu
+    
+    def connection_lost(self, exc):
+        self.transport = None
+    
+    def send(self, data, address):
+        self.bytes_sent[address] = self.bytes_sent.get(address, 0) + len(data)
+        self.transport.sendto(data, address)
+    
+    def receive(self):
+        packets, self.inbox = self.inbox, []
+        return packets
+    
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Percentis de uma lista de amostras (dicionário vazio sem amostras)"""
+    if not len(samples):
+        return {}
+    values = np.percentile(np.asarray(samples, dtype=np.float64), points)
+    return {f'p{point}': float(value) for point, value in zip(points, values)}
+
+class GameSession:
+    """Uma partida hospedada pelo GameServer"""
+    __slots__ = ['server', 'cost', 'throttle', 'pending_steps', 'last_input', 'created']
+    
+    def __init__(self, server, now):
+        self.server = server         # CoopServer de um jogador
+        self.cost = 0.0              # Média móvel do custo de um tick (s)
+        self.throttle = 1            # Avança a cada N ticks, N passos de uma vez
+        self.pending_steps = 0
+        self.last_input = now
+        self.created = now
+
+class GameServer:
+    """Servidor headless que hospeda muitas partidas independentes num só processo
+    
+    A E/S de rede é feita pelo asyncio; todas as sessões avançam juntas num
+    único loop de ticks. Cada sessão tem um orçamento de tempo por tick:
+    sessões que o estouram passam a avançar em lotes de ticks, com menos
+    rodadas do loop e menos snapshots. Se o tick inteiro estoura o intervalo, o servidor
+    para de aceitar sessões novas e, persistindo a sobrecarga, encerra a
+    sessão mais cara.
+    """
+    MAX_THROTTLE = 4
+    OVERLOAD_TICKS = NET_TICK_RATE  # Um segundo de sobrecarga antes de encerrar sessões
+    
+    def __init__(self, max_sessions=SERVER_MAX_SESSIONS, session_budget=SERVER_SESSION_BUDGET,
+                 session_timeout=SERVER_SESSION_TIMEOUT, clock=time.perf_counter):
+        self.max_sessions = max_sessions
+        self.session_budget = session_budget
+        self.session_timeout = session_timeout
+        self.clock = clock
+        self.interval = 1 / NET_TICK_RATE
+        self.sessions = {}  # endereço do cliente -> GameSession
+        self.listener = None
+        self.accepting = True
+        self.overloaded_ticks = 0
+        self.sessions_shed = 0
+        self.sessions_rejected = 0
+        self.tick_times = deque(maxlen=NET_TICK_RATE * 10)
+        self.running = False
+    
+    def route(self, packets, now):
+        for data, address in packets:
+            session = self.sessions.get(address)
+            if session is None:
+                if not self.accepting or len(self.sessions) >= self.max_sessions:
+                    self.sessions_rejected += 1
+                    continue
+                session = self.sessions[address] = GameSession(
+                    CoopServer(self.listener, num_players=1), now)
+            session.last_input = now
+            session.server.handle_input(data, address)
+    
+    def tick_all(self):
+        """Um tick do servidor: roteia entradas e avança todas as sessões"""
+        start = self.clock()
+        self.route(self.listener.receive(), start)
+        
+        for address, session in list(self.sessions.items()):
+            if start - session.last_input > self.session_timeout:
+                del self.sessions[address]
+                continue
+            session.pending_steps += 1
+            if session.pending_steps < session.throttle:
+                continue
+            t0 = self.clock()
+            session.server.advance(session.pending_steps)
+            cost = (self.clock() - t0) / session.pending_steps
+            session.pending_steps = 0
+            session.cost += (cost - session.cost) * 0.1
             
-            player = Player()
-            all_sprites.add(player)
-            wave_manager = WaveManager()
-            powerup_spawn_timer = 0
+            # Orçamento por sessão
+            if session.cost > self.session_budget and session.throttle < self.MAX_THROTTLE:
+                session.throttle *= 2
+            elif session.cost < self.session_budget / 2 and session.throttle > 1:
+                session.throttle //= 2
+        
+        elapsed = self.clock() - start
+        self.tick_times.append(elapsed)
+        self.shed_load(elapsed)
+        return elapsed
+    
+    def shed_load(self, elapsed):
+        if elapsed > self.interval:
+            self.overloaded_ticks += 1
+            self.accepting = False
+            if self.overloaded_ticks >= self.OVERLOAD_TICKS and self.sessions:
+                # Encerrar a sessão mais cara e dar mais um segundo para o servidor se recuperar
+                address = max(self.sessions, key=lambda a: self.sessions[a].cost)
+                del self.sessions[address]
+                self.sessions_shed += 1
+                self.overloaded_ticks = 0
+        else:
+            self.overloaded_ticks = 0
+            if elapsed < self.interval / 2:
+                self.accepting = True
+    
+    def stats(self):
+        stats = {'sessions': len(self.sessions),
+                 'throttled': sum(1 for s in self.sessions.values() if s.throttle > 1),
+                 'shed': self.sessions_shed,
+                 'rejected': self.sessions_rejected,
+                 'accepting': self.accepting}
+        stats.update({f'tick_{k}_ms': v * 1000 for k, v in percentiles(self.tick_times).items()})
+        return stats
+    
+    async def run(self, host='0.0.0.0', port=0, duration=None, report_every=0.0, ready=None):
+        """Serve até stop() (ou por `duration` segundos)"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        _, self.listener = await loop.create_datagram_endpoint(DatagramQueue, local_addr=(host, port))
+        if ready is not None:
+            ready.set_result(self.listener.address)
+        self.running = True
+        started = next_tick = next_report = loop.time()
+        try:
+            while self.running and (duration is None or loop.time() - started < duration):
+                self.tick_all()
+                next_tick += self.interval
+                now = loop.time()
+                if next_tick < now:
+                    next_tick = now  # Atrasado: não tentar recuperar ticks perdidos
+                if report_every and now >= next_report:
+                    next_report = now + report_every
+                    print(json.dumps(self.stats()))
+                await asyncio.sleep(next_tick - now)
+        finally:
+            self.listener.close()
+    
+    def stop(self):
+        self.running = False
+
+async def run_load_test(address, clients=100, seconds=10.0):
+    """Simula `clients` jogadores contra um GameServer e mede a latência
+    
+    A latência de tick é o tempo entre enviar uma entrada e receber o
+    primeiro snapshot em que o servidor já a processou.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    rng = random.Random(0)
+    players = []
+    for _ in range(clients):
+        _, channel = await loop.create_datagram_endpoint(DatagramQueue, local_addr=('127.0.0.1', 0))
+        players.append((CoopClient(channel, address), {}))
+    
+    latencies = []
+    snapshots = 0
+    interval = 1 / NET_TICK_RATE
+    started = next_tick = loop.time()
+    while loop.time() - started < seconds:
+        now = loop.time()
+        for client, sent in players:
+            client.send_input(rng.choice((-1, 0, 1)), rng.random() < 0.2)
+            sent[client.input_seq] = now
+            if client.poll():
+                snapshots += 1
+                for seq in [seq for seq in sent if seq <= client.processed]:
+                    if seq == client.processed:
+                        latencies.append(now - sent[seq])
+                    del sent[seq]
+        next_tick += interval
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    
+    for client, _ in players:
+        client.channel.close()
+    report = {'clients': clients,
+              'connected': sum(1 for client, _ in players if client.state is not None),
+              'snapshots_per_client_s': snapshots / clients / seconds}
+    report.update({f'latency_{k}_ms': v * 1000 for k, v in percentiles(latencies).items()})
+    return report
 
+def run_coop_client(args, screen, clock):
+    """Loop do jogo como cliente do co-op em rede"""
+    host, port = args.coop_connect.rsplit(':', 1)
+    channel = NetChannel(('0.0.0.0', 0), latency=args.net_latency, loss=args.net_loss)
+    client = CoopClient(channel, (socket.gethostbyname(host), int(port)))
+    
+    sound_manager = SoundManager()
+    starfield = StarField()
+    particle_system = ParticleSystem(500)
+    hud = HUD()
+    world = GameWorld(2, sound_manager=sound_manager, particle_system=particle_system)
+    
+    running = True
+    frame_count = 0
+    while running:
+        clock.tick(NET_TICK_RATE)
+        frame_count += 1
+        if args.max_frames and frame_count >= args.max_frames:
+            running = False
+        shoot = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                shoot = True
+        
+        client.send_input(read_move_input(), shoot)
+        client.poll()
+        client.apply_to(world)
+        
+        starfield.update()
+        particle_system.update(1 / NET_TICK_RATE)
+        draw_world(screen, world, starfield, particle_system, hud, client.slot or 0)
+        pygame.display.flip()
+    
+    channel.close()
     pygame.quit()
 
+def parse_size(text):
+    """'1920x1080' -> (1920, 1080)"""
+    width, _, height = text.lower().partition('x')
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tamanho inválido: {text!r} (use LARGURAxALTURA)")
+
+def parse_horde_curve(text):
+    """'0:30,20:300,40:900' -> ((0.0, 30.0), (20.0, 300.0), (40.0, 900.0))"""
+    try:
+        points = tuple((float(seconds), float(rate))
+                       for seconds, rate in (item.split(':') for item in filter(None, text.split(','))))
+    except ValueError:
+        points = ()
+    if not points or any(t1 <= t0 for (t0, _), (t1, _) in zip(points, points[1:])):
+        raise argparse.ArgumentTypeError(f"curva inválida: {text!r} (use SEGUNDOS:TAXA,... com tempos crescentes)")
+    return points
+
+def parse_args(argv=None):
+    """Argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Space Defender - Futuristic Edition")
+    parser.add_argument("--no-tests", action="store_true",
+                        help="inicia o jogo direto, sem executar os testes unitários")
+    parser.add_argument("--headless", action="store_true",
+                        help="roda sem janela (driver de vídeo dummy), sem telas de menu")
+    parser.add_argument("--max-frames", type=int, default=0,
+                        help="encerra após N quadros (0 = sem limite)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="grava os quadros do jogo no diretório DIR")
+    parser.add_argument("--record-format", choices=('auto',) + FrameRecorder.FORMATS, default='auto',
+                        help="formato da gravação: RGB bruto, sequência PNG ou vídeo via ffmpeg")
+    parser.add_argument("--scores-dir", default=ScoreStore.DEFAULT_DIR,
+                        help="diretório do histórico de partidas e do placar ('' desativa; "
+                             "padrão: scores/ ao lado do módulo)")
+    parser.add_argument("--quality", choices=['auto'] + [str(level) for level in range(len(QUALITY_LEVELS))],
+                        default='auto', help="nível de qualidade visual (auto ajusta para manter o FPS)")
+    parser.add_argument("--window", type=parse_size, metavar="LxA",
+                        help="tamanho da janela (o quadro interno continua 800x600 e é escalado)")
+    parser.add_argument("--fullscreen", action="store_true",
+                        help="tela cheia na resolução do monitor, com o quadro interno escalado")
+    parser.add_argument("--effects-scale", type=float, choices=(1.0, 0.5), default=1.0,
+                        help="resolução relativa das camadas de partículas e brilho")
+    parser.add_argument("--trail-length", type=int, default=Trail.DEFAULT_LENGTH, metavar="PONTOS",
+                        help="comprimento do rastro da nave")
+    parser.add_argument("--profile", action="store_true",
+                        help="mostra o painel de desempenho (alternar com F3)")
+    parser.add_argument("--sample-profile", action="store_true",
+                        help="amostra a pilha do jogo desde o início (F4 liga/desliga) e grava "
+                             "profile-*.folded no --sample-dir a cada game over")
+    parser.add_argument("--sample-dir", default=SamplingProfiler.DEFAULT_DIR, metavar="DIR",
+                        help="diretório das pilhas do profiler por amostragem "
+                             "(padrão: profiles/ ao lado do módulo)")
+    parser.add_argument("--sample-interval", type=float, default=5.0, metavar="MS",
+                        help="intervalo entre amostras do --sample-profile")
+    parser.add_argument("--sample-fine-switch", action="store_true",
+                        help="reduz o intervalo de troca do GIL enquanto amostra (menos viés para "
+                             "chamadas em C, mas altera o tempo de quadro de todas as threads)")
+    parser.add_argument("--horde", nargs="?", const=HORDE_CURVE, type=parse_horde_curve, metavar="SEG:TAXA,...",
+                        help="modo horda: milhares de asteroides que se partem; curva opcional de asteroides/s")
+    parser.add_argument("--attract", type=float, default=0.0, metavar="SEGUNDOS",
+                        help="modo demonstração após SEGUNDOS parado na tela inicial (0 = desligado)")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="a nave é controlada por busca Monte-Carlo (com --headless: teste de carga/balanceamento)")
+    parser.add_argument("--autopilot-rollouts", type=int, default=8, metavar="N",
+                        help="simulações por ação em cada decisão do --autopilot")
+    parser.add_argument("--autopilot-workers", type=int, default=AUTOPILOT_WORKERS, metavar="N",
+                        help="processos para as simulações do --autopilot "
+                             "(0 = no próprio jogo, uma fatia por quadro)")
+    parser.add_argument("--load-state", metavar="ARQUIVO",
+                        help="começa a partida de um estado salvo (F5 salva em quicksave.sdws no --scores-dir)")
+    parser.add_argument("--weapons", metavar="ARQUIVO.json",
+                        help="ajusta velocidade, recarga, dano, padrão, cor etc. das armas")
+    parser.add_argument("--assets", default=AssetPack.DEFAULT_PATH, metavar="ARQUIVO",
+                        help="pacote de assets pré-renderizados (usado se existir; '' desativa)")
+    parser.add_argument("--bake-assets", nargs="?", const=AssetPack.DEFAULT_PATH, metavar="ARQUIVO",
+                        help="gera o pacote de assets (sprites, sons e glifos) e sai")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="grava eventos de telemetria em DIR (arquivos rotacionados)")
+    parser.add_argument("--telemetry-sample", default="", metavar="TIPO=TAXA,...",
+                        help="taxas de amostragem por tipo de evento, ex.: frame=0.1,shoot=0.5")
+    parser.add_argument("--coop-server", type=int, metavar="PORT",
+                        help="hospeda uma partida co-op para dois jogadores na porta UDP PORT")
+    parser.add_argument("--coop-connect", metavar="HOST:PORT",
+                        help="entra numa partida co-op hospedada em HOST:PORT")
+    parser.add_argument("--server", type=int, metavar="PORT",
+                        help="servidor headless com muitas partidas independentes na porta UDP PORT")
+    parser.add_argument("--max-sessions", type=int, default=SERVER_MAX_SESSIONS,
+                        help="limite de partidas simultâneas do --server")
+    parser.add_argument("--loadtest", metavar="HOST:PORT",
+                        help="teste de carga contra um --server, com jogadores simulados")
+    parser.add_argument("--loadtest-clients", type=int, default=100,
+                        help="número de jogadores simulados no --loadtest")
+    parser.add_argument("--loadtest-seconds", type=float, default=10.0,
+                        help="duração do --loadtest em segundos")
+    parser.add_argument("--soak", type=int, metavar="TICKS",
+                        help="teste de resistência: TICKS quadros headless por semente, com entradas aleatórias")
+    parser.add_argument("--soak-seeds", type=int, default=4, metavar="N",
+                        help="número de sementes (partidas independentes) do --soak")
+    parser.add_argument("--soak-workers", type=int, default=os.cpu_count() or 1, metavar="N",
+                        help="processos em paralelo no --soak (0 = no próprio processo)")
+    parser.add_argument("--net-latency", type=float, default=0.0, metavar="SEGUNDOS",
+                        help="latência simulada nos pacotes enviados (testes de rede)")
+    parser.add_argument("--net-loss", type=float, default=0.0, metavar="FRAÇÃO",
+                        help="perda de pacotes simulada, de 0 a 1 (testes de rede)")
+    return parser.parse_args(argv)
+
+def run_tests():
+    """Executa os testes unitários (unittest só é importado aqui)"""
+    import unittest
+    import test_space_defender
+    unittest.main(module=test_space_defender, argv=['first-arg-is-ignored'], exit=False)
+
 # Executar testes se o arquivo for executado diretamente
 if __name__ == "__main__":
+    args = parse_args()
+    
     # Executar testes
-    unittest.main(argv=['first-arg-is-ignored'], exit=False)
+    if not args.no_tests:
+        run_tests()
     
     # Executar jogo
-    main()
\ No newline at end of file
+    main(args)
\ No newline at end of file
@@ -0,0 +1,967 @@
+"""Testes unitários do Space Defender"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from space_defender import *
+
+class TestSpaceDefender(unittest.TestCase):
+    def test_bullet_creation(self):
+        """Testa se as balas são criadas corretamente"""
+        bullet = Bullet(100, 100, WeaponType.BASIC)
+        self.assertEqual(bullet.x, 100)
+        self.assertEqual(bullet.y, 100)
+        self.assertEqual(bullet.weapon_type, WeaponType.BASIC)
+        self.assertTrue(bullet.active)
+    
+    def test_player_shoot_basic(self):
+        """Testa se o jogador atira corretamente com a arma básica"""
+        player = Player()
+        bullets = []
+        sound_manager = SoundManager()
+        
+        player.shoot(sound_manager, bullets)
+        self.assertEqual(len(bullets), 1)
+        self.assertEqual(bullets[0].weapon_type, WeaponType.BASIC)
+    
+    def test_player_shoot_spread(self):
+        """Testa se o jogador atira corretamente com a arma spread"""
+        player = Player()
+        player.weapon_type = WeaponType.SPREAD
+        bullets = []
+        sound_manager = SoundManager()
+        
+        player.shoot(sound_manager, bullets)
+        self.assertEqual(len(bullets), 3)  # Spread dispara 3 balas
+        for bullet in bullets:
+            self.assertEqual(bullet.weapon_type, WeaponType.SPREAD)
+    
+    def test_wave_manager(self):
+        """Testa o gerenciador de waves"""
+        wave_manager = WaveManager()
+        
+        # Testa a primeira wave
+        self.assertEqual(wave_manager.current_wave, 1)
+        self.assertEqual(wave_manager.asteroids_in_wave, 3)
+        
+        # Testa o spawn de asteroides com dt maior que o delay
+        dt = 0.6  # Maior que o spawn_delay de 0.5
+        should_spawn = wave_manager.should_spawn_asteroid(dt)
+        self.assertTrue(should_spawn)
+        
+        # Testa se completa a wave
+        for _ in range(3):
+            wave_manager.should_spawn_asteroid(dt)
+        
+        # Após completar, não deve spawnar mais asteroides imediatamente
+        should_spawn = wave_manager.should_spawn_asteroid(dt)
+        self.assertFalse(should_spawn)
+    
+    def test_asteroid_health(self):
+        """Testa a saúde dos asteroides"""
+        asteroid = Asteroid(1)  # Asteroide pequeno
+        self.assertEqual(asteroid.health, 1)
+        self.assertEqual(asteroid.max_health, 1)
+        
+        # Testa dano
+        destroyed = asteroid.hit(1)
+        self.assertTrue(destroyed)
+        
+        # Testa asteroide médio
+        asteroid = Asteroid(2)
+        self.assertEqual(asteroid.health, 2)
+        
+        destroyed = asteroid.hit(1)
+        self.assertFalse(destroyed)
+        self.assertEqual(asteroid.health, 1)
+    
+    def test_import_does_not_init_subsystems(self):
+        """Testa se importar o módulo não inicializa vídeo nem áudio"""
+        code = ("import pygame, space_defender; "
+                "print(pygame.display.get_init(), pygame.mixer.get_init())")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "False None")
+    
+    def test_frame_recorder_raw(self):
+        """Testa se o gravador escreve os quadros em RGB bruto na ordem correta"""
+        surface = pygame.Surface((8, 6))
+        with tempfile.TemporaryDirectory() as output_dir:
+            recorder = FrameRecorder(output_dir, size=(8, 6), fmt='raw', max_queue=4)
+            for color in (RED, NEON_GREEN, CYAN):
+                surface.fill(color)
+                self.assertTrue(recorder.capture(surface))
+            recorder.close()
+            
+            with open(os.path.join(output_dir, 'frames.rgb'), 'rb') as f:
+                data = f.read()
+        self.assertEqual(recorder.frames_written, 3)
+        self.assertLessEqual(recorder.buffers_allocated, 3)
+        self.assertEqual(len(data), 3 * 8 * 6 * 3)
+        self.assertEqual(tuple(data[:3]), RED)
+        self.assertEqual(tuple(data[-3:]), CYAN)
+    
+    def test_frame_recorder_writer_failure(self):
+        """Falha na escrita é reportada e close() não trava com a fila cheia"""
+        import numpy as np
+        surface = pygame.Surface((8, 6))
+        with tempfile.TemporaryDirectory() as parent:
+            output_dir = os.path.join(parent, 'frames')
+            recorder = FrameRecorder(output_dir, size=(8, 6), fmt='png', max_queue=2)
+            os.rmdir(output_dir)  # Cada PNG vai falhar ao ser salvo
+            self.assertTrue(recorder.capture(surface))
+            recorder.thread.join(timeout=5)
+            self.assertFalse(recorder.thread.is_alive())
+            with self.assertRaises(RuntimeError):
+                recorder.capture(surface)
+            self.assertEqual(recorder.frames_dropped, 0)
+            recorder.pending.put_nowait(np.zeros((8, 6, 3), dtype=np.uint8))  # Fila cheia
+            recorder.pending.put_nowait(np.zeros((8, 6, 3), dtype=np.uint8))
+            with self.assertRaises(RuntimeError):
+                recorder.close()
+    
+    def test_observation_vector(self):
+        """Testa o layout do vetor de observação e a ordenação por distância"""
+        encoder = ObservationEncoder(k_asteroids=2, max_bullets=2, max_powerups=1)
+        player = Player()
+        player.change_weapon(WeaponType.RAPID)
+        far = Asteroid(3)
+        far.rect.center = (player.rect.centerx, 0)
+        near = Asteroid(1)
+        near.rect.center = (player.rect.centerx + 80, player.rect.centery)
+        bullets = [Bullet(player.rect.centerx, 100)]
+        
+        obs = encoder.encode(player, 50, [far, near], bullets, [])
+        self.assertEqual(obs.dtype, np.float32)
+        self.assertEqual(obs.shape, (encoder.size,))
+        self.assertEqual(obs[1 + WeaponType.RAPID.value - 1], 1.0)
+        self.assertAlmostEqual(float(obs[encoder.PLAYER_FIELDS - 1]), 0.5)
+        
+        # O asteroide mais próximo vem primeiro
+        first = obs[encoder.asteroid_offset:encoder.asteroid_offset + encoder.ASTEROID_FIELDS]
+        self.assertEqual(first[0], 1.0)
+        self.assertAlmostEqual(float(first[1]), 80 / SCREEN_WIDTH, places=5)
+        self.assertAlmostEqual(float(first[5]), 1 / 3, places=5)
+        
+        # Segunda bala e power-up ausentes ficam zerados, no mesmo buffer
+        self.assertEqual(obs[encoder.bullet_offset], 1.0)
+        self.assertEqual(obs[encoder.bullet_offset + encoder.BULLET_FIELDS], 0.0)
+        self.assertFalse(obs[encoder.powerup_offset:].any())
+        
+        # Mais asteroides que K: só os K mais próximos entram, na mesma ordem
+        expected = obs.copy()
+        farther = Asteroid(2)
+        farther.rect.center = (0, 0)
+        encoder.encode(player, 50, [farther, far, near], bullets, [])
+        self.assertTrue(np.array_equal(obs, expected))
+        self.assertIs(encoder.encode(player, 50, [], [], []), obs)
+        self.assertFalse(obs[encoder.asteroid_offset:].any())
+    
+    def test_lowres_renderer_stack(self):
+        """Testa o quadro em baixa resolução e o empilhamento de quadros"""
+        renderer = LowResRenderer(84, 84, stack=3)
+        player = Player()
+        frames = renderer.render(player, [], [], [])
+        self.assertEqual(frames.shape, (3, 84, 84))
+        self.assertEqual(frames.dtype, np.uint8)
+        self.assertEqual(frames[-1].max(), LowResRenderer.PLAYER_SHADE)
+        self.assertFalse(frames[0].any())
+        
+        # Asteroide no canto é recortado sem erro; o quadro anterior desce na pilha
+        asteroid = Asteroid(3)
+        asteroid.rect.center = (0, 0)
+        frames = renderer.render(player, [asteroid], [], [])
+        self.assertEqual(frames[-1][0, 0], LowResRenderer.ASTEROID_SHADE)
+        self.assertEqual(frames[-2][0, 0], 0)
+        self.assertEqual(frames[-2].max(), LowResRenderer.PLAYER_SHADE)
+    
+    def test_entity_store_handles(self):
+        """Testa handles com geração, reuso de slots e crescimento do armazenamento"""
+        store = EntityStore(capacity=2)
+        first = store.spawn(Asteroid(1), ENTITY_ASTEROID)
+        second = store.spawn(PowerUp(100, 100, WeaponType.RAPID), ENTITY_POWERUP)
+        third = store.spawn(Asteroid(2), ENTITY_ASTEROID)  # Força o crescimento
+        self.assertEqual(store.capacity, 4)
+        self.assertEqual(len(store), 3)
+        
+        self.assertTrue(store.kill(first))
+        self.assertFalse(store.kill(first))
+        reused = store.spawn(Asteroid(1), ENTITY_ASTEROID)
+        self.assertEqual(reused & EntityStore.INDEX_MASK, first & EntityStore.INDEX_MASK)
+        self.assertIsNone(store.get(first))
+        self.assertIsNotNone(store.get(reused))
+        self.assertEqual(len(store.live_objects(ENTITY_ASTEROID)), 2)
+        self.assertIsInstance(store.get(second), PowerUp)
+        self.assertIs(store.get(third).handle, third)
+    
+    def test_entity_store_generation_wraps_for_snapshots(self):
+        """Gerações altas dão a volta e os handles continuam cabendo nos snapshots do co-op"""
+        store = EntityStore(capacity=1)
+        store.generation[:] = EntityStore.GENERATION_MASK
+        stale = store.spawn(Asteroid(1), ENTITY_ASTEROID)
+        store.kill(stale)
+        fresh = store.spawn(Asteroid(1), ENTITY_ASTEROID)
+        self.assertEqual(fresh >> EntityStore.INDEX_BITS, 0)
+        self.assertFalse(store.is_alive(stale))
+        
+        server_channel = NetChannel()
+        server = CoopServer(server_channel)
+        client = CoopClient(NetChannel(), server_channel.address)
+        try:
+            server.world.entities.generation[:] = EntityStore.GENERATION_MASK
+            for _ in range(240):
+                client.send_input(0, True)
+                time.sleep(0.0002)
+                server.tick()
+                client.poll()
+                server.world.players[0].invulnerable = 1.0
+            handles = [obj.handle for obj in server.world.entities.live_objects()]
+            self.assertTrue(handles)
+            self.assertTrue(all(h < 1 << 32 for h in handles))
+            self.assertEqual(client.state, server.history[client.tick])
+        finally:
+            client.channel.close()
+            server_channel.close()
+    
+    def test_entity_store_update_and_collision(self):
+        """Testa movimento em lote, remoção fora da tela e colisões"""
+        store = EntityStore()
+        asteroid = Asteroid(1)
+        asteroid.rect.center = (400, 300)
+        asteroid.speed_x, asteroid.speed_y = 0.3, 2
+        handle = store.spawn(asteroid, ENTITY_ASTEROID)
+        falling = Asteroid(1)
+        falling.rect.center = (100, SCREEN_HEIGHT + 100)
+        falling_handle = store.spawn(falling, ENTITY_ASTEROID)
+        
+        store.update(1 / 60)
+        self.assertEqual(asteroid.rect.center, (400, 302))
+        self.assertFalse(store.is_alive(falling_handle))
+        self.assertEqual(store.draw_list(), [(asteroid.image, asteroid.rect)])
+        
+        # Sub-pixel: a posição em ponto flutuante acumula a velocidade horizontal
+        store.update(1 / 60)
+        self.assertEqual(asteroid.rect.centerx, 401)
+        
+        index = handle & EntityStore.INDEX_MASK
+        self.assertEqual(store.collide_circle(400, 304, 10, ENTITY_ASTEROID).tolist(), [index])
+        self.assertEqual(store.collide_circle(400, 304, 10, ENTITY_POWERUP).tolist(), [])
+        indices, overlaps = store.collide_boxes([401, 0], [304, 0], 4, 4, ENTITY_ASTEROID)
+        self.assertEqual(overlaps.tolist(), [[True], [False]])
+    
+    def test_coop_over_lossy_udp(self):
+        """Testa snapshots em delta e predição no co-op com latência e perda simuladas"""
+        rng = random.Random(7)
+        now = [0.0]
+        clock = lambda: now[0]
+        server_channel = NetChannel(latency=0.05, loss=0.2, clock=clock, seed=1)
+        server = CoopServer(server_channel)
+        clients = [CoopClient(NetChannel(latency=0.05, loss=0.2, clock=clock, seed=i), server_channel.address)
+                   for i in range(2)]
+        try:
+            for tick in range(420):
+                now[0] += 1 / NET_TICK_RATE
+                for client in clients:
+                    # Para de se mover no fim para a predição convergir
+                    client.send_input(rng.choice((-1, 0, 1)) if tick < 360 else 0, tick % 5 == 0)
+                time.sleep(0.0002)
+                server.tick()
+                for client in clients:
+                    client.poll()
+                for player in server.world.players:
+                    player.invulnerable = max(player.invulnerable, 0.5)
+            
+            self.assertEqual({client.slot for client in clients}, {0, 1})
+            for client in clients:
+                # O estado reconstruído é idêntico ao que o servidor capturou naquele tick
+                self.assertGreater(client.tick, 300)
+                self.assertEqual(client.state, server.history[client.tick])
+                self.assertEqual(client.predicted_x, server.world.players[client.slot].rect.centerx)
+        finally:
+            for client in clients:
+                client.channel.close()
+            server_channel.close()
+    
+    def test_coop_replicas_share_asteroid_shapes(self):
+        """Réplicas do cliente têm a forma do asteroide do servidor e não consomem o random local"""
+        random.seed(3)
+        world = GameWorld(num_players=2, render=False)
+        asteroid = Asteroid(3)
+        asteroid.rect.center = (300, 200)
+        asteroid.health = 2
+        world.entities.spawn(asteroid, ENTITY_ASTEROID)
+        packet = SnapshotCodec.encode(1, 0, 1, 0, SnapshotCodec.capture(world), None)
+        
+        replicas = []
+        for _ in range(2):
+            client = CoopClient(None, None)
+            client.tick, client.slot, client.processed, client.state = SnapshotCodec.decode(packet, {})
+            local = GameWorld(num_players=2, render=False)
+            state = random.getstate()
+            client.apply_to(local)
+            self.assertEqual(random.getstate(), state)
+            replicas.append(client.remote[asteroid.handle])
+        
+        for replica in replicas:
+            self.assertEqual(replica.shape_seed, asteroid.shape_seed)
+            self.assertEqual(replica.energy_core, asteroid.energy_core)
+            self.assertEqual((replica.health, len(replica.cracks)), (2, 1))
+            self.assertEqual(pygame.image.tobytes(replica.original_image, 'RGBA'),
+                             pygame.image.tobytes(asteroid.original_image, 'RGBA'))
+        self.assertEqual(replicas[0].cracks, replicas[1].cracks)
+    
+    def test_coop_recovers_from_burst_loss(self):
+        """Rajada de perdas maior que a redundância não trava as entradas do cliente"""
+        server_channel = NetChannel()
+        server = CoopServer(server_channel)
+        client = CoopClient(NetChannel(), server_channel.address)
+        try:
+            for tick in range(90):
+                client.send_input(1 if tick < 60 else 0, False)
+                time.sleep(0.0002)
+                if 10 <= tick < 30:
+                    server_channel.receive()  # 20 pacotes seguidos perdidos
+                    server.advance()
+                else:
+                    server.tick()
+                client.poll()
+                server.world.players[0].invulnerable = 1.0
+            for _ in range(10):  # Drena as entradas que ainda estão na fila do servidor
+                server.advance()
+            time.sleep(0.0002)
+            client.poll()
+            
+            state = next(iter(server.clients.values()))
+            self.assertEqual(state['processed'], client.input_seq)
+            self.assertEqual(state['inputs'], {})
+            self.assertEqual(client.predicted_x, server.world.players[0].rect.centerx)
+            
+            # Entradas futuras acumuladas ficam limitadas
+            for _ in range(CoopServer.MAX_BUFFERED_INPUTS):
+                client.send_input(0, False)
+            time.sleep(0.0002)
+            for data, address in server_channel.receive():
+                server.handle_input(data, address)
+            self.assertEqual(len(state['inputs']), CoopServer.MAX_BUFFERED_INPUTS)
+            self.assertEqual(min(state['inputs']), client.input_seq - CoopServer.MAX_BUFFERED_INPUTS + 1)
+        finally:
+            client.channel.close()
+            server_channel.close()
+    
+    def test_coop_batched_ticks_match_single_ticks(self):
+        """Servidor sobrecarregado avança em lote sem mudar a simulação, só os snapshots"""
+        import random
+        states = []
+        for steps in (1, 4):
+            random.seed(5)
+            channel = NetChannel()
+            try:
+                server = CoopServer(channel, num_players=1)
+                server.world.bullets.append(Bullet(400, 500, WeaponType.BASIC))
+                server.world.players[0].invulnerable = 10.0
+                for _ in range(40 // steps):
+                    server.advance(steps)
+                self.assertEqual(server.world.tick, 40)
+                states.append(SnapshotCodec.capture(server.world))
+            finally:
+                channel.close()
+        self.assertEqual(states[0], states[1])
+    
+    def test_game_server_session_budget(self):
+        """Testa sessões independentes, orçamento por sessão e limite de sessões"""
+        server = GameServer(max_sessions=2, session_budget=0.0)
+        server.listener = NetChannel()
+        clients = [CoopClient(NetChannel(), server.listener.address) for _ in range(3)]
+        try:
+            for _ in range(30):
+                for client in clients:
+                    client.send_input(1, False)
+                time.sleep(0.0002)
+                server.tick_all()
+                for client in clients:
+                    client.poll()
+            
+            stats = server.stats()
+            self.assertEqual(stats['sessions'], 2)
+            self.assertGreater(stats['rejected'], 0)
+            self.assertIn('tick_p99_ms', stats)
+            # Orçamento zero: toda sessão passa a avançar em passos maiores
+            self.assertTrue(all(s.throttle == GameServer.MAX_THROTTLE for s in server.sessions.values()))
+            served = [client for client in clients if client.state is not None]
+            self.assertEqual(len(served), 2)
+            self.assertEqual({client.slot for client in served}, {0})
+        finally:
+            for client in clients:
+                client.channel.close()
+            server.listener.close()
+    
+    def test_load_test_against_server(self):
+        """Testa o servidor asyncio com o cliente de teste de carga"""
+        async def scenario():
+            server = GameServer()
+            ready = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(server.run('127.0.0.1', 0, ready=ready))
+            address = await ready
+            report = await run_load_test(address, clients=5, seconds=1.0)
+            server.stop()
+            await task
+            return server, report
+        
+        server, report = asyncio.run(scenario())
+        self.assertEqual(report['connected'], 5)
+        self.assertEqual(server.stats()['sessions'], 5)
+        self.assertIn('latency_p95_ms', report)
+
+    def test_score_store_index_and_log_tail(self):
+        """Placar persiste entre aberturas e o final do log não indexado é recuperado"""
+        with tempfile.TemporaryDirectory() as directory:
+            store = ScoreStore(directory, size=3)
+            for score in (50, 300, 120, 10):
+                store.record_run(score, 2, {'BASIC': 4}, 30.0)
+            self.assertEqual(store.record_run(500, 6, {'LASER': 1}, 60.0), 1)
+            store.close()
+            
+            # Partida gravada no log sem atualizar o índice, mais uma linha cortada
+            with open(os.path.join(directory, ScoreStore.LOG_NAME), 'ab') as log:
+                log.write(b'{"time":1,"score":400,"wave":5,"duration":1,"kills":{"BASIC":2}}\n{"time":2,"sc')
+            
+            store = ScoreStore(directory, size=3)
+            self.assertEqual([entry[0] for entry in store.top()], [500, 400, 300])
+            self.assertEqual(store.leaderboard.runs, 6)
+            self.assertEqual(store.weapon_kills(), {'BASIC': 18, 'LASER': 1})
+            store.record_run(20, 1, {}, 5.0)
+            store.close()
+            
+            with open(os.path.join(directory, ScoreStore.LOG_NAME)) as log:
+                self.assertEqual(len(log.read().splitlines()), 7)
+            self.assertEqual(ScoreStore(directory).leaderboard.runs, 7)
+
+    def test_score_store_survives_damaged_log(self):
+        """Log com lixo, log menor que o índice e falha de disco não derrubam o placar"""
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, ScoreStore.LOG_NAME)
+            with open(log_path, 'wb') as log:
+                log.write(b'\x00\x00{"score":1}\n[1]\n{"time":1,"score":90,"wave":3,"duration":1,"kills":{}}\n')
+            store = ScoreStore(directory)
+            self.assertEqual(store.leaderboard.runs, 1)
+            self.assertEqual(store.leaderboard.log_size, os.path.getsize(log_path))
+            store.record_run(70, 2, {'BASIC': 1}, 10.0)
+            store.close()
+            
+            # Log encolheu com o índice intacto: reconstrói em vez de preencher com zeros
+            store = ScoreStore(directory)
+            with open(log_path, 'w') as log:
+                log.write('{"time":2,"score":40,"wave":1,"duration":1,"kills":{}}\n')
+            store.record_run(60, 2, {}, 10.0)
+            store.close()
+            with open(log_path, 'rb') as log:
+                self.assertNotIn(b'\x00', log.read())
+            self.assertEqual([entry[0] for entry in ScoreStore(directory).top()], [60, 40])
+            os.remove(log_path)
+            self.assertEqual(ScoreStore(directory).leaderboard.runs, 0)
+            
+            # Disco falhando: a thread sobrevive e o lote é gravado na próxima tentativa
+            os.mkdir(log_path)
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                store = ScoreStore(directory)
+                store.record_run(30, 1, {}, 5.0)
+                deadline = time.time() + 5
+                while not store.unsaved and time.time() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(store.unsaved, 1)
+                self.assertTrue(store.thread.is_alive())
+                os.rmdir(log_path)
+                store.record_run(20, 1, {}, 5.0)
+                store.close()
+            self.assertIn(log_path, errors.getvalue())
+            self.assertEqual(store.unsaved, 0)
+            with open(log_path) as log:
+                self.assertEqual(len(log.read().splitlines()), 2)
+
+    def test_telemetry_sampling_ring_and_rotation(self):
+        """Amostragem por tipo, descarte dos mais antigos ao estourar o anel e rotação dos arquivos"""
+        with tempfile.TemporaryDirectory() as directory:
+            bus = TelemetryBus(directory, rates={'shoot': 0.25, 'frame': 0.0}, capacity=8,
+                               max_bytes=400, flush_interval=60)
+            previous = set_telemetry(bus)
+            try:
+                player = Player()
+                for _ in range(8):
+                    player.shoot_cooldown = 0
+                    player.shoot(SilentSoundManager(), [])
+                    TELEMETRY.publish('frame', ms=1.0)
+                self.assertEqual(bus.head, 2)  # 1 em cada 4 tiros, nenhum quadro
+                
+                for wave in range(12):
+                    WaveManager().start_new_wave()
+                events = bus.drain()
+                self.assertEqual(len(events), 8)
+                self.assertEqual(bus.dropped, 6)
+                self.assertTrue(all(kind == 'wave_start' for _, kind, _ in events))
+                
+                for _ in range(20):
+                    Asteroid(1).hit(5)
+            finally:
+                set_telemetry(previous)
+                bus.close()
+            
+            names = sorted(os.listdir(directory))
+            self.assertIn(TelemetryBus.FILE_NAME, names)
+            self.assertNotIn(TelemetryBus.FILE_NAME + '.1', names)  # Um único lote gravado
+            with open(os.path.join(directory, TelemetryBus.FILE_NAME)) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(len(lines), 5)  # 20 acertos com taxa padrão de 0.25
+            
+            bus = TelemetryBus(directory, max_bytes=400, backups=2, flush_interval=60)
+            for _ in range(3):
+                for _ in range(10):
+                    bus.publish('wave_start', wave=1, asteroids=4)
+                bus._write(bus.drain())
+            bus.close()
+            self.assertEqual(sorted(os.listdir(directory)),
+                             [TelemetryBus.FILE_NAME, TelemetryBus.FILE_NAME + '.1', TelemetryBus.FILE_NAME + '.2'])
+
+    def test_quality_governor_hysteresis(self):
+        """Governador reduz a qualidade sob carga, volta a subir com folga e não oscila"""
+        settings = QualitySettings()
+        top = len(QUALITY_LEVELS) - 1
+        governor = QualityGovernor(target_fps=60, settings=settings, down_frames=10, up_frames=50)
+        slow, fast, ok = 0.030, 0.005, 0.012
+        
+        for _ in range(200):
+            governor.observe(slow)
+        self.assertEqual(governor.level, 0)
+        self.assertEqual(settings.particles, QUALITY_LEVELS[0]['particles'])
+        
+        # Tempo entre os dois limiares: nenhum ajuste
+        for _ in range(500):
+            governor.observe(ok)
+        self.assertEqual(governor.level, 0)
+        
+        for _ in range(60):
+            governor.observe(fast)
+        self.assertEqual(governor.level, 1)
+        
+        # Subir e estourar logo em seguida dobra a espera pela próxima subida
+        for _ in range(20):
+            governor.observe(slow)
+        self.assertEqual(governor.level, 0)
+        self.assertEqual(governor.up_frames, 100)
+        for _ in range(80):
+            governor.observe(fast)
+        self.assertEqual(governor.level, 0)
+        for _ in range(1000):
+            governor.observe(fast)
+        self.assertEqual(governor.level, top)
+        self.assertEqual(settings.rotation_step, 0)
+
+    def test_internal_resolution_and_half_res_effects(self):
+        """Quadro interno fixo com janela maior e efeitos em meia resolução parecidos com os completos"""
+        import numpy as np
+        screen = init_display(headless=True, window_size=(1600, 1200))
+        try:
+            self.assertEqual(screen.get_size(), (SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.assertEqual(pygame.display.get_window_size(), (1600, 1200))
+        finally:
+            init_display(headless=True)
+        
+        frames = []
+        for scale in (None, 0.5):
+            random.seed(4)
+            particles = ParticleSystem(500, scale)
+            particles.emit(300, 300, ORANGE, count=200)
+            hud = HUD(scale or 1.0)
+            frame = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            for _ in range(2):  # O segundo quadro reaproveita as camadas
+                frame.fill(BLACK)
+                particles.draw(frame)
+                hud.draw(frame, 1234, 3, 80, 5, WeaponType.LASER_BEAM, 4)
+            frames.append(pygame.surfarray.array3d(frame).astype(int))
+        
+        full, half = frames
+        self.assertGreater(full.sum(), 0)
+        self.assertLess(abs(half.sum() - full.sum()) / full.sum(), 0.2)
+        self.assertLess(np.abs(half - full).mean(), 3)
+
+    def test_trail_polyline_gradient(self):
+        """Rastro desenhado só dentro do seu retângulo, mais forte na ponta mais recente"""
+        trail = Trail(120)
+        self.assertEqual(Trail().max_length, Trail.DEFAULT_LENGTH)
+        for i in range(150):
+            trail.add_point(100 + i * 2, 400 - i)
+        frame = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        trail.draw(frame)
+        
+        pixels = pygame.surfarray.array3d(frame)
+        lit = pixels.sum(axis=2).nonzero()
+        self.assertGreaterEqual(lit[0].min(), 160 - Trail.WIDTH)  # Só os 120 pontos mais recentes
+        self.assertLessEqual(lit[0].max(), 398 + Trail.WIDTH)
+        self.assertLessEqual(lit[1].max(), 370 + Trail.WIDTH)
+        oldest, newest = frame.get_at((162, 369)), frame.get_at((396, 252))
+        self.assertLess(oldest.b, newest.b)
+        self.assertEqual(newest.b, Trail.GRADIENT[-1][2])
+
+    def test_shield_and_blink_from_cache(self):
+        """Escudo vem do ciclo pré-renderizado e o piscar alterna entre sprites prontos"""
+        player = Player()
+        player.invulnerable = 2.0
+        player.update(0.01, 0)
+        self.assertTrue(player.shield_active)
+        frame = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        player.draw_shield(frame)
+        frames = Player.shield_frames
+        self.assertEqual(len(frames), Player.SHIELD_PHASES)
+        player.draw_shield(frame)
+        self.assertIs(Player.shield_frames, frames)  # Nada é renderizado de novo
+        
+        # Pulso máximo (fase de 1/4 do ciclo) tem raio maior que o mínimo (3/4)
+        widths = [frames[i].get_bounding_rect().width for i in (Player.SHIELD_PHASES // 4, 3 * Player.SHIELD_PHASES // 4)]
+        self.assertGreater(widths[0], widths[1])
+        
+        player.invulnerable = 0.15  # int(1.5) % 2 == 1: quadro apagado
+        self.assertIs(player.sprite(), player.blink_image)
+        self.assertEqual(player.blink_image.get_at((30, 20)).a, 128)
+        player.invulnerable = 0.25
+        self.assertIs(player.sprite(), player.image)
+        player.change_weapon(WeaponType.SPREAD)
+        self.assertEqual(player.blink_image.get_at((30, 5)), player.image.get_at((30, 5))[:3] + (128,))
+
+    def test_weapon_registry_tables(self):
+        """Tabelas das armas: leque do SPREAD, recarga por arma e ajustes carregados de JSON"""
+        player = Player()
+        player.change_weapon(WeaponType.SPREAD)
+        bullets = []
+        player.shoot(SilentSoundManager(), bullets)
+        self.assertEqual(player.shoot_cooldown, WEAPONS.cooldown[WeaponType.SPREAD.value])
+        for bullet in bullets:
+            bullet.update([])
+        xs = [bullet.x for bullet in bullets]
+        self.assertLess(xs[0], xs[1])  # As balas laterais se afastam do centro
+        self.assertLess(xs[1], xs[2])
+        self.assertEqual(len(WEAPONS.label), len(WeaponType) + 1)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'weapons.json')
+            with open(path, 'w') as f:
+                json.dump([{'name': 'RAPID', 'cooldown': 1, 'damage': 2, 'color': [1, 2, 3],
+                            'pattern': [-0.2, 0.2]}], f)
+            original = {name: dict(definition) for name, definition in WEAPONS.definitions.items()}
+            try:
+                WEAPONS.load(path)
+                player.change_weapon(WeaponType.RAPID)
+                player.shoot_cooldown = 0
+                bullets = []
+                player.shoot(SilentSoundManager(), bullets)
+                self.assertEqual(player.shoot_cooldown, 1)
+                self.assertEqual([bullet.damage for bullet in bullets], [2, 2])
+                self.assertEqual(PowerUp(0, 0, WeaponType.RAPID).color, (1, 2, 3))
+                
+                with open(path, 'w') as f:
+                    json.dump([{'name': 'PLASMA', 'speed': 9}], f)
+                with self.assertRaises(ValueError):
+                    WEAPONS.load(path)
+            finally:
+                WEAPONS.definitions = original
+                WEAPONS.compile()
+
+    def test_asset_pack_matches_generated(self):
+        """Pacote mapeado devolve os mesmos sprites e sons gerados na hora, e atlas de glifos"""
+        pygame.mixer.quit()
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        generated_ship = pygame.image.tobytes(Player().image, 'RGBA')
+        generated_icon = pygame.image.tobytes(PowerUp(0, 0, WeaponType.LASER_BEAM).image, 'RGBA')
+        generated_sounds = SoundManager()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'assets.pack')
+            index = AssetPack.bake(path)
+            self.assertEqual(min(entry[0] for entry in index['images'].values()) % AssetPack.PAGE, 0)
+            self.assertEqual(min(bank[0][0] for bank in index['sounds'].values()) % AssetPack.PAGE, 0)
+            
+            pack = AssetPack(path)
+            previous = set_assets(pack)
+            try:
+                player = Player()
+                self.assertEqual(pygame.image.tobytes(player.image, 'RGBA'), generated_ship)
+                player.change_weapon(WeaponType.SPREAD)
+                self.assertIs(player.image, pack.image('ship', *WEAPONS.color[WeaponType.SPREAD.value]))
+                icon = PowerUp(0, 0, WeaponType.LASER_BEAM).image
+                self.assertEqual(pygame.image.tobytes(icon, 'RGBA'), generated_icon)
+                self.assertEqual(len(Player.build_shield_frames()), Player.SHIELD_PHASES)
+                
+                sound_manager = SoundManager()
+                for name, bank in generated_sounds.banks.items():
+                    self.assertEqual([pygame.sndarray.array(sound).tobytes() for sound in sound_manager.banks[name]],
+                                     [pygame.sndarray.array(sound).tobytes() for sound in bank])
+                
+                font = load_font(36)
+                self.assertIsInstance(font, GlyphAtlas)
+                text = font.render("SCORE: 42", True, NEON_GREEN)
+                self.assertEqual(text.get_height(), pygame.font.Font(None, 36).get_height())
+                self.assertEqual(text.get_at(text.get_bounding_rect().center)[:3], NEON_GREEN)
+                self.assertEqual(font.render("→", True, WHITE).get_height(), font.real_font().get_height())
+            finally:
+                set_assets(previous)
+                Player.shield_frames = None
+                pygame.mixer.quit()
+                del os.environ['SDL_AUDIODRIVER']
+
+    def test_world_snapshot_restore_replays_exactly(self):
+        """Do mesmo snapshot, as mesmas entradas reproduzem a partida (também lido do disco)"""
+        random.seed(11)
+        world = GameWorld(render=False)
+        world.wave_manager.current_wave = 7
+        world.wave_manager.start_new_wave()
+        world.player.change_weapon(WeaponType.HOMING)
+        
+        def play(world, ticks):
+            trace = []
+            for tick in range(ticks):
+                world.player.invulnerable = 1.0
+                world.step(1 / 60, [(1 if tick % 80 < 40 else -1, tick % 2 == 0)])
+                trace.append((world.score, world.player.rect.x, len(world.entities), world.tick,
+                              tuple((round(b.x, 6), round(b.y, 6)) for b in world.bullets)))
+            return trace
+        
+        play(world, 400)
+        world.entities.live_objects(ENTITY_ASTEROID)[0].add_crack()
+        snapshot = world.snapshot()
+        handles = [obj.handle for obj in world.entities.live_objects()]
+        self.assertTrue(handles)
+        cracked = [obj for obj in world.entities.live_objects(ENTITY_ASTEROID) if obj.cracks]
+        self.assertTrue(cracked)
+        expected = play(world, 300)
+        self.assertNotEqual(expected[0][0], expected[-1][0])  # Houve abates depois do snapshot
+        
+        world.restore(snapshot)
+        for handle in handles:
+            self.assertIsNotNone(world.entities.get(handle))
+        for obj in cracked:
+            restored = world.entities.get(obj.handle)
+            self.assertEqual(restored.cracks[0], obj.cracks[0])
+            self.assertIs(restored.original_image, obj.original_image)  # Imagem compartilhada, sem redesenho
+        self.assertEqual(play(world, 300), expected)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state.sdws')
+            snapshot.save(path)
+            other = GameWorld(render=False)
+            other.restore(WorldSnapshot.load(path).data)
+        self.assertEqual(play(other, 300), expected)
+        with self.assertRaises(ValueError):
+            WorldSnapshot(b'nope' + snapshot.data[4:])
+
+    def test_horde_spawn_split_grid_and_snapshot(self):
+        """Horda segue a curva, parte asteroides, colide pela grade e volta de um snapshot"""
+        import numpy as np
+        manager = HordeManager(((0, 60), (10, 60), (20, 600)), max_asteroids=50)
+        self.assertEqual((manager.rate(0), manager.rate(15), manager.rate(30)), (60, 330.0, 600))
+        self.assertEqual(len(manager.spawn(0.5, live=0)), 30)
+        self.assertEqual(len(manager.spawn(0.5, live=40)), 10)
+        
+        random.seed(4)
+        world = GameWorld(render=False, horde=HORDE_CURVE)
+        big = Asteroid.horde(3, 400, 300)
+        big.health = 1
+        big.speed_x = big.speed_y = 0
+        world.entities.spawn(big, ENTITY_ASTEROID)
+        world.bullets.append(Bullet(400, 310, WeaponType.BASIC, 0, 0))
+        world.step(1 / 60)
+        fragments = [obj for obj in world.entities.live_objects(ENTITY_ASTEROID) if obj is not big]
+        self.assertEqual(sorted(obj.size_category for obj in fragments)[-2:], [2, 2])
+        self.assertEqual(world.score, 20 if big.energy_core else 10)
+        
+        for _ in range(1500):
+            world.player.invulnerable = 1.0
+            world.step(1 / 60, [(0, True)])
+        entities = world.entities
+        self.assertGreater(len(entities), 1000)
+        self.assertEqual(len(entities.draw_list()), len(entities))
+        xs = [random.uniform(0, SCREEN_WIDTH) for _ in range(80)]
+        ys = [random.uniform(0, SCREEN_HEIGHT) for _ in range(80)]
+        indices, grid = entities.collide_boxes(xs, ys, 6, 6, ENTITY_ASTEROID)
+        dense = ((np.abs(entities.x[indices] - np.array(xs, dtype=np.float32)[:, None]) < entities.half_w[indices] + 6) &
+                 (np.abs(entities.y[indices] - np.array(ys, dtype=np.float32)[:, None]) < entities.half_h[indices] + 6))
+        self.assertTrue(grid.any())
+        self.assertTrue((grid == dense).all())
+        
+        snapshot = world.snapshot()
+        trace = [(world.step(1 / 60, [(1, True)]), world.score, len(world.entities))[1:] for _ in range(60)]
+        world.restore(snapshot)
+        self.assertEqual([(world.step(1 / 60, [(1, True)]), world.score, len(world.entities))[1:]
+                          for _ in range(60)], trace)
+
+    def test_sampling_profiler_folded_stacks(self):
+        """Amostras da thread do jogo viram pilhas "folded"; dump() grava e recomeça a contagem"""
+        def hot_spot(deadline):
+            total = 0
+            while time.perf_counter() < deadline:
+                total += sum(range(100))
+            return total
+        
+        # Por padrão o escalonamento das threads não muda; fine_switch é opcional
+        switch_interval = sys.getswitchinterval()
+        sampler = SamplingProfiler(interval=0.002)
+        sampler.start()
+        self.assertEqual(sys.getswitchinterval(), switch_interval)
+        sampler.stop()
+        sampler = SamplingProfiler(interval=0.002, fine_switch=True)
+        sampler.start()
+        self.assertLess(sys.getswitchinterval(), switch_interval)
+        hot_spot(time.perf_counter() + 0.3)
+        sampler.stop()
+        self.assertEqual(sys.getswitchinterval(), switch_interval)
+        self.assertGreater(sum(count for stack, count in sampler.samples.items() if 'hot_spot' in stack), 20)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.folded')
+            total = sampler.dump(path)
+            with open(path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        self.assertEqual(sampler.samples, {})
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), total)
+        leaf = [line for line in lines if 'hot_spot' in line][0].split(';')[-1]
+        self.assertTrue(leaf.startswith('TestSpaceDefender.test_sampling_profiler_folded_stacks.<locals>.hot_spot '
+                                        '(test_space_defender.py:'))
+
+    def test_autopilot_dodges_with_rollouts(self):
+        """Autopilot desvia de um asteroide grande em rota de colisão, sem mexer no random do jogo"""
+        random.seed(2)
+        world = GameWorld(render=False)
+        player = world.player
+        asteroid = Asteroid(3)
+        asteroid.rect.center = (player.rect.centerx, player.rect.centery - 160)
+        asteroid.speed_x, asteroid.speed_y = 0, 7
+        world.entities.spawn(asteroid, ENTITY_ASTEROID)
+        
+        autopilot = Autopilot(rollouts=4, horizon=30, interval=6)
+        for tick in range(46):
+            state = random.getstate()
+            move, shoot = autopilot.act(world)
+            self.assertEqual(random.getstate(), state)  # Simulações em cópias do mundo
+            self.assertEqual(world.tick, tick)
+            if tick < autopilot.interval - 1:
+                self.assertEqual(autopilot.decisions, 0)  # A decisão sai em fatias, uma por quadro
+            elif tick == autopilot.interval - 1:
+                self.assertEqual(autopilot.decisions, 1)
+                self.assertNotEqual(move, 0)
+                values = dict(zip(Autopilot.ACTIONS, autopilot.values))
+                self.assertLess(values[(0, False)], values[(move, shoot)])
+            world.step(1 / 60, [(move, shoot)])
+        self.assertEqual(player.lives, 3)
+        self.assertEqual(autopilot.decisions, 7)
+
+    def test_soak_invariants_and_pool(self):
+        """Soak headless sem violações; check_world acusa estados quebrados; pool igual ao serial"""
+        state = random.getstate()
+        report = soak_world(3, 4000, check_every=20)
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(report['violations'], [])
+        self.assertGreater(report['games'], 0)
+        
+        random.seed(1)
+        world = GameWorld(render=False)
+        world.player.shoot(SilentSoundManager(), world.bullets)
+        self.assertEqual(check_world(world), [])
+        world.bullets.append(world.bullets[0])
+        world.player.lives = -1
+        world.player.health = 100.5
+        world.entities.spawn(Asteroid(1), ENTITY_ASTEROID)
+        world.entities.alive[0] = False
+        self.assertEqual(len(check_world(world)), 5)
+        
+        # Vários asteroides na nave no mesmo quadro do game over não deixam vidas negativas
+        world = GameWorld(render=False)
+        world.player.lives = 1
+        world.player.invulnerable = 0
+        for _ in range(3):
+            asteroid = Asteroid(2)
+            asteroid.rect.center = world.player.rect.center
+            asteroid.speed_x = asteroid.speed_y = 0
+            world.entities.spawn(asteroid, ENTITY_ASTEROID)
+        world.step(1 / 60)
+        self.assertEqual(world.player.lives, 0)
+        self.assertEqual(check_world(world), [])
+        
+        serial = run_soak([5, 6], 600)
+        parallel = run_soak([5, 6], 600, workers=2)
+        self.assertEqual([(r['seed'], r['games'], r['best_score']) for r in parallel],
+                         [(r['seed'], r['games'], r['best_score']) for r in serial])
+
+    def test_scene_stack_pause_and_idle_wait(self):
+        """Pausa congela a partida com um único quadro; cenas idle dormem em event.wait"""
+        screen = init_display(headless=True)
+        args = parse_args(['--headless', '--scores-dir', '', '--quality', '3'])
+        world = GameWorld(particle_system=ParticleSystem(500))
+        stack = SceneStack(screen, pygame.time.Clock())
+        play_scene = PlayScene(args, world, world.particle_system, HUD())
+        stack.push(play_scene)
+        pygame.event.clear()
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p, mod=0, unicode='p'))
+        pygame.time.set_timer(pygame.QUIT, 300, loops=1)
+        started, cpu = time.perf_counter(), time.process_time()
+        stack.run()
+        self.assertGreater(time.perf_counter() - started, 0.25)
+        self.assertLess(time.process_time() - cpu, 0.15)
+        self.assertEqual((world.tick, stack.frames, stack.scenes), (0, 1, []))
+        
+        # Retry descarta os checkpoints das waves seguintes da tentativa anterior
+        play_scene.checkpoints = {wave: world.snapshot() for wave in (1, 2, 3)}
+        play_scene.restart(retry_wave=2)
+        self.assertEqual(sorted(play_scene.checkpoints), [1, 2])
+        
+        class Play:
+            restarted = 'no'
+            def restart(self, retry_wave=None):
+                self.restarted = retry_wave
+        for key, expected in ((pygame.K_r, 3), (pygame.K_RETURN, None)):
+            play = Play()
+            stack.push(GameOverScene(play, 120, 3, best=150, rank=2, retry_wave=3))
+            pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key, mod=0))
+            stack.run()
+            self.assertEqual(play.restarted, expected)
+
+    def test_sound_voices_coalescing_and_stealing(self):
+        """Pedidos iguais no quadro viram uma voz; limites por efeito e prioridade no roubo de canais"""
+        pygame.mixer.quit()
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        try:
+            sound_manager = SoundManager()
+            self.assertEqual(len(sound_manager.banks['laser']), SoundManager.VARIATIONS)
+            lengths = {sound.get_length() for sound in sound_manager.banks['explosion']}
+            self.assertEqual(len(lengths), SoundManager.VARIATIONS)  # Tons diferentes
+            
+            for _ in range(10):
+                sound_manager.play('laser')
+            sound_manager.flush()
+            self.assertEqual(sound_manager.started, 1)
+            
+            laser_limit = SoundManager.VOICES['laser'][0]
+            for _ in range(laser_limit + 3):
+                sound_manager.play('laser')
+                sound_manager.flush()
+            names = [voice[0] for voice in sound_manager.voices.values()]
+            self.assertEqual(names.count('laser'), laser_limit)
+            
+            # Canais lotados: explosões roubam lasers, lasers nunca roubam power-ups
+            for _ in range(SoundManager.CHANNELS):
+                for name in ('explosion', 'powerup'):
+                    sound_manager.play(name)
+                sound_manager.flush()
+            names = [voice[0] for voice in sound_manager.voices.values()]
+            self.assertEqual(names.count('powerup'), SoundManager.VOICES['powerup'][0])
+            self.assertEqual(names.count('explosion'), SoundManager.VOICES['explosion'][0])
+            self.assertLessEqual(len(sound_manager.voices), SoundManager.CHANNELS)
+        finally:
+            pygame.mixer.quit()
+            del os.environ['SDL_AUDIODRIVER']
+
+if __name__ == "__main__":
+    unittest.main()